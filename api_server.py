@@ -4,13 +4,18 @@ Mockup Generator 2.0 - API Server v5.2
 
 import os
 import glob
+import hashlib
 import json
 import logging
 import re
 import io
 import sys
+import time
+from concurrent.futures import wait as wait_futures
 from functools import wraps
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from contextlib import nullcontext
+import click
+from flask import Flask, request, jsonify, send_from_directory, send_file, Response, g
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.utils import secure_filename
@@ -29,7 +34,22 @@ from pptx.enum.text import MSO_ANCHOR
 # ===== CONFIGURATION =====
 from config import settings
 from models import db, User, Fabric
-from mockup_library import MockupGeneratorV2
+from mockup_library import MockupGeneratorV2, garment_cache, resolve_max_size, RENDER_TIERS
+from swatch_pyramid import configure_swatch_disk, configure_swatch_memory, get_swatch_pyramid
+from garment_bundles import get_bundle_store
+from asset_index import get_asset_index
+from fabric_images import SWATCH_EXTENSIONS, sync_image_paths
+from mockup_outputs import prune_outputs
+from fabric_search import apply_search
+from fabric_facets import weight_filter, facet_matrix, summarize_facets
+from fabric_listing import field_set_name, listing_query, listing_rows
+from json_provider import configure_json
+from catalog_cache import CatalogVersion, VersionedCache, FileCache, track_changes
+from keyset_pagination import keyset_page, capped_count, InvalidCursor
+from render_pool import RenderPool, render_task
+from render_jobs import JobQueue, TERMINAL_STATES, public_job
+from render_admission import RenderAdmission, AdmissionRejected
+from render_metrics import StageTimer, render_metrics
 
 # Use settings from environment variables
 PROJECT_ROOT = str(settings.project_root_path)
@@ -45,12 +65,53 @@ DATABASE_PATH = str(settings.database_path)
 TITLE_SLIDE_1_PATH = str(settings.title_slide_1_path)
 TITLE_SLIDE_2_PATH = str(settings.title_slide_2_path)
 
+# Performance: Decoded garment templates are shared by every render in this process
+garment_cache.configure(max_bytes=settings.GARMENT_CACHE_MAX_MB * 1024 * 1024)
+# Performance: Swatches are resampled from pre-decoded mip levels instead of the originals
+configure_swatch_memory(settings.SWATCH_CACHE_MAX_MB * 1024 * 1024)
+configure_swatch_disk(settings.SWATCH_PYRAMID_DISK_MAX_MB * 1024 * 1024)
+SWATCH_PYRAMID_DIR = str(settings.swatch_pyramid_dir_path) if settings.swatch_pyramid_dir_path else None
+# Performance: Garments are memory-mapped from precompiled bundles (shared page cache across workers)
+GARMENT_BUNDLE_DIR = str(settings.garment_bundle_dir_path) if settings.garment_bundle_dir_path else None
+# Performance: Batch renders are fanned out to worker processes
+render_pool = RenderPool(
+    max_workers=settings.RENDER_POOL_WORKERS,
+    garment_cache_bytes=settings.GARMENT_CACHE_MAX_MB * 1024 * 1024,
+    swatch_cache_bytes=settings.SWATCH_CACHE_MAX_MB * 1024 * 1024
+)
+# Reliability: Bound the estimated memory of renders running on this host (ledger shared by all workers)
+render_admission = RenderAdmission(
+    budget_bytes=settings.RENDER_MEMORY_BUDGET_MB * 1024 * 1024,
+    max_wait_seconds=settings.RENDER_ADMISSION_WAIT_SECONDS,
+    retry_after_seconds=settings.RENDER_RETRY_AFTER_SECONDS,
+    ledger_path=str(settings.render_admission_file_path) if settings.render_admission_file_path else None
+)
+# Performance: Async renders/exports run on the pool; state is shared across API workers on disk
+job_queue = JobQueue(
+    render_pool,
+    str(settings.render_job_dir_path),
+    ttl_seconds=settings.RENDER_JOB_TTL_SECONDS,
+    stale_seconds=settings.RENDER_JOB_STALE_SECONDS
+)
+# Performance: Catalog reads are cached until a Fabric write bumps the catalog version (shared across workers)
+catalog_version = CatalogVersion(str(settings.catalog_version_file_path))
+facet_cache = VersionedCache(max_entries=settings.FACET_CACHE_MAX_ENTRIES)
+if settings.RESPONSE_CACHE_BACKEND == 'file':
+    response_cache = FileCache(str(settings.response_cache_dir_path), max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES)
+else:
+    response_cache = VersionedCache(max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES)
+# Every committed Fabric insert/update/delete (ORM or bulk statement) moves the catalog to a new version
+track_changes(db.session, Fabric, lambda: catalog_version.bump())
+
 # Initialize Flask App
 app = Flask(__name__)
+# Performance: orjson encodes jsonify() responses (Flask's encoder if orjson is missing)
+configure_json(app)
 
 # Security: Restrict CORS to frontend origins
 cors_origins = settings.CORS_ALLOWED_ORIGINS.split(',')
-CORS(app, resources={r"/*": {"origins": cors_origins}}, supports_credentials=True)
+CORS(app, resources={r"/*": {"origins": cors_origins}}, supports_credentials=True,
+     expose_headers=['X-Next-Cursor'])
 
 # Database Configuration
 # Production: Use DATABASE_URL env var (PostgreSQL recommended for concurrency)
@@ -76,7 +137,8 @@ limiter = Limiter(
     get_remote_address,
     app=app,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    storage_uri="memory://",
+    enabled=settings.RATE_LIMIT_ENABLED
 )
 
 # Configure logging
@@ -98,8 +160,20 @@ def log_response_info(response):
         logger.info(f"[API] {request.method} {request.path} -> {response.status_code}")
     return response
 
+@app.after_request
+def add_render_timing(response):
+    """Observability: Expose stage timings of in-process renders (Server-Timing + metrics histograms)."""
+    timer = g.pop('render_timer', None)
+    if timer is not None:
+        render_metrics.observe(timer)
+        response.headers['Server-Timing'] = timer.server_timing(time.perf_counter() - g.pop('render_start'))
+    return response
+
+# Upper bound on how long a batch request waits for all of its items together
+BATCH_TIMEOUT_SECONDS = 120
+
 # ===== HELPER FUNCTIONS =====
-def find_file(directory, base_filename, extensions=['.jpg', '.png', '.jpeg', '.webp']):
+def find_file(directory, base_filename, extensions=SWATCH_EXTENSIONS):
     # Security: Prevent path traversal while preserving special characters in filenames
     # Use os.path.basename to ensure we only get the filename part (no directory separators)
     base_filename = os.path.basename(str(base_filename))
@@ -107,15 +181,71 @@ def find_file(directory, base_filename, extensions=['.jpg', '.png', '.jpeg', '.w
     if '..' in base_filename or '/' in base_filename or '\\' in base_filename:
         return None
     
-    for ext in extensions:
-        for case_ext in [ext, ext.upper(), ext.lower()]:
-            path = os.path.join(directory, f"{base_filename}{case_ext}")
-            if os.path.exists(path): return f"{base_filename}{case_ext}"
-    return None
+    # Performance: One dict lookup in the directory's in-memory index instead of probing each extension
+    return get_asset_index(directory).find(base_filename, extensions)
 
-def clean_group_name(text):
-    if not isinstance(text, str): return str(text)
-    return text.strip()
+def validate_asset_name(value):
+    """Returns the basename of a fabric ref / garment name, or None if it looks like path traversal."""
+    value = os.path.basename(str(value))
+    if '..' in value or '/' in value or '\\' in value:
+        return None
+    return value
+
+def mockup_generator_kwargs():
+    """Constructor arguments for MockupGeneratorV2 (picklable, so usable by render workers)."""
+    return {
+        "fabric_dir": FABRIC_SWATCH_DIR,
+        "mockup_dir": MOCKUP_DIR_TEMPLATES,
+        "mask_dir": MASK_DIR,
+        "output_dir": MOCKUP_DIR_OUTPUT,
+        "engine": settings.MOCKUP_ENGINE,
+        "output_format": settings.OUTPUT_FORMAT,
+        "output_quality": settings.OUTPUT_QUALITY,
+        "png_compress_level": settings.PNG_COMPRESS_LEVEL,
+        "webp_lossless": settings.WEBP_LOSSLESS,
+        "swatch_cache_dir": SWATCH_PYRAMID_DIR,
+        "bundle_dir": GARMENT_BUNDLE_DIR,
+    }
+
+def parse_render_size(data):
+    """
+    Reads the output size of a render request: 'tier' (preview / standard / full)
+    or an explicit 'max_size' in pixels. Returns (max_size, error_message).
+    """
+    try:
+        return resolve_max_size(data.get('tier'), data.get('max_size')), None
+    except (TypeError, ValueError) as e:
+        return None, str(e)
+
+def mockup_views(results):
+    """
+    Maps generate_mockup's (variant, path) pairs to ({view: url}, [views]) for API
+    responses. Views are the garment's variant names (e.g. face, back, side), or
+    "single" for a garment without variants.
+    """
+    mockups = {}
+    views = []
+    for variant, path in results:
+        view = variant.lower() if variant else "single"
+        mockups[view] = f"/static/mockups/{os.path.basename(path)}"
+        views.append(view)
+    return mockups, views
+
+def mockup_job_result(results):
+    """Job result for an async mockup render (None marks the job failed)."""
+    if not results:
+        return None
+    mockups, views = mockup_views(results)
+    return {"mockups": mockups, "views": views}
+
+def cached_facet_matrix(search_term):
+    """(fabric_group, weight band, count) rows of LIVE fabrics matching a search, cached per catalog version."""
+    def compute():
+        query = Fabric.query.filter_by(status='LIVE')
+        if search_term:
+            query, _rank = apply_search(query, Fabric, search_term, db.session, ranked=False)
+        return facet_matrix(query, Fabric)
+    return facet_cache.get_or_compute(('facets', search_term), catalog_version.current(), compute)
 
 # ===== ADMIN DECORATOR =====
 def admin_required():
@@ -141,95 +271,184 @@ def health_check():
 @limiter.limit("100 per minute")
 def get_fabric_groups():
     try:
-        # Architecture: Standardized on Model.query pattern for consistency
-        groups = Fabric.query.with_entities(Fabric.fabric_group).filter_by(status='LIVE').distinct().all()
-        cleaned_groups = sorted(list(set([clean_group_name(g[0]) for g in groups if g[0]])))
-        return jsonify(cleaned_groups)
+        # Performance: Served from the cached facet counts of the whole catalog
+        facets = summarize_facets(cached_facet_matrix(''))
+        return jsonify([group["name"] for group in facets["groups"]])
     except Exception as e:
         logger.error(f"Error fetching groups: {e}")
         return jsonify({"error": "An unexpected error occurred."}), 500
 
+@app.route('/api/fabric-facets')
+@limiter.limit("100 per minute")
+def get_fabric_facets():
+    """Group and weight-band counts for a search; each facet ignores its own filter."""
+    search_term = ' '.join(request.args.get('search', '').split())
+    filter_group = request.args.get('group', '').strip()
+    filter_weight = request.args.get('weight', '').strip()
+    try:
+        facets = summarize_facets(cached_facet_matrix(search_term), filter_group, filter_weight)
+        return jsonify(facets)
+    except Exception as e:
+        logger.error(f"Error computing facets: {e}")
+        return jsonify({"error": "An unexpected error occurred."}), 500
+
+def cached_json_response(cache_key, compute, conditional=True):
+    """
+    JSON response for compute(), cached per key and catalog version.
+
+    Performance: The weak ETag is derived from the catalog version and the key, so a client
+    revalidating an unchanged result (If-None-Match) gets a 304 without a cache or DB lookup.
+    Exceptions from compute() propagate and nothing is cached.
+    """
+    version = catalog_version.current()
+    etag = f"{version}-{hashlib.sha1(repr(cache_key).encode('utf-8')).hexdigest()[:20]}"
+    if conditional and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        body = response_cache.get(cache_key, version)
+        if body is None:
+            body = jsonify(compute()).get_data()
+            response_cache.put(cache_key, version, body)
+        response = Response(body, mimetype='application/json')
+    # Browsers revalidate every time; the check is a stat() and a hash
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def search_fabrics(search_term, filter_group, filter_weight, page, cursor, limit, field_set):
+    """
+    One page of LIVE fabric search results as a JSON-ready dict.
+
+    Raises:
+        InvalidCursor: Malformed cursor
+    """
+    query = Fabric.query.filter_by(status='LIVE')
+
+    # 1. Apply Filters
+    if filter_group:
+        query = query.filter(Fabric.fabric_group.ilike(f"%{filter_group}%"))
+    
+    weight_condition = weight_filter(Fabric, filter_weight)
+    if weight_condition is not None:
+        query = query.filter(weight_condition)
+
+    # 2. Apply Search Term
+    # Performance: Full-text index (FTS5 / tsvector), ranked, prefix-matched; ilike scan if not migrated
+    rank = None
+    matching = query
+    if search_term:
+        # The count only needs the matching rows, not their rank
+        matching, _rank = apply_search(query, Fabric, search_term, db.session, ranked=False)
+        query, rank = apply_search(query, Fabric, search_term, db.session)
+
+    # 3. Total: counted once, on the first page, and only up to COUNT_CAP rows
+    total, total_exact = (None, False) if cursor else capped_count(matching)
+
+    # 4. Pagination on a stable sort key: best match first, then id
+    # Performance: Only the field set's columns are selected, owners' names joined in (no ORM entities)
+    query = listing_query(query, Fabric, User, field_set)
+    sort_keys = [rank, Fabric.id] if rank is not None else [Fabric.id]
+    rows, next_cursor = keyset_page(query, sort_keys, limit, cursor=cursor,
+                                    offset=0 if cursor else (page - 1) * limit)
+    # Optimization: Use stored image_path if available
+    results = listing_rows(rows, field_set, lambda ref: find_file(FABRIC_SWATCH_DIR, ref))
+
+    return {
+        "results": results,
+        "total": total,
+        "total_exact": total_exact,
+        "page": page,
+        "limit": limit,
+        "pages": -(-total // limit) if total_exact else None,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
+    }
+
 @app.route('/api/find-fabrics')
 @limiter.limit("60 per minute")
 def find_fabrics():
-    search_term = request.args.get('search', '').strip()
+    search_term = ' '.join(request.args.get('search', '').split())
     filter_group = request.args.get('group', '').strip()
     filter_weight = request.args.get('weight', '').strip()
     # Stability: Use Flask's type parameter to safely handle invalid input (prevents 500 errors)
     page = request.args.get('page', 1, type=int)
     if page < 1:
         page = 1
+    # Performance: Clients page with the opaque 'cursor' from the previous response (keyset, no OFFSET);
+    # 'page' numbers are still accepted for old clients
+    cursor = request.args.get('cursor', '').strip() or None
+    # Performance: 'fields=card' returns only what result cards need; 'detail' (default) every field
+    field_set = field_set_name(request.args.get('fields', '').strip())
     
     # Security: Enforce max limit to prevent DoS
     MAX_LIMIT = 100
     limit = request.args.get('limit', 20, type=int)
     limit = max(1, min(limit, MAX_LIMIT))
     
-    logger.info(f"Search: '{search_term}' | Group: '{filter_group}' | Weight: '{filter_weight}'")
+    cache_key = ('find-fabrics', search_term, filter_group,
+                 filter_weight if weight_filter(Fabric, filter_weight) is not None else '',
+                 limit, page, cursor, field_set)
+
+    def compute():
+        logger.info(f"Search: '{search_term}' | Group: '{filter_group}' | Weight: '{filter_weight}'")
+        return search_fabrics(search_term, filter_group, filter_weight, page, cursor, limit, field_set)
 
     try:
-        query = Fabric.query.filter_by(status='LIVE')
+        return cached_json_response(cache_key, compute)
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error finding fabrics: {e}")
+        return jsonify({"error": "An unexpected error occurred."}), 500
 
-        # 1. Apply Filters
-        if filter_group:
-            query = query.filter(Fabric.fabric_group.ilike(f"%{filter_group}%"))
-        
-        if filter_weight:
-            if filter_weight == 'light':
-                query = query.filter(Fabric.gsm < 160)
-            elif filter_weight == 'medium':
-                query = query.filter(Fabric.gsm.between(160, 240))
-            elif filter_weight == 'heavy':
-                query = query.filter(Fabric.gsm > 240)
-
-        # 2. Apply Search Term
-        if search_term:
-            term = f"%{search_term}%"
-            query = query.filter(
-                (Fabric.ref.ilike(term)) |
-                (Fabric.fabrication.ilike(term)) |
-                (Fabric.fabric_group.ilike(term))
-            )
-
-        # 3. Pagination
-        pagination = query.paginate(page=page, per_page=limit, error_out=False)
-        
-        results = []
-        for f in pagination.items:
-            # Get owner name
-            owner = User.query.get(f.manufacturer_id)
-            owner_name = owner.company_name if owner else "Unknown"
-            
-            # Find image
-            # Optimization: Use stored image_path if available
-            image_filename = f.image_path if hasattr(f, 'image_path') and f.image_path else find_file(FABRIC_SWATCH_DIR, f.ref)
-            swatch_url = f"/static/swatches/{image_filename}" if image_filename else None
-            
-            results.append({
-                "id": f.id,
-                "ref": f.ref,
-                "fabric_group": f.fabric_group,
-                "fabrication": f.fabrication,
-                "gsm": f.gsm,
-                "width": f.width,
-                "composition": f.composition,
-                "status": f.status,
-                "owner_name": owner_name,
-                "manufacturer_id": f.manufacturer_id,
-                "meta_data": f.meta_data or {},
-                "swatchUrl": swatch_url
-            })
-            
-        return jsonify({
-            "results": results,
-            "total": pagination.total,
-            "page": page,
-            "limit": limit,
-            "pages": pagination.pages
-        })
+@app.route('/api/fabrics', methods=['GET', 'POST'])
+@limiter.limit("100 per minute")
+def get_fabrics_by_id():
+    """
+    LIVE fabrics for a set of ids (?ids=1,2,3 or POST {"ids": [...]}), in request order,
+    in the find-fabrics result schema. Ids that are unknown or not LIVE are listed in "missing".
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        raw_ids = data.get('ids')
+        fields = data.get('fields', '')
+    else:
+        raw_ids = [part for part in request.args.get('ids', '').split(',') if part.strip()]
+        fields = request.args.get('fields', '')
+    if not isinstance(raw_ids, list) or not raw_ids:
+        return jsonify({"error": "ids must be a non-empty list of fabric ids"}), 400
+    # Security: Bound the IN list (and the response) per request
+    MAX_IDS = 200
+    if len(raw_ids) > MAX_IDS:
+        return jsonify({"error": f"At most {MAX_IDS} ids per request"}), 400
+    try:
+        if any(isinstance(i, (bool, float)) for i in raw_ids):
+            raise ValueError(raw_ids)
+        # Duplicates are dropped, the first occurrence keeps its position
+        ids = list(dict.fromkeys(int(i) for i in raw_ids))
+        # Reliability: The database driver raises OverflowError beyond a 64-bit integer
+        if any(not -2**63 <= i < 2**63 for i in ids):
+            raise ValueError(ids)
+    except (TypeError, ValueError):
+        return jsonify({"error": "ids must be integers"}), 400
+    field_set = field_set_name(str(fields).strip())
+
+    def compute():
+        # Performance: One IN query on the primary key, projected like the search listing
+        query = listing_query(Fabric.query.filter(Fabric.status == 'LIVE', Fabric.id.in_(ids)),
+                              Fabric, User, field_set)
+        found = {row["id"]: row for row in listing_rows(query.all(), field_set,
+                                                        lambda ref: find_file(FABRIC_SWATCH_DIR, ref))}
+        return {
+            "results": [found[i] for i in ids if i in found],
+            "missing": [i for i in ids if i not in found],
+        }
 
+    try:
+        return cached_json_response(('fabrics', tuple(ids), field_set), compute,
+                                    conditional=request.method == 'GET')
     except Exception as e:
-        logger.error(f"Error finding fabrics: {e}")
+        logger.error(f"Error fetching fabrics by id: {e}")
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 @app.route('/api/garments')
@@ -241,7 +460,7 @@ def get_garments():
         if not os.path.exists(MOCKUP_DIR_TEMPLATES):
             return jsonify({})
             
-        files = os.listdir(MOCKUP_DIR_TEMPLATES)
+        files = get_asset_index(MOCKUP_DIR_TEMPLATES).filenames()
         garment_map = {} # Key: (category, base_name) -> data
 
         for filename in files:
@@ -307,9 +526,19 @@ def get_garments():
         logger.error(f"Error fetching garments: {e}")
         return jsonify({"error": "An unexpected error occurred."}), 500
 
+def batch_render_cost():
+    """Rate-limit cost of a batch request: one unit per fabric x garment item."""
+    data = request.get_json(silent=True) or {}
+    fabric_refs = data.get('fabric_refs') or []
+    mockup_names = data.get('mockup_names') or []
+    if not isinstance(fabric_refs, list) or not isinstance(mockup_names, list):
+        return 1
+    return max(1, len(fabric_refs) * len(mockup_names))
+
 @app.route('/api/generate-mockup', methods=['POST'])
 @jwt_required()
-@limiter.limit("10 per minute")
+# Security: Single and batch renders draw from one shared budget; each rendered item costs 1
+@limiter.shared_limit(settings.MOCKUP_RATE_LIMIT, scope="mockup-render")
 def generate_on_demand():
     data = request.json
     fabric_ref = data.get('fabric_ref')
@@ -319,37 +548,57 @@ def generate_on_demand():
         return jsonify({"success": False, "error": "Missing fabric_ref or mockup_name"}), 400
     
     # Security: Validate inputs (prevent path traversal while preserving special characters)
-    # Use os.path.basename to ensure we only get the filename part
-    fabric_ref = os.path.basename(str(fabric_ref))
-    mockup_name = os.path.basename(str(mockup_name))
-    # Reject path traversal attempts
-    if '..' in fabric_ref or '/' in fabric_ref or '\\' in fabric_ref:
+    fabric_ref = validate_asset_name(fabric_ref)
+    mockup_name = validate_asset_name(mockup_name)
+    if not fabric_ref:
         return jsonify({"success": False, "error": "Invalid fabric_ref: path traversal detected"}), 400
-    if '..' in mockup_name or '/' in mockup_name or '\\' in mockup_name:
+    if not mockup_name:
         return jsonify({"success": False, "error": "Invalid mockup_name: path traversal detected"}), 400
     
-    try:
-        generator = MockupGeneratorV2(
-            fabric_dir=FABRIC_SWATCH_DIR,
-            mockup_dir=MOCKUP_DIR_TEMPLATES,
-            mask_dir=MASK_DIR,
-            output_dir=MOCKUP_DIR_OUTPUT
+    # Performance: 'preview' renders a downscaled mockup; clients fetch 'full' only for downloads
+    max_size, size_error = parse_render_size(data)
+    if size_error:
+        return jsonify({"success": False, "error": size_error}), 400
+    
+    if data.get('async'):
+        # Performance: Queue the render on worker processes and free this API worker immediately
+        job = job_queue.submit(
+            'mockup', get_jwt_identity(), render_task,
+            args=(mockup_generator_kwargs(), fabric_ref, mockup_name, max_size),
+            on_result=mockup_job_result
         )
+        return jsonify({
+            "success": True,
+            "job_id": job["id"],
+            "status": job["status"],
+            "status_url": f"/api/jobs/{job['id']}"
+        }), 202, {'Retry-After': str(settings.RENDER_JOB_POLL_SECONDS)}
+    
+    try:
+        # Observability: Stage timings end up in the Server-Timing header and /api/admin/metrics
+        g.render_timer, g.render_start = StageTimer(), time.perf_counter()
+        generator = MockupGeneratorV2(**mockup_generator_kwargs(), timer=g.render_timer)
+        
+        # Reliability: Reserve the render's estimated peak memory; wait briefly, else shed load with 503
+        view = data.get('view') if data.get('stream') else None
+        # Performance: Views already rendered to disk cost nothing; fully cached requests skip admission
+        estimated_bytes = generator.estimate_render_bytes(fabric_ref, mockup_name, view=view, max_size=max_size,
+                                                          skip_rendered=not data.get('stream'))
+        with render_admission.admit(estimated_bytes) if estimated_bytes else nullcontext():
+            if data.get('stream'):
+                # Performance: Encode one view in memory and return the image bytes directly (no disk write)
+                rendered = generator.render_view_bytes(fabric_ref, mockup_name, view=view, max_size=max_size)
+            else:
+                results = generator.generate_mockup(fabric_ref, mockup_name, max_size=max_size)
         
-        results = generator.generate_mockup(fabric_ref, mockup_name)
+        if data.get('stream'):
+            if not rendered:
+                return jsonify({"success": False, "error": "Failed to generate mockup. Check if files exist."}), 404
+            image_bytes, mimetype = rendered
+            return Response(image_bytes, mimetype=mimetype, headers={'Cache-Control': 'private, max-age=3600'})
         
         if results:
-            mockups = {}
-            views = []
-            for res in results:
-                filename = os.path.basename(res)
-                view = "single"
-                if "_face" in filename: view = "face"
-                elif "_back" in filename: view = "back"
-                
-                mockups[view] = f"/static/mockups/{filename}"
-                views.append(view)
-                
+            mockups, views = mockup_views(results)
             return jsonify({
                 "success": True,
                 "mockups": mockups,
@@ -359,6 +608,11 @@ def generate_on_demand():
             return jsonify({"success": False, "error": "Failed to generate mockup. Check if files exist."}), 404
     
     # Reliability: Catch specific exceptions for appropriate error responses
+    except AdmissionRejected as e:
+        logger.warning(f"Mockup render rejected ({e.requested_bytes / (1024 * 1024):.0f} MB): {render_admission.stats()}")
+        return jsonify({"success": False, "error": "Server is busy rendering, please retry shortly"}), 503, {
+            'Retry-After': str(e.retry_after)
+        }
     except (PILImage.UnidentifiedImageError, OSError) as e:
         logger.warning(f"Invalid image file in mockup generation: {e}")
         return jsonify({"success": False, "error": "Invalid or corrupt image file"}), 400
@@ -369,14 +623,109 @@ def generate_on_demand():
         logger.error(f"Unexpected error generating mockup: {e}")
         return jsonify({"success": False, "error": "An unexpected server error occurred"}), 500
 
+@app.route('/api/generate-mockups/batch', methods=['POST'])
+@jwt_required()
+@limiter.shared_limit(settings.MOCKUP_RATE_LIMIT, scope="mockup-render", cost=batch_render_cost)
+def generate_batch():
+    """Renders every fabric x garment pair on the render pool and reports per-item results."""
+    data = request.get_json(silent=True) or {}
+    fabric_refs = data.get('fabric_refs')
+    mockup_names = data.get('mockup_names')
+    
+    if not isinstance(fabric_refs, list) or not isinstance(mockup_names, list) or not fabric_refs or not mockup_names:
+        return jsonify({"success": False, "error": "fabric_refs and mockup_names must be non-empty lists"}), 400
+    
+    max_size, size_error = parse_render_size(data)
+    if size_error:
+        return jsonify({"success": False, "error": size_error}), 400
+    
+    item_count = len(fabric_refs) * len(mockup_names)
+    if item_count > settings.MOCKUP_BATCH_MAX_ITEMS:
+        return jsonify({
+            "success": False,
+            "error": f"Batch too large: {item_count} items (max {settings.MOCKUP_BATCH_MAX_ITEMS})"
+        }), 400
+    
+    results = []
+    failures = []
+    pending = []
+    generator_kwargs = mockup_generator_kwargs()
+    for raw_ref in fabric_refs:
+        for raw_name in mockup_names:
+            fabric_ref = validate_asset_name(raw_ref) if raw_ref else None
+            mockup_name = validate_asset_name(raw_name) if raw_name else None
+            if not fabric_ref or not mockup_name:
+                failures.append({"fabric_ref": raw_ref, "mockup_name": raw_name, "error": "Invalid fabric_ref or mockup_name"})
+                continue
+            future = render_pool.submit(generator_kwargs, fabric_ref, mockup_name, max_size)
+            pending.append((fabric_ref, mockup_name, future))
+    
+    # Reliability: One deadline for the whole batch, so a request never holds its worker longer
+    _done, unfinished = wait_futures([future for _ref, _name, future in pending], timeout=BATCH_TIMEOUT_SECONDS)
+    for fabric_ref, mockup_name, future in pending:
+        item = {"fabric_ref": fabric_ref, "mockup_name": mockup_name}
+        if future in unfinished:
+            # Items still queued are dropped; one already rendering finishes but is not waited for
+            future.cancel()
+            failures.append({**item, "error": "Timed out"})
+            continue
+        try:
+            paths = future.result()
+        except MemoryError:
+            failures.append({**item, "error": "Server ran out of memory processing this item"})
+            continue
+        except Exception as e:
+            logger.error(f"Batch render failed for {fabric_ref} / {mockup_name}: {e}")
+            failures.append({**item, "error": "Render failed"})
+            continue
+        
+        if paths:
+            mockups, views = mockup_views(paths)
+            results.append({**item, "mockups": mockups, "views": views})
+        else:
+            failures.append({**item, "error": "Failed to generate mockup. Check if files exist."})
+    
+    return jsonify({
+        "success": not failures,
+        "results": results,
+        "failures": failures
+    })
+
+# ===== RENDER JOBS =====
+def get_owned_job(job_id):
+    """Returns the job if it exists and belongs to the current user, else None."""
+    job = job_queue.get(job_id)
+    if job is None or job["owner_id"] != str(get_jwt_identity()):
+        return None
+    return job
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    job = get_owned_job(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    # Performance: Clients poll with Retry-After instead of holding a (sync) worker open on a stream
+    if job["status"] in TERMINAL_STATES:
+        return jsonify({"success": True, **public_job(job)})
+    return jsonify({"success": True, **public_job(job)}), 200, {'Retry-After': str(settings.RENDER_JOB_POLL_SECONDS)}
+
 @app.route('/api/generate-pptx', methods=['POST'])
 @limiter.limit("5 per minute")
 def generate_pptx():
     return jsonify({"success": False, "error": "Not implemented"}), 501
 
 # ===== STATIC SERVING ROUTES =====
+# Content-addressed mockups ("Mockup_<garment>_<ref>.<hash>.png") never change
+HASHED_MOCKUP_RE = re.compile(r'\.[0-9a-f]{16}\.[A-Za-z]+$')
+
 @app.route('/static/mockups/<filename>')
-def serve_mockup(filename): return send_from_directory(MOCKUP_DIR_OUTPUT, filename)
+def serve_mockup(filename):
+    response = send_from_directory(MOCKUP_DIR_OUTPUT, filename)
+    if HASHED_MOCKUP_RE.search(filename):
+        # Performance: The hash changes whenever any input changes, so browsers may cache forever
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 @app.route('/static/mockup-templates/<filename>')
 def serve_mockup_template(filename): return send_from_directory(MOCKUP_DIR_TEMPLATES, filename)
@@ -416,6 +765,10 @@ def serve_script(): return send_from_directory(PROJECT_ROOT, 'script.js')
 @app.route('/api/admin/fabrics', methods=['GET'])
 @admin_required()
 def get_admin_fabrics():
+    # Performance: Newest first, paged by the opaque X-Next-Cursor header (keyset on id)
+    limit = max(1, min(request.args.get('limit', 100, type=int), 500))
+    cursor = request.args.get('cursor', '').strip() or None
+    field_set = field_set_name(request.args.get('fields', '').strip())
     try:
         status_filter = request.args.get('status')
         query = Fabric.query
@@ -425,25 +778,16 @@ def get_admin_fabrics():
                 query = query.filter(Fabric.status.in_(statuses))
             else:
                 query = query.filter_by(status=status_filter)
-        fabrics = query.order_by(Fabric.id.desc()).limit(100).all()
-        results = []
-        for f in fabrics:
-            owner = User.query.get(f.manufacturer_id)
-            owner_name = owner.company_name if owner else "Unknown"
-            
-            # Find image
-            image_filename = f.image_path if hasattr(f, 'image_path') and f.image_path else find_file(FABRIC_SWATCH_DIR, f.ref)
-            swatch_url = f"/static/swatches/{image_filename}" if image_filename else None
-            
-            results.append({
-                "id": f.id, "ref": f.ref, "fabric_group": f.fabric_group,
-                "fabrication": f.fabrication, "gsm": f.gsm, "width": f.width,
-                "composition": f.composition, "status": f.status,
-                "owner_name": owner_name, "manufacturer_id": f.manufacturer_id,
-                "meta_data": f.meta_data or {},
-                "swatchUrl": swatch_url
-            })
-        return jsonify(results)
+        # Performance: Projected columns with the owner's name joined in (see search_fabrics)
+        query = listing_query(query, Fabric, User, field_set)
+        rows, next_cursor = keyset_page(query, [Fabric.id], limit, cursor=cursor, descending=True)
+        results = listing_rows(rows, field_set, lambda ref: find_file(FABRIC_SWATCH_DIR, ref))
+        response = jsonify(results)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching admin fabrics: {e}")
         return jsonify({"error": "An unexpected error occurred."}), 500
@@ -472,6 +816,9 @@ def manage_fabric(fabric_id):
             if 'meta_data' in data: fabric.meta_data = data['meta_data']
             for field in ['ref', 'fabric_group', 'fabrication', 'gsm', 'width', 'composition']:
                 if field in data: setattr(fabric, field, data[field])
+            if 'ref' in data:
+                # Performance: Keep the stored swatch in step with the ref so reads skip the lookup
+                fabric.image_path = find_file(FABRIC_SWATCH_DIR, fabric.ref)
             db.session.commit()
             return jsonify({"success": True, "message": "Fabric updated"})
         elif request.method == 'DELETE':
@@ -483,6 +830,36 @@ def manage_fabric(fabric_id):
         db.session.rollback()
         return jsonify({"error": "An unexpected error occurred."}), 500
 
+@app.route('/api/admin/fabrics/sync-images', methods=['POST'])
+@admin_required()
+def sync_fabric_images():
+    """Backfills/repairs Fabric.image_path from one pass over the swatch directory."""
+    data = request.get_json(silent=True) or {}
+    try:
+        report = sync_image_paths(db, FABRIC_SWATCH_DIR, dry_run=bool(data.get('dry_run')))
+        logger.info(f"Fabric image sync: {report}")
+        return jsonify({"success": True, "dry_run": bool(data.get('dry_run')), **report})
+    except Exception as e:
+        logger.error(f"Error syncing fabric images: {e}")
+        db.session.rollback()
+        return jsonify({"error": "An unexpected error occurred."}), 500
+
+@app.route('/api/admin/metrics', methods=['GET'])
+@admin_required()
+def get_admin_metrics():
+    """Render stage histograms and cache/admission counters of this worker process."""
+    metrics = {
+        "render_stages": render_metrics.snapshot(),
+        "garment_cache": garment_cache.stats(),
+        "render_admission": render_admission.stats(),
+        "catalog_version": catalog_version.current(),
+        "facet_cache": facet_cache.stats(),
+        "response_cache": response_cache.stats(),
+    }
+    if SWATCH_PYRAMID_DIR:
+        metrics["swatch_pyramid"] = get_swatch_pyramid(SWATCH_PYRAMID_DIR).stats()
+    return jsonify(metrics)
+
 @app.route('/api/admin/mills', methods=['GET'])
 @admin_required()
 def get_mills():
@@ -584,8 +961,90 @@ def create_admin():
     db.session.commit()
     click.echo(f'Admin user "{admin_email}" created successfully.')
 
+@app.cli.command('compile-garments')
+@click.option('--force', is_flag=True, help='Rebuild bundles even if they are up to date.')
+def compile_garments(force):
+    """Compiles every garment in the mockup/mask directories into memory-mappable bundles."""
+    if not GARMENT_BUNDLE_DIR:
+        click.echo('Error: GARMENT_BUNDLE_DIR is not set.', err=True)
+        return
+    generator = MockupGeneratorV2(**mockup_generator_kwargs())
+    report = get_bundle_store(GARMENT_BUNDLE_DIR).compile_all(generator, force=force)
+    for entry in report:
+        click.echo(f"{entry['status']:>8}  {entry['garment']} ({entry['views']} views, "
+                   f"{entry['bytes'] / (1024 * 1024):.1f} MB)")
+    built = sum(1 for entry in report if entry['status'] == 'built')
+    click.echo(f'{built} of {len(report)} garment bundles rebuilt in {GARMENT_BUNDLE_DIR}')
+
+@app.cli.command('sync-fabric-images')
+@click.option('--chunk-size', default=1000, show_default=True, help='Fabrics updated per transaction.')
+@click.option('--dry-run', is_flag=True, help='Report changes without writing them.')
+def sync_fabric_images_command(chunk_size, dry_run):
+    """Sets Fabric.image_path from the swatch directory and clears paths whose files are gone."""
+    report = sync_image_paths(db, FABRIC_SWATCH_DIR, chunk_size=chunk_size, dry_run=dry_run)
+    prefix = 'Would update' if dry_run else 'Updated'
+    click.echo(f"Scanned {report['scanned']} fabrics against {report['files']} swatch files "
+               f"in {report['seconds']:.1f}s")
+    click.echo(f"{prefix}: {report['set']} set, {report['repaired']} repaired, {report['cleared']} cleared "
+               f"({report['unchanged']} unchanged, {report['missing']} without a swatch)")
+
+@app.cli.command('prune-mockups')
+@click.option('--max-age-days', type=int, default=settings.MOCKUP_OUTPUT_MAX_AGE_DAYS, show_default=True,
+              help='Delete renders unused for this many days (0 = no age limit).')
+@click.option('--max-mb', type=int, default=settings.MOCKUP_OUTPUT_MAX_MB, show_default=True,
+              help='Then keep the most recently used renders within this size (0 = no limit).')
+@click.option('--dry-run', is_flag=True, help='Report what would be deleted without deleting it.')
+def prune_mockups_command(max_age_days, max_mb, dry_run):
+    """Deletes rendered mockups that are no longer used (superseded renders go first)."""
+    report = prune_outputs(
+        MOCKUP_DIR_OUTPUT,
+        max_age_seconds=max_age_days * 86400 if max_age_days else None,
+        max_bytes=max_mb * 1024 * 1024 if max_mb else None,
+        dry_run=dry_run
+    )
+    prefix = 'Would remove' if dry_run else 'Removed'
+    click.echo(f"{prefix} {report['removed']} of {report['scanned']} renders "
+               f"({report['removed_bytes'] / (1024 * 1024):.1f} MB) and {report['temp_removed']} temp files; "
+               f"{report['kept_bytes'] / (1024 * 1024):.1f} MB kept in {MOCKUP_DIR_OUTPUT}")
+
+def prewarm_garments():
+    """
+    Compiles every garment (full resolution and preview tier) before serving.
+    gunicorn.conf.py runs this once in the master (when_ready, with the app
+    preloaded); the forked workers and their render pool children then share
+    the read-only decoded pixels copy-on-write instead of each decoding every
+    template on first use. Never runs on import.
+    
+    Returns:
+        The warm-up report from MockupGeneratorV2.prewarm
+    """
+    start = time.perf_counter()
+    generator = MockupGeneratorV2(**mockup_generator_kwargs())
+    report = generator.prewarm(max_sizes=(None, RENDER_TIERS['preview']))
+    
+    for entry in report:
+        tier = 'full' if entry['max_size'] is None else f"{entry['max_size']}px"
+        note = '' if entry['resident'] else ' (not kept: over GARMENT_CACHE_MAX_MB)'
+        logger.info(
+            f"[Warm-up] {entry['garment']} ({entry['variant'] or 'single'}, {tier}): "
+            f"{entry['seconds'] * 1000:.0f} ms, {entry['bytes'] / (1024 * 1024):.1f} MB{note}"
+        )
+    stats = garment_cache.stats()
+    logger.info(
+        f"[Warm-up] {len(report)} garment views in {time.perf_counter() - start:.2f}s, "
+        f"{stats['bytes'] / (1024 * 1024):.1f} MB resident of {stats['max_bytes'] / (1024 * 1024):.0f} MB"
+    )
+    return report
+
+@app.cli.command('prewarm')
+def prewarm_command():
+    """Compiles every garment once and reports the time and memory it takes."""
+    report = prewarm_garments()
+    stats = garment_cache.stats()
+    click.echo(f"{len(report)} garment views compiled, {stats['bytes'] / (1024 * 1024):.1f} MB resident")
+
 if __name__ == '__main__':
-    # Production: Use gunicorn instead: gunicorn -w 4 -b 0.0.0.0:5000 api_server:app
+    # Production: Use gunicorn instead: gunicorn -w 4 -b 0.0.0.0:5000 api_server:app (see gunicorn.conf.py)
     # This block only runs in development mode
     if not os.path.exists(os.path.join(PROJECT_ROOT, 'instance')):
         os.makedirs(os.path.join(PROJECT_ROOT, 'instance'))
@@ -596,7 +1055,7 @@ if __name__ == '__main__':
     if not settings.FLASK_DEBUG:
         logger.warning(
             "WARNING: Running Flask development server in non-debug mode. "
-            "For production, use: gunicorn -w 4 -b 0.0.0.0:5000 api_server:app"
+            "For production, use: gunicorn -w 4 -b 0.0.0.0:5000 api_server:app (see gunicorn.conf.py)"
         )
     
     app.run(host=settings.FLASK_HOST, port=settings.FLASK_PORT, debug=settings.FLASK_DEBUG)
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Asset Index - in-memory filename index of an asset directory.
+
+Swatch, mockup and mask lookups used to probe the filesystem for every
+candidate extension (and fall back to listing the directory). An AssetIndex
+lists its directory once and answers lookups from a case-folded
+stem -> filenames map.
+
+The directory's mtime is re-checked at most once per REFRESH_INTERVAL_SECONDS,
+so files added or removed by other processes show up within that interval
+while lookups in between cost no syscalls. As with git's "racy clean" check,
+a listing taken within RACY_WINDOW_NS of the directory mtime is not trusted:
+entries added in the same timestamp tick are picked up by the next check.
+"""
+
+import os
+import threading
+import time
+
+REFRESH_INTERVAL_SECONDS = 1.0
+# Directory mtimes can be coarse; listings this close to the mtime are re-taken
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class AssetIndex:
+    """Case-insensitive filename index of one directory (not recursive)."""
+
+    def __init__(self, directory, refresh_interval=REFRESH_INTERVAL_SECONDS):
+        self.directory = directory
+        self.refresh_interval = refresh_interval
+        self._stems = {}  # casefolded stem -> [filename, ...]
+        self._filenames = []
+        self._mtime_ns = None
+        self._listed_ns = 0
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def _stale(self):
+        try:
+            mtime_ns = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return self._mtime_ns is not None
+        return mtime_ns != self._mtime_ns or self._listed_ns - mtime_ns < RACY_WINDOW_NS
+
+    def _rebuild(self):
+        stems = {}
+        filenames = []
+        try:
+            mtime_ns = os.stat(self.directory).st_mtime_ns
+            listed_ns = time.time_ns()
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        filenames.append(entry.name)
+        except OSError:
+            mtime_ns, listed_ns = None, 0
+        for filename in sorted(filenames):
+            stems.setdefault(os.path.splitext(filename)[0].casefold(), []).append(filename)
+        self._stems, self._filenames = stems, sorted(filenames)
+        self._mtime_ns, self._listed_ns = mtime_ns, listed_ns
+        self.rebuilds += 1
+
+    def refresh(self, force=False):
+        """Re-lists the directory if it changed (or unconditionally with force)."""
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+            return
+        with self._lock:
+            if force or self._checked_at is None or now - self._checked_at >= self.refresh_interval:
+                if force or self._stale():
+                    self._rebuild()
+                self._checked_at = now
+
+    def find(self, stem, extensions, any_extension=False):
+        """
+        Looks up a file by name without extension.
+
+        Exact-case matches win over case-insensitive ones; within each, the
+        earlier entry in `extensions` wins (compared case-insensitively).
+
+        Args:
+            stem: File name without extension (no directory components)
+            extensions: Accepted extensions in order of preference, e.g. ['.jpg', '.png']
+            any_extension: Also accept files with other extensions (ranked last)
+
+        Returns:
+            The filename (not the full path), or None
+        """
+        self.refresh()
+        candidates = self._stems.get(stem.casefold())
+        if not candidates:
+            return None
+        preference = [ext.lower() for ext in extensions]
+        best, best_rank = None, None
+        for filename in candidates:
+            name, ext = os.path.splitext(filename)
+            ext = ext.lower()
+            if ext in preference:
+                ext_rank = preference.index(ext)
+            elif any_extension:
+                ext_rank = len(preference)
+            else:
+                continue
+            rank = (name != stem, ext_rank)
+            if best_rank is None or rank < best_rank:
+                best, best_rank = filename, rank
+        return best
+
+    def filenames(self):
+        """Every filename in the directory, sorted."""
+        self.refresh()
+        return self._filenames
+
+    def stats(self):
+        return {"directory": self.directory, "files": len(self._filenames), "rebuilds": self.rebuilds}
+
+
+# ===== PROCESS-WIDE REGISTRY =====
+# Keyed by the directory string as given, so lookups do not resolve paths
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_asset_index(directory):
+    """Returns the process-wide AssetIndex for a directory."""
+    index = _indexes.get(directory)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(directory)
+            if index is None:
+                index = AssetIndex(directory)
+                _indexes[directory] = index
+    return index
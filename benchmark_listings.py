@@ -0,0 +1,198 @@
+"""
+Listing Benchmark - per-row CPU time and allocations of a fabric listing page.
+
+Builds the same page of LIVE fabrics three ways and reports CPU time per row
+and peak traced allocation per page, split into the query + row building
+stage and the JSON serialization stage:
+
+- orm: full Fabric entities with joined owners, dicts built field by field,
+  Flask's standard-library JSON encoder (how listings worked before)
+- detail: column-projected rows (fabric_listing) with the orjson provider
+- card: the compact card field set with the orjson provider
+
+The catalog is the load-test one: pass --database-url of a seeded database,
+or leave it out to seed a temporary SQLite catalog of --fabrics rows.
+
+Usage:
+    python benchmark_listings.py
+    python benchmark_listings.py --fabrics 100000 --limit 100 --output listings.json
+    python benchmark_listings.py --database-url sqlite:///instance/loadtest.db --search jersey
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+DEFAULT_FABRICS = 20_000
+DEFAULT_LIMIT = 100
+DEFAULT_REPEAT = 50
+VARIANTS = ("orm", "detail", "card")
+
+
+def orm_page(db, query, limit, find_swatch):
+    """The listing loop as it was: ORM entities, owners eagerly joined, one dict per row."""
+    from models import Fabric
+
+    results = []
+    for f in query.options(db.joinedload(Fabric.manufacturer)).order_by(Fabric.id).limit(limit).all():
+        owner_name = f.manufacturer.company_name if f.manufacturer else "Unknown"
+        image_filename = f.image_path if f.image_path else find_swatch(f.ref)
+        results.append({
+            "id": f.id, "ref": f.ref, "fabric_group": f.fabric_group,
+            "fabrication": f.fabrication, "gsm": f.gsm, "width": f.width,
+            "composition": f.composition, "status": f.status,
+            "owner_name": owner_name, "manufacturer_id": f.manufacturer_id,
+            "meta_data": f.meta_data or {},
+            "swatchUrl": f"/static/swatches/{image_filename}" if image_filename else None
+        })
+    return results
+
+
+def projected_page(query, limit, field_set, find_swatch):
+    from fabric_listing import listing_query, listing_rows
+    from models import Fabric, User
+
+    rows = listing_query(query, Fabric, User, field_set).order_by(Fabric.id).limit(limit).all()
+    return listing_rows(rows, field_set, find_swatch)
+
+
+def measure(fn, repeat):
+    """Median CPU seconds over `repeat` calls and the peak traced bytes of one call."""
+    fn()
+    cpu = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        cpu.append(time.process_time() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(cpu), peak
+
+
+def run_benchmark(app, db, limit=DEFAULT_LIMIT, repeat=DEFAULT_REPEAT, search=None):
+    from flask.json.provider import DefaultJSONProvider
+    from fabric_search import apply_search
+    from json_provider import OrjsonProvider, orjson
+    from models import Fabric
+
+    if orjson is None:
+        raise SystemExit("orjson is not installed; the detail/card variants need it")
+    encoders = {"orm": DefaultJSONProvider(app), "detail": OrjsonProvider(app), "card": OrjsonProvider(app)}
+    find_swatch = lambda ref: None  # Filesystem lookups are benchmarked separately (asset_index)
+
+    results = []
+    with app.app_context():
+        def base_query():
+            query = Fabric.query.filter_by(status='LIVE')
+            if search:
+                query, _rank = apply_search(query, Fabric, search, db.session)
+            return query
+
+        for variant in VARIANTS:
+            if variant == "orm":
+                build = lambda: orm_page(db, base_query(), limit, find_swatch)
+            else:
+                build = lambda variant=variant: projected_page(base_query(), limit, variant, find_swatch)
+
+            def build_page():
+                page = build()
+                db.session.remove()
+                return page
+
+            page = build_page()
+            rows = len(page)
+            if not rows:
+                raise SystemExit("The listing is empty; seed the catalog first")
+            # What jsonify() does with the app's provider
+            encode = lambda: encoders[variant].response({"results": page}).get_data()
+            build_cpu, build_peak = measure(build_page, repeat)
+            encode_cpu, encode_peak = measure(encode, repeat)
+            total_cpu, total_peak = measure(
+                lambda: encoders[variant].response({"results": build_page()}).get_data(), repeat)
+            results.append({
+                "variant": variant,
+                "rows": rows,
+                "bytes": len(encode()),
+                "build_us_per_row": round(build_cpu / rows * 1e6, 2),
+                "serialize_us_per_row": round(encode_cpu / rows * 1e6, 2),
+                "total_us_per_row": round(total_cpu / rows * 1e6, 2),
+                "build_peak_kb": round(build_peak / 1024, 1),
+                "serialize_peak_kb": round(encode_peak / 1024, 1),
+                "total_peak_kb": round(total_peak / 1024, 1),
+            })
+    return results
+
+
+def print_summary(results):
+    print(f"{'variant':<8} {'rows':>5} {'KB':>7} {'build us/row':>13} {'json us/row':>12} "
+          f"{'total us/row':>13} {'peak KB':>8}")
+    for r in results:
+        print(f"{r['variant']:<8} {r['rows']:>5} {r['bytes'] / 1024:>7.1f} {r['build_us_per_row']:>13.1f} "
+              f"{r['serialize_us_per_row']:>12.1f} {r['total_us_per_row']:>13.1f} {r['total_peak_kb']:>8.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark fabric listing pages (ORM vs projected + orjson).")
+    parser.add_argument("--database-url", help="Seeded catalog to read (default: a temporary SQLite catalog)")
+    parser.add_argument("--fabrics", type=int, default=DEFAULT_FABRICS, help="Rows to seed without --database-url")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="Rows per page")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--search", help="Benchmark a search page instead of the plain listing")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    temp_dir = None
+    if not args.database_url:
+        temp_dir = tempfile.mkdtemp(prefix="benchmark-listings-")
+        args.database_url = f"sqlite:///{os.path.join(temp_dir, 'catalog.db')}"
+    # The app reads these at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    import api_server
+    from api_server import app, db
+    from loadtest_catalog import seed_catalog
+    logging.getLogger(api_server.__name__).setLevel(logging.WARNING)
+
+    try:
+        if temp_dir:
+            with app.app_context():
+                seeding = seed_catalog(db, args.fabrics)
+            print(f"Seeded {seeding['fabrics']:,} fabrics in {seeding['seconds']:.1f}s", file=sys.stderr)
+        results = run_benchmark(app, db, limit=args.limit, repeat=args.repeat, search=args.search)
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    print_summary(results)
+    report = {
+        "results": results,
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": args.database_url.split("://")[0],
+            "search": args.search,
+            "limit": args.limit,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
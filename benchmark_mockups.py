@@ -0,0 +1,295 @@
+"""
+Mockup Benchmark - renders every garment view in the catalog against
+synthetic swatches and reports latency, peak memory and output size.
+
+Each engine x encoder configuration runs in a fresh (spawned) process, so
+peak RSS is that configuration's own high-water mark. Results are written as
+JSON; with --baseline the run fails (exit code 1) when a median latency or
+peak RSS regresses by more than --tolerance.
+
+Usage:
+    python benchmark_mockups.py --output bench.json
+    python benchmark_mockups.py --baseline benchmarks/baseline.json
+    python benchmark_mockups.py --save-baseline benchmarks/baseline.json
+    python benchmark_mockups.py --engines numpy --formats PNG --resolutions 1024 --garments "men polo"
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import PIL
+from PIL import Image
+
+from mockup_library import MockupGeneratorV2, GarmentCache, ENGINES
+from render_metrics import StageTimer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_RESOLUTIONS = (512, 1500, 3000)
+DEFAULT_FORMATS = ("PNG", "WEBP", "JPEG")
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25
+# Latencies below this are dominated by noise and never count as regressions
+MIN_COMPARABLE_MS = 5.0
+
+
+def make_swatches(directory, resolutions, seed=0):
+    """
+    Writes one synthetic JPEG swatch per resolution (square, noisy woven
+    pattern so encoders cannot cheat on flat colour).
+
+    Returns:
+        {resolution: fabric reference}
+    """
+    rng = np.random.default_rng(seed)
+    refs = {}
+    for resolution in resolutions:
+        y, x = np.mgrid[0:resolution, 0:resolution]
+        weave = ((x // 8 + y // 8) % 2) * 60
+        pixels = np.stack([
+            120 + weave + rng.integers(0, 40, (resolution, resolution)),
+            60 + (x * 90 // resolution) + rng.integers(0, 40, (resolution, resolution)),
+            150 - weave // 2 + rng.integers(0, 40, (resolution, resolution)),
+        ], axis=-1).clip(0, 255).astype(np.uint8)
+        ref = f"BENCH-{resolution}"
+        Image.fromarray(pixels).save(os.path.join(directory, f"{ref}.jpg"), quality=92)
+        refs[resolution] = ref
+    return refs
+
+
+def peak_rss_bytes():
+    """High-water RSS of this process, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def run_config(config):
+    """
+    Benchmarks one engine/encoder configuration (runs in a worker process).
+
+    Args:
+        config: dict with engine, format, mockup_dir, mask_dir, swatch_dir,
+                swatches ({resolution: ref}), repeat and garments (names or None)
+
+    Returns:
+        {"results": [...], "peak_rss_bytes": int or None}
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir, open(os.devnull, 'w') as devnull:
+        generator = MockupGeneratorV2(
+            config["swatch_dir"], config["mockup_dir"], config["mask_dir"], output_dir,
+            cache=GarmentCache(), engine=config["engine"], output_format=config["format"]
+        )
+        with contextlib.redirect_stdout(devnull):
+            garments = generator.discover_garments()
+        if config["garments"]:
+            wanted = {name.lower() for name in config["garments"]}
+            garments = [g for g in garments if g[0].lower() in wanted]
+
+        for garment_name, variant, mockup_path, mask_path in garments:
+            # Cold compile once (template + mask decode), then measure warm renders
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(devnull):
+                garment = generator.get_compiled_garment(mockup_path, mask_path)
+            compile_ms = (time.perf_counter() - start) * 1000
+
+            for resolution, ref in sorted(config["swatches"].items()):
+                fabric_path = os.path.join(config["swatch_dir"], f"{ref}.jpg")
+                output_path = os.path.join(output_dir, f"out.{generator.encoder_for().extension}")
+                samples = []
+                stages = {}
+                for _ in range(config["repeat"]):
+                    generator.timer = StageTimer()
+                    start = time.perf_counter()
+                    with contextlib.redirect_stdout(devnull):
+                        ok = generator.apply_fabric_to_mockup(fabric_path, mockup_path, mask_path, output_path)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    if not ok:
+                        raise RuntimeError(f"Render failed: {garment_name} ({variant}) @ {resolution}")
+                    for stage, (seconds, _) in generator.timer.totals().items():
+                        stages.setdefault(stage, []).append(seconds * 1000)
+                generator.timer = None
+
+                results.append({
+                    "engine": config["engine"],
+                    "format": config["format"],
+                    "resolution": resolution,
+                    "garment": garment_name,
+                    "variant": variant,
+                    "template_size": list(garment.size),
+                    "compile_ms": round(compile_ms, 2),
+                    "p50_ms": round(statistics.median(samples), 2),
+                    "p95_ms": round(percentile(samples, 95), 2),
+                    "max_ms": round(max(samples), 2),
+                    "stages_p50_ms": {stage: round(statistics.median(v), 2) for stage, v in stages.items()},
+                    "output_bytes": os.path.getsize(output_path),
+                })
+    return {"results": results, "peak_rss_bytes": peak_rss_bytes()}
+
+
+def result_key(result):
+    return (result["engine"], result["format"], result["resolution"], result["garment"], result["variant"])
+
+
+def compare_to_baseline(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Lists regressions of a report against a baseline report.
+
+    A result regresses when its median latency exceeds the baseline median by
+    more than `tolerance` (a fraction, 0.25 = 25%); a configuration regresses
+    when its peak RSS does. Entries missing from either side are ignored.
+
+    Returns:
+        List of human-readable regression descriptions (empty = pass)
+    """
+    regressions = []
+    baseline_results = {result_key(r): r for r in baseline.get("results", [])}
+    for result in report["results"]:
+        previous = baseline_results.get(result_key(result))
+        if previous is None or max(previous["p50_ms"], result["p50_ms"]) < MIN_COMPARABLE_MS:
+            continue
+        if result["p50_ms"] > previous["p50_ms"] * (1 + tolerance):
+            engine, fmt, resolution, garment, variant = result_key(result)
+            regressions.append(
+                f"{garment} ({variant or 'single'}) {engine}/{fmt} @ {resolution}px: "
+                f"p50 {previous['p50_ms']:.1f} -> {result['p50_ms']:.1f} ms"
+            )
+
+    for config, peak in report.get("peak_rss_bytes", {}).items():
+        previous = baseline.get("peak_rss_bytes", {}).get(config)
+        if peak and previous and peak > previous * (1 + tolerance):
+            regressions.append(f"{config}: peak RSS {previous / 2**20:.0f} -> {peak / 2**20:.0f} MB")
+    return regressions
+
+
+def run_benchmark(mockup_dir, mask_dir, engines=ENGINES, formats=DEFAULT_FORMATS,
+                  resolutions=DEFAULT_RESOLUTIONS, repeat=DEFAULT_REPEAT, garments=None, isolate=True):
+    """
+    Runs every engine x encoder configuration and assembles the JSON report.
+
+    Args:
+        isolate: Run each configuration in a fresh spawned process (accurate peak
+                 RSS); False runs in-process, e.g. for tests
+
+    Returns:
+        Report dict (meta, results, peak_rss_bytes per 'engine/format')
+    """
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "resolutions": list(resolutions),
+        },
+        "results": [],
+        "peak_rss_bytes": {},
+    }
+    with tempfile.TemporaryDirectory() as swatch_dir:
+        swatches = make_swatches(swatch_dir, resolutions)
+        for engine in engines:
+            for fmt in formats:
+                config = {
+                    "engine": engine, "format": fmt, "mockup_dir": mockup_dir, "mask_dir": mask_dir,
+                    "swatch_dir": swatch_dir, "swatches": swatches, "repeat": repeat, "garments": garments,
+                }
+                print(f"Benchmarking {engine}/{fmt}...", file=sys.stderr)
+                if isolate:
+                    context = multiprocessing.get_context("spawn")
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                        outcome = executor.submit(run_config, config).result()
+                else:
+                    outcome = run_config(config)
+                report["results"].extend(outcome["results"])
+                report["peak_rss_bytes"][f"{engine}/{fmt}"] = outcome["peak_rss_bytes"]
+    return report
+
+
+def print_summary(report):
+    print(f"{'garment':<28} {'engine/format':<14} {'res':>5} {'p50 ms':>9} {'p95 ms':>9} {'output':>10}")
+    for r in report["results"]:
+        name = f"{r['garment']} ({r['variant'] or 'single'})"
+        print(f"{name:<28} {r['engine'] + '/' + r['format']:<14} {r['resolution']:>5} "
+              f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['output_bytes'] / 1024:>8.0f}KB")
+    for config, peak in report["peak_rss_bytes"].items():
+        if peak:
+            print(f"peak RSS {config}: {peak / 2**20:.0f} MB")
+
+
+def main(argv=None):
+    from config import settings
+
+    parser = argparse.ArgumentParser(description="Benchmark the mockup engine over the garment catalog.")
+    parser.add_argument("--mockup-dir", default=str(settings.mockup_dir_path))
+    parser.add_argument("--mask-dir", default=str(settings.mask_dir_path))
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    parser.add_argument("--formats", default=",".join(DEFAULT_FORMATS))
+    parser.add_argument("--resolutions", default=",".join(str(r) for r in DEFAULT_RESOLUTIONS),
+                        help="Comma-separated swatch edge lengths in pixels")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--garments", help="Comma-separated base garment names (default: all)")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Fail if results regress against this JSON report")
+    parser.add_argument("--save-baseline", help="Write the report as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown as a fraction (default 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        args.mockup_dir, args.mask_dir,
+        engines=args.engines.split(","),
+        formats=[f.upper() for f in args.formats.split(",")],
+        resolutions=[int(r) for r in args.resolutions.split(",")],
+        repeat=args.repeat,
+        garments=args.garments.split(",") if args.garments else None,
+    )
+    print_summary(report)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"Wrote {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+Catalog Cache - version-stamped caching for catalog read endpoints.
+
+Catalog reads (filter facets, search responses) are recomputed only when the
+catalog changes. Every committed Fabric insert/update/delete bumps a
+CatalogVersion (see track_changes); cached values are stored together with
+the version they were computed at and are ignored once the version moves on,
+so nothing has to be deleted on write.
+
+The version is a small token file (written atomically, like render job
+state) so a bump by one gunicorn worker is seen by all of them. Reading it
+costs one stat() per call; the file is only re-read when it was replaced.
+
+Two cache backends share one interface: VersionedCache (per-process LRU)
+and FileCache (a directory shared by every worker on the host).
+"""
+
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+DEFAULT_MAX_ENTRIES = 256
+# Version of a catalog that was never bumped (no version file yet)
+INITIAL_VERSION = "0"
+
+_MISSING = object()
+
+
+class CatalogVersion:
+    """Catalog version token shared by every process through a file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._stat_key = None
+        self._token = INITIAL_VERSION
+        self._lock = threading.Lock()
+
+    def current(self):
+        """The current version token (a short string)."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return INITIAL_VERSION
+        # A bump replaces the file, so the inode changes even within one mtime tick
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key != self._stat_key:
+            with self._lock:
+                try:
+                    with open(self.path, encoding='utf-8') as f:
+                        token = f.read().strip() or INITIAL_VERSION
+                except OSError:
+                    return INITIAL_VERSION
+                self._stat_key, self._token = key, token
+        return self._token
+
+    def bump(self):
+        """Marks the catalog as changed; returns the new version token."""
+        token = uuid.uuid4().hex[:16]
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(token)
+        os.replace(tmp_path, self.path)
+        return token
+
+
+class VersionedCache:
+    """
+    Thread-safe LRU cache whose entries are only valid for one catalog version.
+
+    Entries from an older version count as misses and are overwritten by the
+    next put; unused keys age out through the LRU bound.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (version, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, version, compute):
+        """
+        Returns the cached value for (key, version), calling compute() on a miss.
+        Concurrent misses may compute twice; the value is the same either way.
+        """
+        value = self.get(key, version, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, version, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"entries": len(self._entries), "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses}
+
+
+class FileCache:
+    """
+    VersionedCache interface over a directory shared by every worker process.
+
+    Values must be bytes. Each entry is one file named after its version and
+    key, written atomically; entries of older versions are never read and are
+    removed by the next prune. Pruning keeps the newest `max_entries` files by
+    mtime (hits touch their file, so this approximates LRU).
+    """
+
+    def __init__(self, directory, max_entries=DEFAULT_MAX_ENTRIES, prune_interval=64):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.prune_interval = prune_interval
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key, version):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{version}-{digest}.bin")
+
+    def get(self, key, version, default=None):
+        path = self._path(key, version)
+        try:
+            with open(path, 'rb') as f:
+                value = f.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key, version, value):
+        if self.max_entries <= 0:
+            return
+        path = self._path(key, version)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"  Warning: could not write cache entry {path}: {e}")
+            return
+        self._puts += 1
+        if self._puts % self.prune_interval == 0:
+            self.prune(version)
+
+    def get_or_compute(self, key, version, compute):
+        value = self.get(key, version, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, version, value)
+        return value
+
+    def prune(self, version):
+        """Deletes entries of other versions and the least recently used beyond max_entries."""
+        current, rest = [], []
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.bin'):
+                        continue
+                    if entry.name.startswith(f"{version}-"):
+                        try:
+                            current.append((entry.stat().st_mtime_ns, entry.path))
+                        except OSError:
+                            continue
+                    else:
+                        rest.append(entry.path)
+        except OSError:
+            return
+        current.sort(reverse=True)
+        for path in rest + [path for _mtime, path in current[self.max_entries:]]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        self.prune(None)
+
+    def stats(self):
+        return {"directory": self.directory, "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses}
+
+
+def track_changes(session, model, on_change):
+    """
+    Calls on_change() after every commit that inserted, updated or deleted
+    rows of `model`, through the unit of work or bulk insert/update/delete
+    statements. Rolled back changes are forgotten.
+
+    Args:
+        session: Session, sessionmaker or scoped_session to listen on
+        model: Mapped class to watch
+        on_change: Callable without arguments (e.g. a CatalogVersion bump)
+    """
+    def touches_model(instances):
+        return any(isinstance(obj, model) for obj in instances)
+
+    @event.listens_for(session, 'after_flush')
+    def after_flush(sess, flush_context):
+        if touches_model(sess.new) or touches_model(sess.dirty) or touches_model(sess.deleted):
+            sess.info['catalog_changed'] = True
+
+    @event.listens_for(session, 'do_orm_execute')
+    def do_orm_execute(state):
+        if (state.is_insert or state.is_update or state.is_delete) and \
+                any(mapper.class_ is model for mapper in state.all_mappers):
+            state.session.info['catalog_changed'] = True
+
+    @event.listens_for(session, 'after_commit')
+    def after_commit(sess):
+        if sess.info.pop('catalog_changed', False):
+            on_change()
+
+    @event.listens_for(session, 'after_rollback')
+    def after_rollback(sess):
+        sess.info.pop('catalog_changed', None)
@@ -5,7 +5,7 @@ Uses pydantic-settings to validate all required environment variables on startup
 
 import os
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -37,6 +37,8 @@ class Settings(BaseSettings):
     MASK_DIR: str = Field(default="masks", description="Directory containing mask files")
     SILHOUETTE_DIR: str = Field(default="silhouettes", description="Directory containing silhouette images")
     MOCKUP_OUTPUT_DIR: str = Field(default="generated_mockups", description="Directory for generated mockups")
+    MOCKUP_OUTPUT_MAX_AGE_DAYS: int = Field(default=30, ge=0, description="prune-mockups deletes renders unused for this many days (0 = no age limit)")
+    MOCKUP_OUTPUT_MAX_MB: int = Field(default=0, ge=0, description="prune-mockups then keeps the most recently used renders within this size (MB, 0 = no limit)")
     PDF_OUTPUT_DIR: str = Field(default="generated_techpacks", description="Directory for generated techpacks")
     EXCEL_DIR: str = Field(default="Excel_files", description="Directory containing Excel database files")
     IMAGE_DIR: str = Field(default="images", description="Directory for general images")
@@ -54,6 +56,33 @@ class Settings(BaseSettings):
     DEFAULT_FABRIC_RESOLUTION_HEIGHT: int = Field(default=2000, description="Default fabric image height in pixels")
     OUTPUT_FORMAT: str = Field(default="PNG", description="Default output image format")
     OUTPUT_QUALITY: int = Field(default=95, ge=1, le=100, description="Output image quality (1-100)")
+    PNG_COMPRESS_LEVEL: int = Field(default=6, ge=0, le=9, description="zlib level for full-resolution PNG mockups (0-9)")
+    WEBP_LOSSLESS: bool = Field(default=False, description="Encode WebP mockups losslessly")
+    
+    # ===== Mockup Rendering =====
+    GARMENT_CACHE_MAX_MB: int = Field(default=512, ge=0, description="Memory budget for decoded garment templates/masks (MB)")
+    MOCKUP_ENGINE: str = Field(default="pil", description="Compositing engine: 'pil' (full canvas) or 'numpy' (mask bbox only)")
+    RENDER_POOL_WORKERS: int = Field(default=2, ge=1, description="Worker processes per API worker for batch mockup rendering")
+    MOCKUP_BATCH_MAX_ITEMS: int = Field(default=10, ge=1, description="Maximum fabric x garment pairs per batch request (keep within MOCKUP_RATE_LIMIT)")
+    MOCKUP_RATE_LIMIT: str = Field(default="10 per minute", description="Rate limit for mockup renders, counted per rendered item")
+    RENDER_JOB_DIR: str = Field(default="instance/render_jobs", description="Directory for asynchronous render job state")
+    RENDER_JOB_TTL_SECONDS: int = Field(default=3600, ge=60, description="How long finished render jobs stay queryable")
+    RENDER_JOB_STALE_SECONDS: int = Field(default=600, ge=30, description="Unfinished render jobs older than this are reported as failed")
+    RENDER_JOB_POLL_SECONDS: int = Field(default=1, ge=1, description="Retry-After sent with the status of an unfinished render job")
+    PREWARM_GARMENTS: bool = Field(default=True, description="Compile every garment in the gunicorn master before forking workers (gunicorn.conf.py)")
+    GARMENT_BUNDLE_DIR: str = Field(default="instance/garment_bundles", description="Directory for precompiled garment bundles (empty = disabled)")
+    RENDER_MEMORY_BUDGET_MB: int = Field(default=1024, ge=1, description="Estimated peak memory allowed for in-flight renders on this host, all API workers together (MB)")
+    RENDER_ADMISSION_FILE: str = Field(default="instance/render_admission", description="Ledger file sharing RENDER_MEMORY_BUDGET_MB across API workers (empty = budget per worker)")
+    RENDER_ADMISSION_WAIT_SECONDS: float = Field(default=2.0, ge=0, description="How long a render waits for memory before getting a 503")
+    RENDER_RETRY_AFTER_SECONDS: int = Field(default=5, ge=1, description="Retry-After sent when a render is rejected for memory")
+    SWATCH_PYRAMID_DIR: str = Field(default="instance/swatch_pyramid", description="Directory for pre-decoded swatch mip levels (empty = disabled)")
+    SWATCH_CACHE_MAX_MB: int = Field(default=256, ge=0, description="Memory budget for swatch mip levels per process (MB)")
+    SWATCH_PYRAMID_DISK_MAX_MB: int = Field(default=1024, ge=0, description="Disk budget for SWATCH_PYRAMID_DIR, least recently used levels are deleted beyond it (MB, 0 = memory only)")
+    CATALOG_VERSION_FILE: str = Field(default="instance/catalog_version", description="File whose token changes on every catalog write (invalidates cached catalog reads)")
+    FACET_CACHE_MAX_ENTRIES: int = Field(default=256, ge=0, description="Searches whose facet counts are cached per process (0 = disabled)")
+    RESPONSE_CACHE_BACKEND: str = Field(default="memory", description="Search response cache: 'memory' (per process LRU) or 'file' (shared by workers)")
+    RESPONSE_CACHE_MAX_ENTRIES: int = Field(default=1024, ge=0, description="Cached search responses (0 = disabled)")
+    RESPONSE_CACHE_DIR: str = Field(default="instance/response_cache", description="Directory of the shared 'file' response cache")
     
     # ===== Techpack Coordinates (for PDF generation) =====
     TECHPACK_TOTAL_TEMPLATE_WIDTH_PX: int = Field(default=2480, description="Total techpack template width in pixels")
@@ -74,6 +103,7 @@ class Settings(BaseSettings):
     ADMIN_PASSWORD: str = Field(..., description="Admin password")
     MASCO_PASSWORD: str = Field(default="masco123", description="Masco manufacturer user password")
     CORS_ALLOWED_ORIGINS: str = Field(default="http://localhost:5173,http://localhost:3000,http://localhost:3001", description="Comma-separated list of allowed CORS origins")
+    RATE_LIMIT_ENABLED: bool = Field(default=True, description="Enforce per-client API rate limits (disable only for load tests)")
     
     @field_validator("OUTPUT_FORMAT")
     @classmethod
@@ -84,6 +114,24 @@ class Settings(BaseSettings):
             raise ValueError(f"OUTPUT_FORMAT must be one of {allowed}")
         return v.upper()
     
+    @field_validator("RESPONSE_CACHE_BACKEND")
+    @classmethod
+    def validate_response_cache_backend(cls, v: str) -> str:
+        """Validate response cache backend is supported."""
+        allowed = ["memory", "file"]
+        if v.lower() not in allowed:
+            raise ValueError(f"RESPONSE_CACHE_BACKEND must be one of {allowed}")
+        return v.lower()
+    
+    @field_validator("MOCKUP_ENGINE")
+    @classmethod
+    def validate_mockup_engine(cls, v: str) -> str:
+        """Validate compositing engine is supported."""
+        allowed = ["pil", "numpy"]
+        if v.lower() not in allowed:
+            raise ValueError(f"MOCKUP_ENGINE must be one of {allowed}")
+        return v.lower()
+    
     @property
     def project_root_path(self) -> Path:
         """Get PROJECT_ROOT as Path object."""
@@ -161,6 +209,60 @@ class Settings(BaseSettings):
             return path
         return self.project_root_path / path
     
+    @property
+    def render_job_dir_path(self) -> Path:
+        """Get absolute path to render job state directory."""
+        path = Path(self.RENDER_JOB_DIR)
+        if path.is_absolute():
+            return path
+        return self.project_root_path / path
+    
+    @property
+    def render_admission_file_path(self) -> Optional[Path]:
+        """Get absolute path to the render admission ledger (None = per-worker budget)."""
+        if not self.RENDER_ADMISSION_FILE:
+            return None
+        path = Path(self.RENDER_ADMISSION_FILE)
+        if path.is_absolute():
+            return path
+        return self.project_root_path / path
+    
+    @property
+    def catalog_version_file_path(self) -> Path:
+        """Get absolute path to the catalog version file."""
+        path = Path(self.CATALOG_VERSION_FILE)
+        if path.is_absolute():
+            return path
+        return self.project_root_path / path
+    
+    @property
+    def response_cache_dir_path(self) -> Path:
+        """Get absolute path to the shared response cache directory."""
+        path = Path(self.RESPONSE_CACHE_DIR)
+        if path.is_absolute():
+            return path
+        return self.project_root_path / path
+    
+    @property
+    def garment_bundle_dir_path(self) -> Optional[Path]:
+        """Get absolute path to garment bundle directory (None when disabled)."""
+        if not self.GARMENT_BUNDLE_DIR:
+            return None
+        path = Path(self.GARMENT_BUNDLE_DIR)
+        if path.is_absolute():
+            return path
+        return self.project_root_path / path
+    
+    @property
+    def swatch_pyramid_dir_path(self) -> Optional[Path]:
+        """Get absolute path to swatch pyramid directory (None when disabled)."""
+        if not self.SWATCH_PYRAMID_DIR:
+            return None
+        path = Path(self.SWATCH_PYRAMID_DIR)
+        if path.is_absolute():
+            return path
+        return self.project_root_path / path
+    
     @property
     def database_path(self) -> Path:
         """Get absolute path to fabric database file."""
@@ -211,7 +313,11 @@ class Settings(BaseSettings):
             self.mask_dir_path,
             self.excel_dir_path,
             self.techpack_template_dir_path,
+            self.render_job_dir_path,
         ]
+        for optional_dir in (self.garment_bundle_dir_path, self.swatch_pyramid_dir_path):
+            if optional_dir is not None:
+                directories.append(optional_dir)
         
         for directory in directories:
             directory.mkdir(parents=True, exist_ok=True)
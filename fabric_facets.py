@@ -0,0 +1,87 @@
+"""
+Fabric Facets - group and weight-band counts for the search filter sidebar.
+
+One grouped query counts the matching fabrics per (fabric_group, weight band).
+That matrix depends only on the search term, so it is what gets cached; the
+counts for the current group/weight selection are summed from it in Python.
+Each facet is counted with the other facet's filter applied but not its own,
+so the sidebar still shows how many fabrics every other option would give.
+"""
+
+import sqlalchemy as sa
+
+# Weight bands on gsm, in display order: (name, label)
+WEIGHT_BANDS = [
+    ("light", "Lightweight (<160 GSM)"),
+    ("medium", "Midweight (160-240 GSM)"),
+    ("heavy", "Heavyweight (>240 GSM)"),
+]
+WEIGHT_BAND_NAMES = [name for name, _label in WEIGHT_BANDS]
+
+
+def weight_filter(model, band):
+    """SQL condition for a weight band name, or None for an unknown band."""
+    if band == "light":
+        return model.gsm < 160
+    if band == "medium":
+        return model.gsm.between(160, 240)
+    if band == "heavy":
+        return model.gsm > 240
+    return None
+
+
+def group_matches(group, filter_group):
+    """Python equivalent of the search's `fabric_group ILIKE '%filter%'`."""
+    return not filter_group or filter_group.casefold() in (group or '').casefold()
+
+
+def facet_matrix(query, model):
+    """
+    Counts the rows of `query` per (fabric_group, weight band) in one grouped query.
+
+    Args:
+        query: Fabric query with the search applied (but not group/weight filters)
+        model: The Fabric model class
+
+    Returns:
+        List of (fabric_group, band, count); band is None for rows without a gsm
+    """
+    band = sa.case(*[(weight_filter(model, name), name) for name in WEIGHT_BAND_NAMES], else_=None)
+    rows = (query.order_by(None)
+            .with_entities(model.fabric_group, band.label("band"), sa.func.count())
+            .group_by(model.fabric_group, "band")
+            .all())
+    return [(group, band, count) for group, band, count in rows]
+
+
+def summarize_facets(matrix, filter_group='', filter_weight=''):
+    """
+    Facet counts for the current filters from a facet_matrix.
+
+    Returns:
+        Dict with "groups" ([{"name", "count"}] by name, cleaned and merged),
+        "weights" ([{"band", "label", "count"}] in band order) and "total"
+        (rows matching the search and both filters)
+    """
+    group_counts = {}
+    band_counts = dict.fromkeys(WEIGHT_BAND_NAMES, 0)
+    # Unknown bands are ignored by the search too
+    if filter_weight not in band_counts:
+        filter_weight = ''
+    total = 0
+    for group, band, count in matrix:
+        in_group = group_matches(group, filter_group)
+        in_band = not filter_weight or band == filter_weight
+        name = str(group).strip() if group is not None else ''
+        if in_band and name:
+            group_counts[name] = group_counts.get(name, 0) + count
+        if in_group and band in band_counts:
+            band_counts[band] += count
+        if in_group and in_band:
+            total += count
+    return {
+        "groups": [{"name": name, "count": group_counts[name]} for name in sorted(group_counts)],
+        "weights": [{"band": name, "label": label, "count": band_counts[name]}
+                    for name, label in WEIGHT_BANDS],
+        "total": total,
+    }
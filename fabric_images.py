@@ -0,0 +1,91 @@
+"""
+Fabric Images - keeps Fabric.image_path in sync with the swatch directory.
+
+Search, admin lists and fabric detail use the stored image_path and only fall
+back to a filename lookup for rows without one. sync_image_paths resolves the
+swatch of every fabric from a single listing of the swatch directory and
+writes the changes back in chunked bulk updates:
+
+- rows without a path get the swatch matching their ref, if there is one
+- rows whose file has disappeared get the matching swatch or NULL
+- rows whose file still exists are left alone (it may not be named after the ref)
+"""
+
+import os
+import time
+
+from asset_index import get_asset_index
+
+SWATCH_EXTENSIONS = ('.jpg', '.png', '.jpeg', '.webp')
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def resolve_swatch(index, ref):
+    """Swatch filename for a fabric ref from an AssetIndex, or None (also for unsafe refs)."""
+    ref = str(ref or '')
+    if not ref or os.path.basename(ref) != ref or '..' in ref or '\\' in ref:
+        return None
+    return index.find(ref, SWATCH_EXTENSIONS)
+
+
+def sync_image_paths(db, swatch_dir, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """
+    Backfills and repairs Fabric.image_path for the whole catalog.
+    Must run inside an app context; each chunk is committed separately.
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        swatch_dir: Directory the swatch URLs are served from
+        chunk_size: Rows read and updated per transaction
+        dry_run: Report what would change without writing
+
+    Returns:
+        Dict with counts: scanned, set, repaired, cleared, unchanged, missing
+        (rows left without a swatch), files and seconds
+    """
+    from models import Fabric
+
+    start = time.perf_counter()
+    index = get_asset_index(swatch_dir)
+    index.refresh(force=True)
+    existing = set(index.filenames())
+
+    report = {"scanned": 0, "set": 0, "repaired": 0, "cleared": 0, "unchanged": 0, "missing": 0}
+    last_id = 0
+    while True:
+        # Keyset pagination on the primary key: constant cost per chunk, stable under updates
+        rows = (db.session.query(Fabric.id, Fabric.ref, Fabric.image_path)
+                .filter(Fabric.id > last_id).order_by(Fabric.id).limit(chunk_size).all())
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates = []
+        for fabric_id, ref, image_path in rows:
+            report["scanned"] += 1
+            image_path = image_path or None
+            if image_path and image_path in existing:
+                report["unchanged"] += 1
+                continue
+            resolved = resolve_swatch(index, ref)
+            if resolved is None:
+                report["missing"] += 1
+            if resolved == image_path:
+                if resolved is not None:
+                    report["unchanged"] += 1
+                continue
+            if not image_path:
+                report["set"] += 1
+            elif resolved:
+                report["repaired"] += 1
+            else:
+                report["cleared"] += 1
+            updates.append({"id": fabric_id, "image_path": resolved})
+
+        if updates and not dry_run:
+            db.session.execute(db.update(Fabric), updates)
+            db.session.commit()
+
+    report["files"] = len(existing)
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
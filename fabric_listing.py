@@ -0,0 +1,68 @@
+"""
+Fabric Listing - column-projected rows for the fabric listing endpoints.
+
+Listings used to load full Fabric entities (every column including the
+meta_data JSON blob, plus identity-map bookkeeping per row) and the owning
+User, then copy them into dicts field by field. A listing query here selects
+only the columns its field set needs, with the owner's name joined in, and
+each result row becomes a dict in one pass.
+
+Field sets (the `fields` query parameter):
+- card: what search result cards, the selection panel and the mockup /
+  techpack modals read (no meta_data, status or manufacturer_id)
+- detail: every listing field (the default, the original response shape)
+"""
+
+import sqlalchemy as sa
+
+FIELD_SETS = {
+    "card": ("id", "ref", "fabric_group", "fabrication", "gsm", "width", "composition",
+             "owner_name", "swatchUrl"),
+    "detail": ("id", "ref", "fabric_group", "fabrication", "gsm", "width", "composition", "status",
+               "owner_name", "manufacturer_id", "meta_data", "swatchUrl"),
+}
+DEFAULT_FIELD_SET = "detail"
+# Fields that are not Fabric columns (filled in by listing_rows)
+COMPUTED_FIELDS = ("owner_name", "swatchUrl")
+
+
+def field_set_name(value):
+    """Field set for a `fields` parameter value (unknown values get the default)."""
+    return value if value in FIELD_SETS else DEFAULT_FIELD_SET
+
+
+def listing_query(query, model, owner_model, field_set):
+    """
+    Projects a Fabric query onto the columns of a field set.
+
+    Result rows hold the field set's Fabric columns in order, then image_path
+    and owner_name; columns added later (e.g. sort keys) follow those.
+    """
+    columns = [getattr(model, name) for name in FIELD_SETS[field_set] if name not in COMPUTED_FIELDS]
+    owner_name = sa.case((owner_model.id.is_(None), "Unknown"), else_=owner_model.company_name)
+    return (query.outerjoin(owner_model, model.manufacturer_id == owner_model.id)
+            .with_entities(*columns, model.image_path, owner_name.label("owner_name")))
+
+
+def listing_rows(rows, field_set, find_swatch):
+    """
+    Turns listing_query rows into response dicts.
+
+    Args:
+        rows: Result rows of a listing_query
+        field_set: Name of the field set the query was projected on
+        find_swatch: Callable ref -> swatch filename or None, for rows without an image_path
+    """
+    columns = [name for name in FIELD_SETS[field_set] if name not in COMPUTED_FIELDS]
+    n = len(columns)
+    with_meta = "meta_data" in columns
+    results = []
+    for row in rows:
+        item = dict(zip(columns, row))
+        item["owner_name"] = row[n + 1]
+        if with_meta:
+            item["meta_data"] = item["meta_data"] or {}
+        image_filename = row[n] or find_swatch(item["ref"])
+        item["swatchUrl"] = f"/static/swatches/{image_filename}" if image_filename else None
+        results.append(item)
+    return results
@@ -0,0 +1,240 @@
+"""
+Fabric Search - full-text index over fabric ref, fabrication and group.
+
+`ilike('%term%')` across three columns cannot use an index, so every search
+scanned the whole fabric table. The index is maintained by the database
+itself, so every write path (ORM, bulk inserts, admin edits) keeps it in sync:
+
+- SQLite: an external-content FTS5 table `fabric_fts` (prefix indexes for
+  2/3-character prefixes) and a trigram FTS5 table `fabric_fts_trigram` for
+  the substring matches, both kept current by insert/update/delete triggers.
+- PostgreSQL: a generated `search_vector` tsvector column with a GIN index,
+  plus a pg_trgm GIN index on the three columns for the substring matches.
+
+Search terms are split into words; every word must match as a prefix
+("slub jer" finds "Slub Jersey") and results come with a relevance rank
+(bm25 / ts_rank) to sort by. Substring matches of the whole term, which is
+what search always did ('000123' finds SJ000123, 'ersey' finds "Slub
+Jersey"), are kept as an OR and rank after every word match. Both come from
+an index: a leading-wildcard ilike would scan the whole table again. The
+trigram index needs at least 3 characters, so on SQLite 1-2 character terms
+only match word prefixes. Without an index (other databases, a database
+that has not been migrated yet, or SQLite older than 3.34 for the trigram
+table) searches fall back to the ilike scan.
+"""
+
+import re
+
+import sqlalchemy as sa
+
+FTS_TABLE = "fabric_fts"
+TRIGRAM_TABLE = "fabric_fts_trigram"
+# The trigram tokenizer indexes 3-character sequences; shorter terms match nothing
+MIN_TRIGRAM_TERM = 3
+SEARCH_VECTOR = "search_vector"
+SEARCH_INDEX = "ix_fabric_search_vector"
+TRIGRAM_INDEX = "ix_fabric_text_trgm"
+# bm25 column weights (ref, fabrication, fabric_group), matching the tsvector weights A/B/C
+BM25_RANK = "bm25(4.0, 2.0, 1.0)"
+
+
+
+def _sqlite_ddl(table, options):
+    """External-content FTS5 table over the fabric columns plus the triggers that keep it current."""
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+            ref, fabrication, fabric_group, content='fabric', content_rowid='id', {options})""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON fabric BEGIN
+            INSERT INTO {table}(rowid, ref, fabrication, fabric_group)
+            VALUES (new.id, new.ref, new.fabrication, new.fabric_group);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON fabric BEGIN
+            INSERT INTO {table}({table}, rowid, ref, fabrication, fabric_group)
+            VALUES ('delete', old.id, old.ref, old.fabrication, old.fabric_group);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF ref, fabrication, fabric_group ON fabric BEGIN
+            INSERT INTO {table}({table}, rowid, ref, fabrication, fabric_group)
+            VALUES ('delete', old.id, old.ref, old.fabrication, old.fabric_group);
+            INSERT INTO {table}(rowid, ref, fabrication, fabric_group)
+            VALUES (new.id, new.ref, new.fabrication, new.fabric_group);
+        END""",
+    ]
+
+
+_SQLITE_DDL = _sqlite_ddl(FTS_TABLE, "prefix='2 3'")
+# Needs SQLite 3.34+ (the trigram tokenizer)
+_SQLITE_TRIGRAM_DDL = _sqlite_ddl(TRIGRAM_TABLE, "tokenize='trigram'")
+
+_POSTGRES_DDL = [
+    f"""ALTER TABLE fabric ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR} tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(ref, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(fabrication, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(fabric_group, '')), 'C')) STORED""",
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON fabric USING gin ({SEARCH_VECTOR})",
+]
+
+# Databases (by engine URL) known to have the index / the SQLite trigram table;
+# only positives are cached, so a database migrated while the app runs is picked up
+_available = set()
+_trigram_available = set()
+
+
+def is_search_object(name):
+    """True for tables/columns/indexes managed here (excluded from Alembic autogenerate)."""
+    return bool(name) and (name.startswith(FTS_TABLE) or name in (SEARCH_VECTOR, SEARCH_INDEX, TRIGRAM_INDEX))
+
+
+def create_search_index(connection, rebuild=False):
+    """
+    Creates the full-text index for the connection's dialect (idempotent).
+
+    Args:
+        connection: SQLAlchemy Connection (inside a transaction)
+        rebuild: Re-index existing rows (needed when adding the index to a
+                 populated SQLite table; PostgreSQL computes the column itself)
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        for statement in _SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', '{BM25_RANK}')")
+        if rebuild:
+            connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        try:
+            with connection.begin_nested():
+                for statement in _SQLITE_TRIGRAM_DDL:
+                    connection.exec_driver_sql(statement)
+                if rebuild:
+                    connection.exec_driver_sql(f"INSERT INTO {TRIGRAM_TABLE}({TRIGRAM_TABLE}) VALUES ('rebuild')")
+        except sa.exc.DBAPIError as e:
+            print(f"  Warning: FTS5 trigram tokenizer unavailable, substring search is not indexed: {e.orig}")
+    elif dialect == "postgresql":
+        for statement in _POSTGRES_DDL:
+            connection.exec_driver_sql(statement)
+        # pg_trgm may need a superuser to install; search still works without it
+        try:
+            with connection.begin_nested():
+                connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                connection.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON fabric USING gin "
+                    "(ref gin_trgm_ops, fabrication gin_trgm_ops, fabric_group gin_trgm_ops)")
+        except sa.exc.DBAPIError as e:
+            print(f"  Warning: pg_trgm unavailable, substring search is not indexed: {e.orig}")
+
+
+def drop_search_index(connection):
+    """Removes the full-text index (the triggers go with the fabric table on SQLite)."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        for table in (FTS_TABLE, TRIGRAM_TABLE):
+            for suffix in ("ai", "ad", "au"):
+                connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+    elif dialect == "postgresql":
+        connection.exec_driver_sql(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+        connection.exec_driver_sql(f"DROP INDEX IF EXISTS {SEARCH_INDEX}")
+        connection.exec_driver_sql(f"ALTER TABLE fabric DROP COLUMN IF EXISTS {SEARCH_VECTOR}")
+
+
+def search_available(session):
+    """True if the session's database has the full-text index."""
+    engine = session.get_bind()
+    key = str(engine.url)
+    if key in _available:
+        return True
+    inspector = sa.inspect(engine)
+    if engine.dialect.name == "sqlite":
+        found = FTS_TABLE in inspector.get_table_names()
+    elif engine.dialect.name == "postgresql":
+        found = any(c["name"] == SEARCH_VECTOR for c in inspector.get_columns("fabric"))
+    else:
+        found = False
+    if found:
+        _available.add(key)
+    return found
+
+
+def trigram_available(session):
+    """True if the session's SQLite database has the trigram substring index."""
+    engine = session.get_bind()
+    key = str(engine.url)
+    if key in _trigram_available:
+        return True
+    found = TRIGRAM_TABLE in sa.inspect(engine).get_table_names()
+    if found:
+        _trigram_available.add(key)
+    return found
+
+
+def search_words(term):
+    """Lower-cased words of a search term (punctuation such as '-' separates words)."""
+    return re.findall(r"\w+", term.casefold())
+
+
+def substring_filter(model, term):
+    """`term` anywhere in ref, fabrication or fabric_group (case-insensitive)."""
+    pattern = f"%{term}%"
+    return sa.or_(model.ref.ilike(pattern), model.fabrication.ilike(pattern), model.fabric_group.ilike(pattern))
+
+
+def apply_search(query, model, term, session, ranked=True):
+    """
+    Restricts a Fabric query to rows matching `term`.
+
+    Args:
+        query: Query over `model` (filters may already be applied)
+        model: The Fabric model class
+        term: Raw search text
+        session: Session the query runs in (to detect the index)
+        ranked: False when only the matching rows are needed (counts, facets),
+            which skips scoring them
+
+    Returns:
+        (query, rank): rank is an expression to sort by ascending (best match
+        first, a float), or None when not ranked or the unranked substring
+        match was used
+    """
+    words = search_words(term)
+    dialect = session.get_bind().dialect.name
+    if words and search_available(session):
+        if dialect == "sqlite":
+            fts = sa.table(FTS_TABLE, sa.column("rowid"), sa.column("rank", sa.Float))
+            fts_match = sa.literal_column(FTS_TABLE).op("MATCH")(" ".join(f'"{word}"*' for word in words))
+            if not trigram_available(session):
+                matches = sa.select(fts.c.rowid, fts.c.rank).where(fts_match).subquery("fts_match")
+                query = (query.outerjoin(matches, matches.c.rowid == model.id)
+                         .filter(sa.or_(matches.c.rowid.isnot(None), substring_filter(model, term))))
+                return query, sa.func.coalesce(matches.c.rank, 0.0) if ranked else None
+            # Substring matches (e.g. the middle of a ref) come from the trigram table. Both
+            # matches are row id lists that drive the query through the primary key: a
+            # leading-wildcard ilike next to them would scan the table again
+            word_ids = sa.select(fts.c.rowid).where(fts_match)
+            substring_ids = None
+            substring = term.strip()
+            if len(substring) >= MIN_TRIGRAM_TERM:
+                trigram = sa.table(TRIGRAM_TABLE, sa.column("rowid"))
+                phrase = '"' + substring.replace('"', '""') + '"'
+                substring_ids = (sa.select(trigram.c.rowid)
+                                 .where(sa.literal_column(TRIGRAM_TABLE).op("MATCH")(phrase)))
+            if not ranked:
+                ids = word_ids if substring_ids is None else sa.union(word_ids, substring_ids)
+                return query.filter(model.id.in_(ids)), None
+            # bm25 scores are negative: lower is better, and substring-only matches (0) come last.
+            # UNION ALL of disjoint halves: cheaper than grouping the overlap away
+            hits = sa.select(fts.c.rowid, fts.c.rank).where(fts_match)
+            if substring_ids is not None:
+                hits = sa.union_all(hits, substring_ids.add_columns(sa.literal(0.0, sa.Float).label("rank"))
+                                    .where(trigram.c.rowid.not_in(word_ids)))
+            matches = hits.subquery("fts_match")
+            return query.join(matches, matches.c.rowid == model.id), matches.c.rank
+        if dialect == "postgresql":
+            tsquery = sa.func.to_tsquery("simple", " & ".join(f"{word}:*" for word in words))
+            vector = sa.literal_column(f"fabric.{SEARCH_VECTOR}")
+            # Substring matches ('0001' in 'SJ-000123') come from the trigram index
+            query = query.filter(sa.or_(vector.op("@@")(tsquery), substring_filter(model, term)))
+            if not ranked:
+                return query, None
+            # float8 so the value round-trips exactly through a pagination cursor
+            return query, -sa.cast(sa.func.ts_rank(vector, tsquery), sa.Double)
+
+    return query.filter(substring_filter(model, term)), None
@@ -0,0 +1,285 @@
+"""
+Garment Bundles - precompiled, memory-mapped garment templates.
+
+A bundle holds every view of one garment in its compiled form: the raw RGBA
+base, the alpha plane at base size, the mask bbox and the variant metadata.
+Workers map bundles read-only and get zero-copy NumPy arrays, so N workers
+share one page-cache copy and a cold worker does no JPEG/PNG decode at all.
+
+File layout (little endian):
+    8 bytes   magic b"SRXGARM1"
+    4 bytes   header length (uint32)
+    n bytes   JSON header (garment name, per-view metadata and data offsets)
+    ...       pixel blocks, each aligned to ALIGNMENT bytes
+
+Each view records the size and mtime of its source files. A stale bundle is
+rebuilt on first use, so replacing a template or mask never serves old pixels.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+BUNDLE_MAGIC = b"SRXGARM1"
+BUNDLE_FORMAT = 1
+BUNDLE_EXTENSION = ".garment"
+ALIGNMENT = 64
+
+_HEADER_PREFIX = struct.Struct("<8sI")
+
+
+def _source_identity(path):
+    stat = os.stat(path)
+    return {"name": os.path.basename(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_bundle(path, garment_name, views):
+    """
+    Writes a bundle atomically.
+
+    Args:
+        path: Destination file
+        garment_name: Base garment name (e.g. 'men polo')
+        views: List of (variant, mockup_path, mask_path, base, alpha, bbox);
+               base is H x W x 4 uint8, alpha H x W uint8
+
+    Returns:
+        Number of bytes written
+    """
+    entries = []
+    blocks = []
+    offset = 0
+    for variant, mockup_path, mask_path, base, alpha, bbox in views:
+        base = np.ascontiguousarray(base, dtype=np.uint8)
+        alpha = np.ascontiguousarray(alpha, dtype=np.uint8)
+        base_offset = offset
+        alpha_offset = _align(base_offset + base.nbytes)
+        offset = _align(alpha_offset + alpha.nbytes)
+        entries.append({
+            "variant": variant,
+            "mockup": _source_identity(mockup_path),
+            "mask": _source_identity(mask_path),
+            "width": base.shape[1],
+            "height": base.shape[0],
+            "bbox": list(bbox),
+            "base_offset": base_offset,
+            "alpha_offset": alpha_offset,
+        })
+        blocks.append((base_offset, base))
+        blocks.append((alpha_offset, alpha))
+
+    header = json.dumps({"format": BUNDLE_FORMAT, "garment": garment_name, "views": entries}).encode('utf-8')
+    data_start = _align(_HEADER_PREFIX.size + len(header))
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER_PREFIX.pack(BUNDLE_MAGIC, len(header)))
+        f.write(header)
+        for block_offset, array in blocks:
+            f.seek(data_start + block_offset)
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return data_start + offset
+
+
+def read_header(path):
+    """Reads only the JSON header of a bundle. Raises ValueError if the file is not a bundle."""
+    with open(path, 'rb') as f:
+        prefix = f.read(_HEADER_PREFIX.size)
+        if len(prefix) != _HEADER_PREFIX.size:
+            raise ValueError(f"Truncated garment bundle: {path}")
+        magic, header_length = _HEADER_PREFIX.unpack(prefix)
+        if magic != BUNDLE_MAGIC:
+            raise ValueError(f"Not a garment bundle: {path}")
+        header = json.loads(f.read(header_length))
+    if header.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported garment bundle format in {path}")
+    header["data_start"] = _align(_HEADER_PREFIX.size + header_length)
+    return header
+
+
+def map_bundle(path):
+    """
+    Maps a bundle read-only.
+
+    Returns:
+        (header, views) where views maps (mockup name, mask name) to
+        (variant, base, alpha, bbox) with zero-copy, read-only arrays
+    """
+    header = read_header(path)
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    views = {}
+    data_start = header["data_start"]
+    for entry in header["views"]:
+        width, height = entry["width"], entry["height"]
+        # The arrays keep the mmap alive; it is unmapped once the last one is freed
+        base = np.frombuffer(mapped, dtype=np.uint8, count=width * height * 4,
+                             offset=data_start + entry["base_offset"]).reshape(height, width, 4)
+        alpha = np.frombuffer(mapped, dtype=np.uint8, count=width * height,
+                              offset=data_start + entry["alpha_offset"]).reshape(height, width)
+        key = (entry["mockup"]["name"], entry["mask"]["name"])
+        views[key] = (entry["variant"], base, alpha, tuple(entry["bbox"]))
+    return header, views
+
+
+def is_current(header, mockup_dir, mask_dir):
+    """True if every source file still has the size and mtime recorded in the bundle."""
+    for entry in header["views"]:
+        for directory, source in ((mockup_dir, entry["mockup"]), (mask_dir, entry["mask"])):
+            try:
+                if _source_identity(os.path.join(directory, source["name"])) != source:
+                    return False
+            except OSError:
+                return False
+    return True
+
+
+class GarmentBundleStore:
+    """
+    Index of the bundles in one directory, keyed by (mockup name, mask name).
+
+    The index is re-read whenever the directory's mtime changes (a bundle was
+    added, replaced or removed), so compiling in another process is picked up.
+    """
+
+    def __init__(self, bundle_dir):
+        self.bundle_dir = bundle_dir
+        self._index = {}  # (mockup name, mask name) -> bundle path
+        self._index_mtime = None
+        self._lock = threading.Lock()
+        self.mapped = 0
+        self.rebuilt = 0
+
+    def bundle_path(self, garment_name):
+        return os.path.join(self.bundle_dir, f"{garment_name}{BUNDLE_EXTENSION}")
+
+    def _refresh_index(self):
+        try:
+            mtime = os.stat(self.bundle_dir).st_mtime_ns
+        except OSError:
+            self._index, self._index_mtime = {}, None
+            return
+        if mtime == self._index_mtime:
+            return
+        index = {}
+        for entry in os.scandir(self.bundle_dir):
+            if not entry.name.endswith(BUNDLE_EXTENSION):
+                continue
+            try:
+                header = read_header(entry.path)
+            except (OSError, ValueError) as e:
+                print(f"  Warning: Skipping garment bundle {entry.name}: {e}")
+                continue
+            for view in header["views"]:
+                index[(view["mockup"]["name"], view["mask"]["name"])] = entry.path
+        self._index, self._index_mtime = index, mtime
+
+    def load(self, generator, mockup_path, mask_path):
+        """
+        Returns (base, alpha, bbox) for a mockup/mask pair from its bundle,
+        rebuilding the bundle first if a source file changed.
+
+        Returns:
+            Tuple of read-only arrays and bbox, or None if the pair is not bundled
+        """
+        key = (os.path.basename(mockup_path), os.path.basename(mask_path))
+        with self._lock:
+            self._refresh_index()
+            path = self._index.get(key)
+        if path is None:
+            return None
+
+        try:
+            header, views = map_bundle(path)
+            if not is_current(header, generator.mockup_dir, generator.mask_dir):
+                print(f"  [i] Garment bundle out of date, rebuilding: {os.path.basename(path)}")
+                self.build(generator, header["garment"])
+                with self._lock:
+                    self.rebuilt += 1
+                header, views = map_bundle(path)
+        except (OSError, ValueError) as e:
+            print(f"  Warning: Could not use garment bundle {os.path.basename(path)}: {e}")
+            return None
+
+        view = views.get(key)
+        if view is None:
+            return None
+        with self._lock:
+            self.mapped += 1
+        _, base, alpha, bbox = view
+        return base, alpha, bbox
+
+    def build(self, generator, garment_name):
+        """
+        Compiles every view of a garment (decoding the sources) into its bundle.
+
+        Returns:
+            (bundle path, bytes written), or (None, 0) if the garment has no views
+        """
+        views = []
+        for variant, mockup_path, mask_path in generator.resolve_views(garment_name):
+            garment = generator.compile_garment(mockup_path, mask_path)
+            views.append((variant, mockup_path, mask_path, garment.base, garment.alpha, garment.bbox))
+        if not views:
+            return None, 0
+        os.makedirs(self.bundle_dir, exist_ok=True)
+        path = self.bundle_path(garment_name)
+        return path, write_bundle(path, garment_name, views)
+
+    def compile_all(self, generator, force=False):
+        """
+        Builds a bundle for every garment in the asset set.
+
+        Args:
+            generator: MockupGeneratorV2 pointing at the mockup and mask directories
+            force: Rebuild bundles even if they are current
+
+        Returns:
+            List of dicts: garment, views, status ('built' or 'current'), bytes
+        """
+        garments = {}
+        for base, _variant, _mockup, _mask in generator.discover_garments():
+            garments[base] = garments.get(base, 0) + 1
+
+        report = []
+        for garment_name, view_count in garments.items():
+            path = self.bundle_path(garment_name)
+            if not force and os.path.exists(path):
+                try:
+                    header = read_header(path)
+                    if len(header["views"]) == view_count and is_current(header, generator.mockup_dir, generator.mask_dir):
+                        report.append({"garment": garment_name, "views": view_count,
+                                       "status": "current", "bytes": os.path.getsize(path)})
+                        continue
+                except (OSError, ValueError):
+                    pass
+            _, size = self.build(generator, garment_name)
+            report.append({"garment": garment_name, "views": view_count, "status": "built", "bytes": size})
+        return report
+
+
+# ===== PROCESS-WIDE REGISTRY =====
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_bundle_store(bundle_dir):
+    """Returns the process-wide GarmentBundleStore for a bundle directory."""
+    bundle_dir = os.path.abspath(bundle_dir)
+    with _stores_lock:
+        store = _stores.get(bundle_dir)
+        if store is None:
+            store = GarmentBundleStore(bundle_dir)
+            _stores[bundle_dir] = store
+        return store
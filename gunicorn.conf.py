@@ -0,0 +1,21 @@
+"""
+Gunicorn server config (loaded automatically from the working directory, or
+with -c gunicorn.conf.py):
+
+    gunicorn -w 4 -b 0.0.0.0:5000 api_server:app
+
+The app is loaded once in the master (preload) so the garment warm-up below
+runs a single time and the forked workers share the decoded garments
+copy-on-write. Importing api_server on its own (tests, CLI commands, load
+tests) never compiles garments.
+"""
+
+preload_app = True
+
+
+def when_ready(server):
+    """Warms the garment cache in the master, before any worker is forked."""
+    from api_server import prewarm_garments, settings
+
+    if settings.PREWARM_GARMENTS:
+        prewarm_garments()
@@ -0,0 +1,94 @@
+"""
+Keyset Pagination - cursor-based paging on a stable sort key.
+
+OFFSET/LIMIT makes the database walk and discard every earlier row, so page
+500 costs 500 pages of work. A keyset page instead continues strictly after
+the sort key of the last row it returned, `(key1, key2, ...) > (last1, last2, ...)`,
+which an index (or the full-text match) turns into a seek: every page costs
+the same.
+
+Cursors are opaque to clients: URL-safe base64 of the JSON list of the last
+row's sort values. Sort keys share one direction and end in a unique column.
+"""
+
+import base64
+import binascii
+import json
+
+import sqlalchemy as sa
+
+# Totals are counted up to this many rows; larger result sets report "at least"
+COUNT_CAP = 10000
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was not produced by encode_cursor."""
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    """
+    Returns the sort values stored in a cursor.
+
+    Raises:
+        InvalidCursor: Malformed cursor or wrong number of values
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}") from None
+    if not isinstance(values, list) or len(values) != length or \
+            not all(isinstance(v, (int, float, str)) and not isinstance(v, bool) for v in values):
+        raise InvalidCursor("Invalid cursor")
+    return values
+
+
+def keyset_page(query, sort_keys, limit, cursor=None, offset=0, descending=False):
+    """
+    Fetches one page of `query` ordered by `sort_keys`.
+
+    Args:
+        query: ORM query (not yet ordered)
+        sort_keys: Column expressions, the last one unique (e.g. the id)
+        limit: Page size
+        cursor: Cursor from a previous page, or None for the first page
+        offset: Rows to skip first (only for legacy page-number requests)
+        descending: Sort every key descending instead (e.g. newest first)
+
+    Returns:
+        (rows, next_cursor); rows are the query's columns followed by the sort
+        key values, and next_cursor is None on the last page
+
+    Raises:
+        InvalidCursor: See decode_cursor
+    """
+    labels = [f"_sort_{i}" for i in range(len(sort_keys))]
+    if cursor:
+        last = decode_cursor(cursor, len(sort_keys))
+        keys, after = sa.tuple_(*sort_keys), sa.tuple_(*[sa.literal(v) for v in last])
+        query = query.filter(keys < after if descending else keys > after)
+    query = query.add_columns(*[key.label(label) for key, label in zip(sort_keys, labels)])
+    order = [key.desc() for key in sort_keys] if descending else sort_keys
+    # One row beyond the page tells whether there is a next page, without counting
+    rows = query.order_by(*order).offset(offset or None).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][-len(sort_keys):])
+
+
+def capped_count(query, cap=COUNT_CAP):
+    """
+    Counts the rows of `query`, stopping at `cap`.
+
+    Returns:
+        (count, exact): exact is False when the count reached the cap
+    """
+    limited = query.order_by(None).with_entities(sa.literal(1)).limit(cap + 1).subquery()
+    count = query.session.query(sa.func.count()).select_from(limited).scalar()
+    return min(count, cap), count <= cap
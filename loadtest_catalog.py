@@ -0,0 +1,489 @@
+"""
+Catalog Load Test - seeds a synthetic fabric catalog and drives a scripted
+mix of search, filter, pagination, admin and render traffic at the API.
+
+The seeder writes a configurable number of realistic Fabric rows (skewed
+group popularity, per-group gsm ranges, common compositions, sparse
+meta_data, mostly LIVE) owned by a pool of manufacturer users, plus an admin
+and a few buyers. The driver replays a seeded request mix from N concurrent
+clients and reports throughput and p50/p95/p99 latency per endpoint.
+
+By default requests go through the Flask test client in this process (no
+network, rate limits off). With --url they are sent over HTTP to a running
+server instead; start it with RATE_LIMIT_ENABLED=false and the same
+DATABASE_URL, and pass --render-refs for fabrics whose swatches exist there.
+
+Usage:
+    python loadtest_catalog.py --database-url sqlite:///instance/loadtest.db --fabrics 100000
+    python loadtest_catalog.py --database-url postgresql://localhost/loadtest --fabrics 100000 --output pg.json
+    python loadtest_catalog.py --database-url sqlite:///instance/loadtest.db --skip-seed --requests 5000 --concurrency 8
+    python loadtest_catalog.py --database-url postgresql://localhost/loadtest --skip-seed --url http://localhost:5000
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import numpy as np
+from PIL import Image
+
+from benchmark_mockups import percentile
+
+DEFAULT_FABRICS = 100_000
+DEFAULT_MANUFACTURERS = 250
+DEFAULT_BUYERS = 50
+DEFAULT_REQUESTS = 2000
+DEFAULT_CONCURRENCY = 4
+SEED_CHUNK_SIZE = 5000
+LOADTEST_PASSWORD = "loadtest"
+ADMIN_EMAIL = "admin@loadtest.example.com"
+
+# Fabric groups with their relative popularity and typical gsm range
+FABRIC_GROUPS = {
+    "Single Jersey": ("SJ", 30, (120, 200)),
+    "Pique": ("PQ", 12, (180, 240)),
+    "Interlock": ("IL", 8, (180, 260)),
+    "Rib": ("RB", 8, (180, 300)),
+    "French Terry": ("FT", 10, (220, 320)),
+    "Fleece": ("FL", 9, (260, 380)),
+    "Waffle": ("WF", 3, (180, 260)),
+    "Jacquard": ("JQ", 3, (160, 300)),
+    "Poplin": ("PP", 6, (90, 140)),
+    "Twill": ("TW", 5, (180, 300)),
+    "Oxford": ("OX", 3, (120, 180)),
+    "Denim": ("DN", 3, (280, 420)),
+}
+YARNS = ["Combed", "Carded", "Slub", "Melange", "Organic", "Recycled", "Mercerized", "Brushed", "Peached", "Compact"]
+COMPOSITIONS = [
+    ("100% Cotton", 30), ("95% Cotton 5% Elastane", 14), ("60% Cotton 40% Polyester", 12),
+    ("100% Polyester", 8), ("100% Organic Cotton", 8), ("50% Cotton 50% Modal", 5),
+    ("92% Polyester 8% Spandex", 5), ("65% Polyester 35% Viscose", 5), ("70% Bamboo 30% Cotton", 3),
+    ("80% Cotton 20% Recycled Polyester", 6), ("98% Cotton 2% Elastane", 4),
+]
+WIDTHS = ["58", "60", "62", "66", "72", "Open 72", "Tubular 36"]
+COLORS = ["Black", "White", "Navy", "Heather Grey", "Olive", "Burgundy", "Sky Blue", "Ecru", "PFD"]
+FINISHES = ["Enzyme Wash", "Silicone Soft", "Peach", "Anti-Pill", "Mercerized", "Brushed", "Raw"]
+STATUSES = [("LIVE", 85), ("PENDING_REVIEW", 10), ("REJECTED", 5)]
+
+# Request mix: (endpoint, weight)
+TRAFFIC_MIX = [
+    ("search", 30),
+    ("filter", 20),
+    ("paginate", 15),
+    ("fabric_groups", 10),
+    ("admin_fabrics", 10),
+    ("render", 15),
+]
+
+
+def _choose(rng, choices, size):
+    """Indices into a [(value, weight)] list, drawn by weight."""
+    weights = np.array([weight for _, weight in choices], dtype=float)
+    return rng.choice(len(choices), size=size, p=weights / weights.sum())
+
+
+def make_fabric_rows(count, manufacturer_ids, seed=0, start=0):
+    """
+    Generates `count` Fabric rows as dicts (deterministic for a seed).
+
+    Args:
+        manufacturer_ids: Owner ids to draw from (Zipf-like: a few large mills own most rows)
+        start: Index of the first row (keeps refs unique across chunks)
+    """
+    rng = np.random.default_rng(seed + start)
+    names = list(FABRIC_GROUPS)
+    groups = _choose(rng, [(name, FABRIC_GROUPS[name][1]) for name in names], count)
+    statuses = _choose(rng, STATUSES, count)
+    compositions = _choose(rng, COMPOSITIONS, count)
+    owner_weights = 1.0 / np.arange(1, len(manufacturer_ids) + 1)
+    owners = rng.choice(len(manufacturer_ids), size=count, p=owner_weights / owner_weights.sum())
+
+    rows = []
+    for i in range(count):
+        group = names[groups[i]]
+        code, _, (low, high) = FABRIC_GROUPS[group]
+        meta_data = {"Color": COLORS[rng.integers(len(COLORS))], "MOQ": f"{int(rng.integers(1, 20)) * 100} kg"}
+        if rng.random() < 0.6:
+            meta_data["Shrinkage"] = f"{int(rng.integers(2, 8))}%"
+        if rng.random() < 0.4:
+            meta_data["Finish"] = FINISHES[rng.integers(len(FINISHES))]
+        if rng.random() < 0.3:
+            meta_data["Lead Time"] = f"{int(rng.integers(2, 8)) * 7} days"
+        rows.append({
+            "ref": f"{code}-{start + i:06d}",
+            "fabric_group": group,
+            "fabrication": f"{YARNS[rng.integers(len(YARNS))]} {group}",
+            "gsm": int(rng.triangular(low, (low + high) / 2, high)),
+            "width": WIDTHS[rng.integers(len(WIDTHS))],
+            "composition": COMPOSITIONS[compositions[i]][0],
+            "status": STATUSES[statuses[i]][0],
+            "manufacturer_id": int(manufacturer_ids[owners[i]]),
+            "meta_data": meta_data,
+        })
+    return rows
+
+
+def seed_catalog(db, fabrics=DEFAULT_FABRICS, manufacturers=DEFAULT_MANUFACTURERS, buyers=DEFAULT_BUYERS,
+                 seed=0, chunk_size=SEED_CHUNK_SIZE):
+    """
+    Creates the schema and bulk-inserts the synthetic users and fabrics.
+    Must run inside an app context; existing load-test users are reused.
+
+    Returns:
+        Dict with row counts and seconds taken
+    """
+    from werkzeug.security import generate_password_hash
+    from models import User, Fabric
+
+    start = time.perf_counter()
+    db.create_all()
+    # One hash for every seeded account: hashing 300 passwords would dominate seeding
+    password_hash = generate_password_hash(LOADTEST_PASSWORD)
+    users = [{"email": ADMIN_EMAIL, "password_hash": password_hash, "role": "admin", "company_name": "Load Test Admin"}]
+    users += [{"email": f"mill{i:04d}@loadtest.example.com", "password_hash": password_hash,
+               "role": "manufacturer", "company_name": f"Mill {i:04d}"} for i in range(manufacturers)]
+    users += [{"email": f"buyer{i:04d}@loadtest.example.com", "password_hash": password_hash,
+               "role": "buyer", "company_name": f"Buyer {i:04d}"} for i in range(buyers)]
+    existing = {email for (email,) in db.session.query(User.email).filter(User.email.like('%@loadtest.example.com'))}
+    new_users = [u for u in users if u["email"] not in existing]
+    if new_users:
+        db.session.execute(db.insert(User), new_users)
+        db.session.commit()
+
+    manufacturer_ids = [uid for (uid,) in db.session.query(User.id).filter(
+        User.role == 'manufacturer', User.email.like('mill%@loadtest.example.com')).order_by(User.id)]
+    offset = db.session.query(Fabric).count()
+    for chunk_start in range(0, fabrics, chunk_size):
+        rows = make_fabric_rows(min(chunk_size, fabrics - chunk_start), manufacturer_ids,
+                                seed=seed, start=offset + chunk_start)
+        db.session.execute(db.insert(Fabric), rows)
+        db.session.commit()
+        print(f"  Seeded {chunk_start + len(rows):,} / {fabrics:,} fabrics", file=sys.stderr)
+
+    return {"users": len(new_users), "fabrics": fabrics, "seconds": round(time.perf_counter() - start, 2)}
+
+
+def write_render_swatches(directory, refs, size=1024, seed=0):
+    """Writes a synthetic woven-looking JPEG swatch for each fabric ref."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size]
+    for ref in refs:
+        tint = rng.integers(40, 200, 3)
+        weave = ((x // 6 + y // 6) % 2) * 50
+        pixels = np.stack([tint[c] + weave + rng.integers(0, 30, (size, size)) for c in range(3)], axis=-1)
+        Image.fromarray(pixels.clip(0, 255).astype(np.uint8)).save(os.path.join(directory, f"{ref}.jpg"), quality=90)
+
+
+@contextlib.contextmanager
+def isolated_render_dirs(api_server):
+    """
+    Points the app's swatch, swatch pyramid and mockup output directories at
+    a temporary directory for the duration of an in-process run, so synthetic
+    swatches, their pyramid levels and the rendered mockups never land in the
+    real instance/ and output directories. Yields the swatch directory.
+    """
+    root = tempfile.mkdtemp(prefix="loadtest-")
+    saved = (api_server.FABRIC_SWATCH_DIR, api_server.SWATCH_PYRAMID_DIR, api_server.MOCKUP_DIR_OUTPUT)
+    swatch_dir = os.path.join(root, "swatches")
+    output_dir = os.path.join(root, "mockups")
+    os.makedirs(swatch_dir)
+    os.makedirs(output_dir)
+    api_server.FABRIC_SWATCH_DIR = swatch_dir
+    api_server.MOCKUP_DIR_OUTPUT = output_dir
+    # The pyramid stays on or off as configured, only somewhere disposable
+    if saved[1]:
+        api_server.SWATCH_PYRAMID_DIR = os.path.join(root, "swatch_pyramid")
+    try:
+        yield swatch_dir
+    finally:
+        api_server.FABRIC_SWATCH_DIR, api_server.SWATCH_PYRAMID_DIR, api_server.MOCKUP_DIR_OUTPUT = saved
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def build_plan(total, catalog, seed=0, mix=TRAFFIC_MIX):
+    """
+    Builds the scripted request sequence.
+
+    Args:
+        catalog: Dict with 'groups', 'sample_refs', 'live_count', 'garments',
+                 'render_refs' (renders are dropped from the mix without garments or refs)
+
+    Returns:
+        List of (endpoint, method, path, json body or None, needs_auth)
+    """
+    rng = np.random.default_rng(seed)
+    if not (catalog["garments"] and catalog["render_refs"]):
+        mix = [(name, weight) for name, weight in mix if name != "render"]
+    groups = catalog["groups"] or list(FABRIC_GROUPS)
+    max_page = max(1, catalog["live_count"] // 20)
+    search_terms = YARNS + list(FABRIC_GROUPS) + [ref[:5] for ref in catalog["sample_refs"]] + catalog["sample_refs"]
+
+    plan = []
+    for index in _choose(rng, mix, total):
+        endpoint = mix[index][0]
+        if endpoint == "search":
+            params = {"search": search_terms[rng.integers(len(search_terms))]}
+            plan.append((endpoint, "GET", f"/api/find-fabrics?{urlencode(params)}", None, False))
+        elif endpoint == "filter":
+            params = {"group": groups[rng.integers(len(groups))]}
+            if rng.random() < 0.7:
+                params["weight"] = ("light", "medium", "heavy")[rng.integers(3)]
+            plan.append((endpoint, "GET", f"/api/find-fabrics?{urlencode(params)}", None, False))
+        elif endpoint == "paginate":
+            # Browsing skews to the first pages, with a long tail of deep pages
+            page = min(max_page, int(rng.zipf(1.5)))
+            params = {"page": page, "limit": (20, 50, 100)[rng.integers(3)]}
+            plan.append((endpoint, "GET", f"/api/find-fabrics?{urlencode(params)}", None, False))
+        elif endpoint == "fabric_groups":
+            plan.append((endpoint, "GET", "/api/fabric-groups", None, False))
+        elif endpoint == "admin_fabrics":
+            status = ("PENDING_REVIEW", "LIVE", "REJECTED", "PENDING_REVIEW|REJECTED", "")[rng.integers(5)]
+            path = f"/api/admin/fabrics?{urlencode({'status': status})}" if status else "/api/admin/fabrics"
+            plan.append((endpoint, "GET", path, None, True))
+        elif endpoint == "render":
+            body = {
+                "fabric_ref": catalog["render_refs"][rng.integers(len(catalog["render_refs"]))],
+                "mockup_name": catalog["garments"][rng.integers(len(catalog["garments"]))],
+                "stream": True,
+                "tier": "preview",
+            }
+            plan.append((endpoint, "POST", "/api/generate-mockup", body, True))
+    return plan
+
+
+class InProcessClient:
+    """Sends requests through the Flask test client (one per thread)."""
+
+    def __init__(self, app, token):
+        self.app = app
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self._local = threading.local()
+
+    def send(self, method, path, body, needs_auth):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body, headers=self.headers if needs_auth else None)
+        size = len(response.get_data())
+        response.close()
+        return response.status_code, size
+
+
+class HttpClient:
+    """Sends requests to a running server."""
+
+    def __init__(self, base_url, token, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    @classmethod
+    def login(cls, base_url, email=ADMIN_EMAIL, password=LOADTEST_PASSWORD):
+        request = urllib.request.Request(
+            f"{base_url.rstrip('/')}/api/auth/login",
+            data=json.dumps({"email": email, "password": password}).encode('utf-8'),
+            headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return cls(base_url, json.load(response)["token"])
+
+    def send(self, method, path, body, needs_auth):
+        headers = {"Authorization": f"Bearer {self.token}"} if needs_auth else {}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode('utf-8')
+            headers["Content-Type"] = "application/json"
+        request = urllib.request.Request(f"{self.base_url}{path}", data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, len(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, len(e.read())
+
+
+def run_load(client, plan, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Replays the plan from `concurrency` threads, each taking the next request.
+
+    Returns:
+        (samples, wall seconds) where samples are (endpoint, seconds, status, bytes)
+    """
+    samples = []
+    lock = threading.Lock()
+    cursor = iter(plan)
+
+    def worker():
+        while True:
+            with lock:
+                item = next(cursor, None)
+            if item is None:
+                return
+            endpoint, method, path, body, needs_auth = item
+            start = time.perf_counter()
+            try:
+                status, size = client.send(method, path, body, needs_auth)
+            except OSError:
+                status, size = 0, 0
+            elapsed = time.perf_counter() - start
+            with lock:
+                samples.append((endpoint, elapsed, status, size))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, wall_seconds):
+    """Throughput and latency percentiles per endpoint and overall."""
+    def stats(entries):
+        latencies = [seconds * 1000 for _, seconds, _, _ in entries]
+        errors = sum(1 for _, _, status, _ in entries if not 200 <= status < 400)
+        return {
+            "requests": len(entries),
+            "errors": errors,
+            "throughput_rps": round(len(entries) / wall_seconds, 1) if wall_seconds else None,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(max(latencies), 2),
+            "mean_bytes": round(sum(size for _, _, _, size in entries) / len(entries)),
+        }
+
+    endpoints = {}
+    for sample in samples:
+        endpoints.setdefault(sample[0], []).append(sample)
+    return {
+        "wall_seconds": round(wall_seconds, 2),
+        "overall": stats(samples) if samples else None,
+        "endpoints": {name: stats(entries) for name, entries in sorted(endpoints.items())},
+    }
+
+
+def describe_catalog(db, garments, render_refs):
+    """Reads what the request mix needs from the seeded database."""
+    from models import Fabric
+
+    groups = sorted(g for (g,) in db.session.query(Fabric.fabric_group).filter_by(status='LIVE').distinct() if g)
+    sample_refs = [ref for (ref,) in db.session.query(Fabric.ref).filter_by(status='LIVE').order_by(Fabric.id).limit(50)]
+    return {
+        "groups": groups,
+        "sample_refs": sample_refs,
+        "live_count": db.session.query(Fabric).filter_by(status='LIVE').count(),
+        "garments": garments,
+        "render_refs": render_refs,
+    }
+
+
+def print_summary(report):
+    print(f"{'endpoint':<16} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    for name, s in rows:
+        if s:
+            print(f"{name:<16} {s['requests']:>8} {s['errors']:>6} {s['throughput_rps']:>8.1f} "
+                  f"{s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a synthetic fabric catalog and load-test the API.")
+    parser.add_argument("--database-url", help="SQLAlchemy URL to seed/test (default: DATABASE_URL or the app's SQLite file)")
+    parser.add_argument("--fabrics", type=int, default=DEFAULT_FABRICS)
+    parser.add_argument("--manufacturers", type=int, default=DEFAULT_MANUFACTURERS)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse an already seeded database")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="Send traffic to a running server instead of in-process")
+    parser.add_argument("--render-refs", help="Comma-separated fabric refs with swatches on the server (--url only)")
+    parser.add_argument("--no-render", action="store_true", help="Leave render traffic out of the mix")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    # The app reads its database URL and rate-limit switch at import time
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    import api_server
+    from api_server import app, db
+    from flask_jwt_extended import create_access_token
+    from mockup_library import MockupGeneratorV2
+    from models import User, Fabric
+    logging.getLogger(api_server.__name__).setLevel(logging.WARNING)
+
+    # Everything written for an in-process run lives in a temp dir, restored/removed on exit
+    with contextlib.ExitStack() as stack:
+        with app.app_context():
+            database_url = app.config['SQLALCHEMY_DATABASE_URI']
+            print(f"Database: {db.engine.url.render_as_string(hide_password=True)}", file=sys.stderr)
+            seeding = None
+            if not args.skip_seed:
+                seeding = seed_catalog(db, args.fabrics, args.manufacturers, seed=args.seed)
+                print(f"Seeded {seeding['fabrics']:,} fabrics in {seeding['seconds']:.1f}s", file=sys.stderr)
+
+            if args.no_render:
+                garments, render_refs = [], []
+            elif args.url:
+                garments = [g["name"] for category in json.load(urllib.request.urlopen(f"{args.url.rstrip('/')}/api/garments"))
+                            .values() for g in category]
+                render_refs = args.render_refs.split(",") if args.render_refs else []
+            else:
+                generator = MockupGeneratorV2(**api_server.mockup_generator_kwargs())
+                garments = sorted({base for base, _, _, _ in generator.discover_garments()})
+                # Renders need swatch files: point the app at synthetic ones for a few live refs
+                swatch_dir = stack.enter_context(isolated_render_dirs(api_server))
+                render_refs = [ref for (ref,) in db.session.query(Fabric.ref).filter_by(status='LIVE').limit(20)]
+                write_render_swatches(swatch_dir, render_refs, seed=args.seed)
+
+            catalog = describe_catalog(db, garments, render_refs)
+            admin = User.query.filter_by(email=ADMIN_EMAIL).first()
+            if admin is None:
+                parser.error(f"{ADMIN_EMAIL} not found; seed the database first (drop --skip-seed)")
+            if args.url:
+                client = HttpClient.login(args.url)
+            else:
+                api_server.limiter.enabled = False
+                token = create_access_token(identity=str(admin.id), additional_claims={"role": "admin"})
+                client = InProcessClient(app, token)
+
+        plan = build_plan(args.requests, catalog, seed=args.seed)
+        print(f"Running {len(plan)} requests with {args.concurrency} clients...", file=sys.stderr)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            samples, wall_seconds = run_load(client, plan, args.concurrency)
+
+        report = summarize(samples, wall_seconds)
+        report["meta"] = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": database_url.split("://")[0],
+            "target": args.url or "in-process",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "live_fabrics": catalog["live_count"],
+            "seeding": seeding,
+        }
+        print_summary(report)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
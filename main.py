@@ -60,8 +60,8 @@ def main():
     if result_paths and len(result_paths) > 0:
         print(f"\n{'='*60}")
         print(f"✓ SUCCESS! Generated {len(result_paths)} mockup(s):")
-        for path in result_paths:
-            print(f"  ✓ Mockup saved to: {path}")
+        for variant, path in result_paths:
+            print(f"  ✓ Mockup ({variant or 'single'}) saved to: {path}")
         print(f"{'='*60}\n")
     else:
         print(f"\n{'='*60}")
@@ -36,6 +36,7 @@ def get_engine_url():
 # for 'autogenerate' support
 # Import models so Alembic can detect schema changes
 import models
+import fabric_search
 config.set_main_option('sqlalchemy.url', get_engine_url())
 target_db = current_app.extensions['migrate'].db
 
@@ -90,9 +91,15 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # the full-text search index is managed by fabric_search.py, not the models
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (reflected and fabric_search.is_search_object(name))
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
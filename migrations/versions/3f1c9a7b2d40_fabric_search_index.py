@@ -0,0 +1,26 @@
+"""Full-text search index for fabrics
+
+Revision ID: 3f1c9a7b2d40
+Revises: 77dd2d147d7e
+Create Date: 2026-10-16 10:12:04.118532
+
+"""
+from alembic import op
+
+import fabric_search
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7b2d40'
+down_revision = '77dd2d147d7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 table + triggers on SQLite, generated tsvector + GIN/trigram indexes on PostgreSQL
+    fabric_search.create_search_index(op.get_bind(), rebuild=True)
+
+
+def downgrade():
+    fabric_search.drop_search_index(op.get_bind())
@@ -0,0 +1,146 @@
+"""
+Mockup Encoders - output stage of the mockup pipeline.
+
+Each encoder turns a rendered RGBA canvas into PNG, WebP or JPEG, either on
+disk or into an in-memory buffer for streaming straight into a response.
+Defaults depend on the output tier: previews favour encode speed, full
+renders favour fidelity.
+"""
+
+import io
+from PIL import Image
+
+
+class Encoder:
+    """Base class: subclasses set format/extension/mimetype and implement `_save`."""
+
+    format = None
+    extension = None
+    mimetype = None
+
+    def __init__(self, **params):
+        self.params = params
+
+    def cache_params(self):
+        """Everything that affects the encoded bytes (part of the render key)."""
+        return {"format": self.format, **self.params}
+
+    def prepare(self, image):
+        """Converts the RGBA canvas into something this format can store."""
+        return image
+
+    def save(self, image, fp):
+        """Encodes image to a path or file object."""
+        self.prepare(image).save(fp, self.format, **self.params)
+
+    def encode_bytes(self, image):
+        """Encodes image into memory and returns the bytes."""
+        buffer = io.BytesIO()
+        self.save(image, buffer)
+        return buffer.getvalue()
+
+
+class PNGEncoder(Encoder):
+    """Lossless PNG. compress_level trades zlib time for size (Pillow default is 6)."""
+
+    format = "PNG"
+    extension = "png"
+    mimetype = "image/png"
+
+    def __init__(self, compress_level=6):
+        super().__init__(compress_level=compress_level)
+
+
+class WebPEncoder(Encoder):
+    """
+    WebP with alpha. Lossy by default; with lossless=True, quality is the
+    compression effort instead of visual quality.
+    """
+
+    format = "WEBP"
+    extension = "webp"
+    mimetype = "image/webp"
+
+    def __init__(self, quality=90, lossless=False, method=4):
+        super().__init__(quality=quality, lossless=lossless, method=method)
+
+
+class JPEGEncoder(Encoder):
+    """JPEG has no alpha channel, so transparent areas are flattened onto white."""
+
+    format = "JPEG"
+    extension = "jpg"
+    mimetype = "image/jpeg"
+
+    def __init__(self, quality=95):
+        super().__init__(quality=quality, optimize=False)
+
+    def prepare(self, image):
+        if image.mode == 'RGBA':
+            alpha = image.getchannel('A')
+            if alpha.getextrema()[0] < 255:
+                flattened = Image.new('RGB', image.size, (255, 255, 255))
+                flattened.paste(image, mask=alpha)
+                return flattened
+        return image.convert('RGB')
+
+
+# Per-tier defaults. Quality values are capped by the configured OUTPUT_QUALITY.
+TIER_ENCODER_DEFAULTS = {
+    "preview": {
+        "PNG": {"compress_level": 1},
+        "WEBP": {"quality": 80, "method": 2},
+        "JPEG": {"quality": 80},
+    },
+    "standard": {
+        "PNG": {"compress_level": 3},
+        "WEBP": {"quality": 90, "method": 4},
+        "JPEG": {"quality": 90},
+    },
+    "full": {
+        "PNG": {"compress_level": 6},
+        "WEBP": {"quality": 95, "method": 4},
+        "JPEG": {"quality": 95},
+    },
+}
+
+ENCODERS = {
+    "PNG": PNGEncoder,
+    "WEBP": WebPEncoder,
+    "JPEG": JPEGEncoder,
+}
+
+
+def get_encoder(output_format="PNG", tier="full", quality=None, png_compress_level=None, webp_lossless=False):
+    """
+    Builds the encoder for an output format and tier.
+
+    Args:
+        output_format: 'PNG', 'WEBP', 'JPEG' (or 'JPG')
+        tier: 'preview', 'standard' or 'full' - selects the defaults
+        quality: Upper bound for lossy quality (e.g. settings.OUTPUT_QUALITY)
+        png_compress_level: Overrides the PNG compress level for the full tier
+        webp_lossless: Encode WebP losslessly
+
+    Returns:
+        Encoder instance
+
+    Raises:
+        ValueError: Unsupported format or tier
+    """
+    output_format = output_format.upper()
+    if output_format == "JPG":
+        output_format = "JPEG"
+    if output_format not in ENCODERS:
+        raise ValueError(f"Unsupported output format '{output_format}'. Expected one of {list(ENCODERS)}")
+    if tier not in TIER_ENCODER_DEFAULTS:
+        raise ValueError(f"Unknown tier '{tier}'. Expected one of {list(TIER_ENCODER_DEFAULTS)}")
+
+    params = dict(TIER_ENCODER_DEFAULTS[tier][output_format])
+    if quality is not None and "quality" in params:
+        params["quality"] = min(params["quality"], quality)
+    if output_format == "PNG" and tier == "full" and png_compress_level is not None:
+        params["compress_level"] = png_compress_level
+    if output_format == "WEBP" and webp_lossless:
+        params["lossless"] = True
+    return ENCODERS[output_format](**params)
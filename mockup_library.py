@@ -5,11 +5,275 @@ WHITE areas in mask = fabric visible
 BLACK areas in mask = transparent
 
 V2.1 Update: Now auto-detects _face and _back variants.
+V2.2 Update: Garment templates and masks are compiled once and cached per process.
+V2.3 Update: Optional NumPy compositing engine that only touches the mask bbox.
+V2.4 Update: Outputs are content-addressed; identical requests reuse earlier renders.
+V2.5 Update: Variants are discovered from the asset set and rendered concurrently
+             from a single fabric decode.
+V2.6 Update: Output tiers (preview / standard / full) render from downscaled
+             garments and draft-decoded swatches.
+V2.7 Update: Pluggable output encoders (PNG / WebP / JPEG) with per-tier defaults
+             and in-memory rendering for streaming responses.
+V2.8 Update: Optional swatch pyramid - fabrics are resampled from pre-decoded
+             mip levels instead of the original file.
+V2.9 Update: generate_mockup_image_object renders in memory and tiles the swatch
+             repeat at a real scale instead of stretching it.
+V2.10 Update: prewarm() compiles every garment in the asset set up front (e.g. in
+              the preloaded gunicorn master, shared copy-on-write by workers).
+V2.11 Update: Optional precompiled garment bundles, memory-mapped instead of decoded.
+V2.12 Update: Optional per-stage timings (render_metrics.StageTimer).
+V2.13 Update: Asset lookups are answered from an in-memory directory index.
 """
 
 import os
+import hashlib
+import time
+import json
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from PIL import Image, ImageOps
 import sys
+from mockup_encoders import get_encoder
+from swatch_pyramid import get_swatch_pyramid
+from garment_bundles import get_bundle_store
+from asset_index import get_asset_index
+from mockup_outputs import touch_output
+
+
+# Default memory budget for the process-wide compiled garment cache
+DEFAULT_GARMENT_CACHE_BYTES = 512 * 1024 * 1024
+
+# Compositing engines selectable per MockupGeneratorV2 instance
+ENGINE_PIL = "pil"      # Full-canvas Image.alpha_composite (reference implementation)
+ENGINE_NUMPY = "numpy"  # In-place blend restricted to the mask bounding box
+ENGINES = (ENGINE_PIL, ENGINE_NUMPY)
+
+# Part of every render key. Bump whenever output pixels change for identical inputs
+# so stale content-addressed renders are never served.
+RENDER_VERSION = "2.5"
+
+# Well-known views are listed first, in this order; any other variants follow alphabetically
+VARIANT_ORDER = ["face", "back"]
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Output tiers: maximum long edge in pixels (None = full template resolution)
+RENDER_TIERS = {"preview": 800, "standard": 1600, "full": None}
+DEFAULT_TIER = "full"
+MIN_RENDER_SIZE = 64
+# Peak bytes allocated per output pixel while compositing + encoding one view
+# (measured on a 1224x1424 template: ~9 for pil, ~29 for numpy's integer temporaries)
+RENDER_BYTES_PER_PIXEL = {"pil": 16, "numpy": 32}
+# Bytes per template pixel to compile a garment (RGBA base, RGB mask, L gray, L alpha)
+COMPILE_BYTES_PER_PIXEL = 12
+
+
+def resolve_max_size(tier=None, max_size=None):
+    """
+    Turns a tier name and/or explicit size into a maximum long edge in pixels.
+    An explicit max_size wins over the tier.
+    
+    Returns:
+        int, or None for full resolution
+        
+    Raises:
+        ValueError: Unknown tier or invalid size
+    """
+    if max_size is not None:
+        max_size = int(max_size)
+        if max_size < MIN_RENDER_SIZE:
+            raise ValueError(f"max_size must be at least {MIN_RENDER_SIZE}")
+        return max_size
+    tier = tier or DEFAULT_TIER
+    if tier not in RENDER_TIERS:
+        raise ValueError(f"Unknown tier '{tier}'. Expected one of {list(RENDER_TIERS)}")
+    return RENDER_TIERS[tier]
+
+
+def tier_for_size(max_size):
+    """Name of the smallest tier that covers max_size (selects encoder defaults)."""
+    if max_size is None:
+        return "full"
+    if max_size <= RENDER_TIERS["preview"]:
+        return "preview"
+    if max_size <= RENDER_TIERS["standard"]:
+        return "standard"
+    return "full"
+
+
+class CompiledGarment:
+    """
+    Everything a render needs from a garment that does not depend on the fabric:
+    the decoded RGBA base, the alpha plane at base size and the mask bounding box.
+
+    Pixels are stored as read-only uint8 arrays (H x W x 4 and H x W) because
+    instances are shared between requests and threads.
+    """
+
+    def __init__(self, base, alpha, bbox):
+        self.base = base
+        self.alpha = alpha
+        self.bbox = bbox
+        self.base.flags.writeable = False
+        self.alpha.flags.writeable = False
+
+    @property
+    def size(self):
+        """(width, height) of the mockup base, PIL-style."""
+        return (self.base.shape[1], self.base.shape[0])
+
+    @property
+    def nbytes(self):
+        """Decoded size in bytes (RGBA base + L alpha)."""
+        return self.base.nbytes + self.alpha.nbytes
+
+    def base_image(self):
+        """Read-only RGBA PIL view of the base (no copy)."""
+        return Image.fromarray(self.base)
+
+    def alpha_image(self):
+        """Read-only L PIL view of the alpha plane (no copy)."""
+        return Image.fromarray(self.alpha)
+
+    def scaled(self, max_size):
+        """
+        Returns a copy downscaled so its long edge is at most max_size
+        (or self if it already fits).
+        """
+        width, height = self.size
+        scale = max_size / max(width, height)
+        if scale >= 1:
+            return self
+        new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        # Pillow premultiplies RGBA when resampling, so transparent edges stay clean
+        base = self.base_image().resize(new_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        alpha = self.alpha_image().resize(new_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        x, y, w, h = self.bbox
+        bbox = (
+            round(x * scale), round(y * scale),
+            max(1, round(w * scale)), max(1, round(h * scale))
+        )
+        return CompiledGarment(np.asarray(base), np.asarray(alpha), bbox)
+
+
+class GarmentCache:
+    """
+    Thread-safe LRU cache of CompiledGarment objects bounded by a memory budget.
+
+    Keys include the mtimes of the mockup and mask files, so replacing an asset
+    on disk transparently invalidates its compiled garment. Downscaled tiers of
+    the same garment are cached under their own max_size.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_GARMENT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(mockup_path, mask_path, max_size=None):
+        # (identity..., version...): entries sharing key[:3] are the same garment tier
+        return (
+            os.path.abspath(mockup_path),
+            os.path.abspath(mask_path),
+            max_size,
+            os.path.getmtime(mockup_path),
+            os.path.getmtime(mask_path),
+        )
+
+    def get(self, mockup_path, mask_path, compile_fn, max_size=None):
+        """
+        Returns the compiled garment for the pair (at max_size, if given),
+        building it with compile_fn(mockup_path, mask_path) on a miss.
+        """
+        key = self.make_key(mockup_path, mask_path, max_size)
+        with self._lock:
+            garment = self._entries.get(key)
+            if garment is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return garment
+            self.misses += 1
+
+        # Compile outside the lock so other garments are not blocked by a slow decode
+        garment = compile_fn(mockup_path, mask_path)
+        self.put(key, garment)
+        return garment
+
+    def put(self, key, garment):
+        with self._lock:
+            # Drop stale entries for the same asset pair and tier (older mtimes)
+            for stale_key in [k for k in self._entries if k[:3] == key[:3] and k != key]:
+                self._bytes -= self._entries.pop(stale_key).nbytes
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key).nbytes
+            if garment.nbytes > self.max_bytes:
+                # Larger than the whole budget: use it for this render, don't keep it
+                return
+            self._entries[key] = garment
+            self._bytes += garment.nbytes
+            self._evict()
+
+    def contains(self, mockup_path, mask_path, max_size=None):
+        """True if the current version of the garment tier is cached (no LRU update)."""
+        key = self.make_key(mockup_path, mask_path, max_size)
+        with self._lock:
+            return key in self._entries
+
+    def configure(self, max_bytes):
+        """Changes the memory budget, evicting least recently used entries if needed."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _evict(self):
+        while self._entries and self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Process-wide cache shared by every MockupGeneratorV2 instance
+garment_cache = GarmentCache()
+
+
+def mockup_output_stem(fabric_ref, base_mockup_name, variant):
+    """File name stem of a rendered view (the render key and extension follow it)."""
+    suffix = f"_{variant}" if variant else ""
+    return f"Mockup_{base_mockup_name}{suffix}_{fabric_ref}"
+
+
+def _file_identity(path):
+    """Cheap identity of an input file for render keys: name, size and mtime."""
+    stat = os.stat(path)
+    return [os.path.basename(path), stat.st_size, stat.st_mtime_ns]
+
+
+def _div255(values):
+    """Exact round(values / 255) for uint16 arrays holding at most 255 * 255."""
+    values = values + 128
+    return ((values + (values >> 8)) >> 8).astype(np.uint8)
 
 
 class MockupGeneratorV2:
@@ -18,9 +282,13 @@ class MockupGeneratorV2:
     - Applies entire fabric design to mask area using stretch-to-fit.
     - `generate_mockup` auto-detects garment variants (e.g., _face, _back)
       and generates all associated parts.
+    - Garment templates are compiled once per process (see `GarmentCache`).
+    - Compositing engine is selectable per instance ('pil' or 'numpy').
     """
     
-    def __init__(self, fabric_dir, mockup_dir, mask_dir, output_dir):
+    def __init__(self, fabric_dir, mockup_dir, mask_dir, output_dir, cache=None, engine=ENGINE_PIL,
+                 output_format="PNG", output_quality=None, png_compress_level=None, webp_lossless=False,
+                 swatch_cache_dir=None, bundle_dir=None, timer=None):
         """
         Initialize the generator with directory paths.
         
@@ -29,23 +297,54 @@ class MockupGeneratorV2:
             mockup_dir: Directory containing base mockup templates (white garment shapes)
             mask_dir: Directory containing mask files (WHITE = fabric area, BLACK = transparent)
             output_dir: Directory where generated mockups will be saved
+            cache: GarmentCache to use (defaults to the process-wide `garment_cache`)
+            engine: Compositing engine, 'pil' (full canvas) or 'numpy' (mask bbox only)
+            output_format: 'PNG', 'WEBP' or 'JPEG'
+            output_quality: Upper bound for lossy quality (1-100)
+            png_compress_level: zlib level for full-resolution PNGs (0-9)
+            webp_lossless: Encode WebP losslessly
+            swatch_cache_dir: Directory for swatch mip levels (None = always decode the original)
+            bundle_dir: Directory of precompiled garment bundles (None = always decode templates)
+            timer: Optional render_metrics.StageTimer that records per-stage timings
         """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown compositing engine '{engine}'. Expected one of {ENGINES}")
+        self.encoder_options = {
+            "output_format": output_format,
+            "quality": output_quality,
+            "png_compress_level": png_compress_level,
+            "webp_lossless": webp_lossless,
+        }
+        get_encoder(**self.encoder_options)  # Fail fast on an unsupported format
         self.fabric_dir = fabric_dir
         self.mockup_dir = mockup_dir
         self.mask_dir = mask_dir
         self.output_dir = output_dir
+        self.cache = cache if cache is not None else garment_cache
+        self.engine = engine
+        self.swatch_cache_dir = swatch_cache_dir
+        self.bundle_dir = bundle_dir
+        self.timer = timer
+        self._local = threading.local()  # view currently rendered by this thread
         
         # Ensure output directory exists
         os.makedirs(self.output_dir, exist_ok=True)
         
+    def _stage(self, name):
+        """Times a render stage (for this thread's current view) when a timer is attached."""
+        if self.timer is None:
+            return nullcontext({})
+        return self.timer.stage(name, getattr(self._local, 'view', None))
+    
     def find_file(self, directory, ref_code, extensions=['.png', '.jpg', '.jpeg']):
         """
-        Finds a file in a directory matching the ref_code (case-insensitive on Windows).
+        Finds a file in a directory matching the ref_code. Exact-case names
+        win; otherwise the name is matched case-insensitively with any extension.
         
         Args:
             directory: Directory to search in
             ref_code: Reference code/name of the file
-            extensions: List of acceptable file extensions
+            extensions: List of acceptable file extensions, in order of preference
             
         Returns:
             Full path to the file, or None if not found
@@ -58,33 +357,10 @@ class MockupGeneratorV2:
             print(f"  [!] Security: Rejected potential path traversal in ref_code: '{ref_code}'")
             return None
 
-        # First try exact match
-        for ext in extensions:
-            file_path = os.path.join(directory, f"{ref_code}{ext}")
-            if os.path.exists(file_path):
-                # print(f"DEBUG: Found exact match: {file_path}")
-                return file_path
-            
-            # Handle case-insensitive extensions
-            file_path_upper = os.path.join(directory, f"{ref_code}{ext.upper()}")
-            if os.path.exists(file_path_upper):
-                # print(f"DEBUG: Found exact match with upper extension: {file_path_upper}")
-                return file_path_upper
-        
-        # If not found, try case-insensitive filename search
-        try:
-            ref_code_lower = ref_code.lower()
-            files_in_dir = os.listdir(directory)
-            # print(f"DEBUG: Files in dir: {files_in_dir[:5]}... (total {len(files_in_dir)})")
-            
-            for filename in files_in_dir:
-                name_without_ext = os.path.splitext(filename)[0]
-                if name_without_ext.lower() == ref_code_lower:
-                    found_path = os.path.join(directory, filename)
-                    print(f"  [i] Found via case-insensitive search: '{filename}' (matches '{ref_code}')")
-                    return found_path
-        except Exception as e:
-            print(f"  Warning: Error during case-insensitive search: {e}")
+        # Performance: Served from the directory's in-memory index (no filesystem probing)
+        filename = get_asset_index(directory).find(ref_code, extensions, any_extension=True)
+        if filename:
+            return os.path.join(directory, filename)
         
         print(f"  [x] Not found: '{ref_code}' in '{directory}'")
         return None
@@ -137,75 +413,258 @@ class MockupGeneratorV2:
         
         return mask_gray
     
-    def apply_fabric_to_mockup(self, fabric_path, mockup_path, mask_path, output_path):
+    def compile_garment(self, mockup_path, mask_path):
         """
-        Main function: Applies fabric to mockup using stretch-to-fit method.
+        Decodes a mockup/mask pair into a CompiledGarment.
+        This is the fabric-independent half of a render and is cached per process.
         
-        Process:
-        1. Load fabric, mockup base, and mask
-        2. Extract mask boundaries (white areas)
-        3. Stretch fabric to exactly fit mask dimensions
-        4. Composite fabric onto mockup using mask alpha (white = visible)
-        5. Save final result
+        A mask whose size differs from the mockup is resized to the mockup, and
+        its bbox is scaled with it. The original code kept the bbox in mask
+        coordinates, so the fabric was stretched to the wrong area; renders of
+        such garments differ from it (RENDER_VERSION 2.5 retires them).
         
         Args:
-            fabric_path: Path to fabric design file
             mockup_path: Path to base mockup template
             mask_path: Path to mask file (WHITE = fabric area)
-            output_path: Path where final mockup will be saved
             
         Returns:
-            True if successful, False otherwise
+            CompiledGarment with RGBA base, alpha plane at base size and bbox
         """
-        try:
-            # 1. Load images
-            print(f"  - Loading fabric: {os.path.basename(fabric_path)}")
-            fabric_img = Image.open(fabric_path).convert('RGBA')
-            
-            print(f"  - Loading mockup base: {os.path.basename(mockup_path)}")
-            mockup_img = Image.open(mockup_path).convert('RGBA')
-            
-            print(f"  - Loading mask: {os.path.basename(mask_path)}")
-            mask_img = Image.open(mask_path).convert('RGB')
-            
-            # 2. Extract mask boundaries (white areas)
-            print(f"  - Extracting mask boundaries (WHITE = fabric area)...")
+        print(f"  - Compiling garment: {os.path.basename(mockup_path)} + {os.path.basename(mask_path)}")
+        with self._stage('template_decode') as record:
+            with Image.open(mockup_path) as img:
+                mockup_img = img.convert('RGBA')
+            with Image.open(mask_path) as img:
+                mask_img = img.convert('RGB')
+            record['bytes'] = len(mockup_img.getbands()) * mockup_img.width * mockup_img.height
+        
+        with self._stage('mask_bounds'):
             mask_x, mask_y, mask_width, mask_height = self.extract_mask_bounds(mask_img)
-            print(f"  - Mask area: {mask_width}x{mask_height} at position ({mask_x}, {mask_y})")
-            
-            # 3. Stretch fabric to EXACTLY fit mask dimensions
-            print(f"  - Stretching fabric from {fabric_img.size} to {mask_width}x{mask_height}...")
-            fabric_stretched = fabric_img.resize(
-                (mask_width, mask_height), 
-                Image.Resampling.LANCZOS  # High-quality resampling
-            )
-            
-            # 4. Create alpha mask from the mask (WHITE = opaque, BLACK = transparent)
-            print(f"  - Creating alpha channel from mask (WHITE areas will show fabric)...")
             alpha_mask = self.create_alpha_mask_from_white(mask_img)
             
-            # Resize alpha mask to match mockup dimensions if needed
+            # Resize alpha mask (and its bbox) to match mockup dimensions if needed
             if alpha_mask.size != mockup_img.size:
+                scale_x = mockup_img.size[0] / alpha_mask.size[0]
+                scale_y = mockup_img.size[1] / alpha_mask.size[1]
                 alpha_mask = alpha_mask.resize(mockup_img.size, Image.Resampling.LANCZOS)
+                mask_x, mask_y = round(mask_x * scale_x), round(mask_y * scale_y)
+                mask_width = max(1, round(mask_width * scale_x))
+                mask_height = max(1, round(mask_height * scale_y))
+        
+        return CompiledGarment(
+            np.asarray(mockup_img),
+            np.asarray(alpha_mask),
+            (mask_x, mask_y, mask_width, mask_height)
+        )
+    
+    def load_garment(self, mockup_path, mask_path):
+        """
+        Garment cache miss handler: maps the garment zero-copy from its
+        precompiled bundle when one exists, otherwise decodes the sources.
+        """
+        if self.bundle_dir:
+            with self._stage('bundle_map'):
+                mapped = get_bundle_store(self.bundle_dir).load(self, mockup_path, mask_path)
+            if mapped is not None:
+                return CompiledGarment(*mapped)
+        return self.compile_garment(mockup_path, mask_path)
+    
+    def encoder_for(self, max_size=None):
+        """Encoder for an output size, using the matching tier's defaults."""
+        return get_encoder(tier=tier_for_size(max_size), **self.encoder_options)
+    
+    def get_compiled_garment(self, mockup_path, mask_path, max_size=None):
+        """
+        Returns the cached CompiledGarment for a mockup/mask pair, downscaled
+        to max_size (long edge) when given. Smaller tiers are derived from the
+        cached full-resolution garment, not re-decoded.
+        """
+        garment = self.cache.get(mockup_path, mask_path, self.load_garment)
+        if max_size is None or max(garment.size) <= max_size:
+            return garment
+        return self.cache.get(
+            mockup_path, mask_path,
+            lambda _mockup, _mask: garment.scaled(max_size),
+            max_size=max_size
+        )
+    
+    def composite_pil(self, fabric_img, garment):
+        """
+        Reference engine: builds a full-canvas fabric layer and runs
+        Image.alpha_composite over the whole mockup.
+        
+        Args:
+            fabric_img: PIL Image of the fabric
+            garment: CompiledGarment to apply it to
             
-            # 5. Create a blank canvas matching mockup size
-            final_canvas = mockup_img.copy()
-            
-            # 6. Paste stretched fabric onto the canvas at mask position
-            print(f"  - Compositing fabric onto mockup...")
+        Returns:
+            New RGBA PIL Image
+        """
+        mask_x, mask_y, mask_width, mask_height = garment.bbox
+        
+        # Stretch fabric to EXACTLY fit mask dimensions
+        with self._stage('resize'):
+            fabric_stretched = fabric_img.convert('RGBA').resize(
+                (mask_width, mask_height), 
+                Image.Resampling.LANCZOS  # High-quality resampling
+            )
+        
+        with self._stage('composite'):
             # Create a temporary image the size of the mockup to hold the fabric
-            fabric_layer = Image.new('RGBA', mockup_img.size, (255, 255, 255, 0))
+            fabric_layer = Image.new('RGBA', garment.size, (255, 255, 255, 0))
             fabric_layer.paste(fabric_stretched, (mask_x, mask_y))
             
-            # Apply the alpha mask to the fabric layer
-            fabric_layer.putalpha(alpha_mask)
+            # Apply the alpha mask to the fabric layer (WHITE = opaque, BLACK = transparent)
+            fabric_layer.putalpha(garment.alpha_image())
             
             # Composite fabric layer over mockup base
-            final_canvas = Image.alpha_composite(final_canvas, fabric_layer)
+            return Image.alpha_composite(garment.base_image(), fabric_layer)
+    
+    def composite_numpy(self, fabric_img, garment):
+        """
+        Vectorized engine: copies the base once and blends the stretched fabric
+        into the mask bbox in place with integer arithmetic. Nothing outside the
+        bbox is touched, so only one full-resolution buffer is allocated.
+        
+        Args:
+            fabric_img: PIL Image of the fabric
+            garment: CompiledGarment to apply it to
+            
+        Returns:
+            New RGBA PIL Image
+        """
+        mask_x, mask_y, mask_width, mask_height = garment.bbox
+        
+        # Fabric alpha is replaced by the mask, so only RGB needs resampling
+        with self._stage('resize'):
+            fabric_stretched = fabric_img.convert('RGB').resize(
+                (mask_width, mask_height),
+                Image.Resampling.LANCZOS
+            )
+        
+        with self._stage('composite'):
+            return self._blend_numpy(fabric_stretched, garment)
+    
+    def _blend_numpy(self, fabric_stretched, garment):
+        """Integer alpha blend of an already stretched fabric into a copy of the base."""
+        mask_x, mask_y, mask_width, mask_height = garment.bbox
+        src = np.asarray(fabric_stretched, dtype=np.uint16)
+        
+        canvas = garment.base.copy()
+        region = canvas[mask_y:mask_y + mask_height, mask_x:mask_x + mask_width]
+        # Clip the fabric if the bbox runs past the canvas edge
+        src = src[:region.shape[0], :region.shape[1]]
+        alpha = garment.alpha[mask_y:mask_y + mask_height, mask_x:mask_x + mask_width]
+        a = alpha.astype(np.uint16)[..., None]
+        dst_rgb = region[..., :3]
+        dst_a = region[..., 3]
+        
+        if dst_a.min() == 255:
+            # Opaque base (JPEG templates): out = (src * a + dst * (255 - a)) / 255
+            blended = src * a + dst_rgb.astype(np.uint16) * (255 - a)
+            dst_rgb[...] = _div255(blended)
+        else:
+            # Transparent base (PNG templates): full Porter-Duff "over"
+            d = dst_a.astype(np.uint32)[..., None]
+            a32 = a.astype(np.uint32)
+            dst_weight = d * (255 - a32)
+            out_a = a32 * 255 + dst_weight  # scaled by 255
+            numerator = src * a32 * 255 + dst_rgb.astype(np.uint32) * dst_weight
+            safe_a = np.maximum(out_a, 1)
+            dst_rgb[...] = ((numerator + safe_a // 2) // safe_a).astype(np.uint8)
+            dst_a[...] = ((out_a[..., 0] + 127) // 255).astype(np.uint8)
+        
+        return Image.fromarray(canvas)
+    
+    def composite(self, fabric_img, garment):
+        """Applies fabric to a compiled garment with this instance's engine."""
+        if self.engine == ENGINE_NUMPY:
+            return self.composite_numpy(fabric_img, garment)
+        return self.composite_pil(fabric_img, garment)
+    
+    def load_fabric(self, fabric_path, target_size=None):
+        """
+        Decodes a fabric file once, in the mode the active engine composites from.
+        
+        Args:
+            fabric_path: Path to fabric design file
+            target_size: Optional (width, height) the fabric will be stretched to.
+                         The fabric is then read from the smallest swatch pyramid
+                         level covering it or, without a pyramid, JPEGs are decoded
+                         at the smallest DCT scale that is still at least this large.
+            
+        Returns:
+            Loaded PIL Image (RGB for the numpy engine, RGBA for pil)
+        """
+        mode = 'RGB' if self.engine == ENGINE_NUMPY else 'RGBA'
+        with self._stage('fabric_decode') as record:
+            if target_size and self.swatch_cache_dir:
+                fabric_img = get_swatch_pyramid(self.swatch_cache_dir).get(fabric_path, target_size).convert(mode)
+            else:
+                with Image.open(fabric_path) as img:
+                    if target_size:
+                        img.draft('RGB', target_size)
+                    # Fabric alpha is replaced by the mask, so the numpy engine only needs RGB
+                    fabric_img = img.convert(mode)
+            record['bytes'] = len(mode) * fabric_img.width * fabric_img.height
+        return fabric_img
+    
+    def tile_fabric(self, fabric_img, size, scaling_factor=1.0):
+        """
+        Repeats the swatch across `size` instead of stretching it to fit.
+        One repeat spans scaling_factor x the target width (1.0 = one repeat
+        across the garment, 0.5 = repeats at half size) and keeps the swatch's
+        aspect ratio; tiling starts at the top-left corner of the bbox.
+        
+        Args:
+            fabric_img: PIL Image from load_fabric
+            size: (width, height) to fill, normally the mask bbox
+            scaling_factor: Repeat width relative to the target width (> 0)
             
-            # 7. Save the result
-            print(f"  - Saving mockup to: {output_path}")
-            final_canvas.save(output_path, 'PNG', quality=95)
+        Returns:
+            PIL Image of exactly `size`, in the mode of fabric_img
+        """
+        width, height = size
+        tile_width = max(1, round(width * scaling_factor))
+        tile_height = max(1, round(tile_width * fabric_img.height / fabric_img.width))
+        with self._stage('resize'):
+            tile = np.asarray(fabric_img.resize((tile_width, tile_height), Image.Resampling.LANCZOS))
+            
+            reps = (-(-height // tile_height), -(-width // tile_width)) + (1,) * (tile.ndim - 2)
+            tiled = np.tile(tile, reps)[:height, :width]
+            return Image.fromarray(np.ascontiguousarray(tiled))
+    
+    def render_variant(self, fabric_img, mockup_path, mask_path, output_path, max_size=None):
+        """
+        Composites an already decoded fabric onto one garment view and saves it.
+        Safe to call concurrently for different views.
+        
+        Args:
+            fabric_img: PIL Image from load_fabric
+            mockup_path: Path to base mockup template
+            mask_path: Path to mask file (WHITE = fabric area)
+            output_path: Path where final mockup will be saved
+            max_size: Optional maximum long edge of the output (None = full resolution)
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        self._local.view = os.path.splitext(os.path.basename(mockup_path))[0]
+        try:
+            print(f"  - Loading garment: {os.path.basename(mockup_path)}")
+            garment = self.get_compiled_garment(mockup_path, mask_path, max_size)
+            mask_x, mask_y, mask_width, mask_height = garment.bbox
+            print(f"  - Mask area: {mask_width}x{mask_height} at position ({mask_x}, {mask_y})")
+            
+            # Stretch fabric and composite it onto the mockup
+            print(f"  - Compositing fabric {fabric_img.size} -> {mask_width}x{mask_height} ({self.engine} engine)...")
+            final_canvas = self.composite(fabric_img, garment)
+            
+            encoder = self.encoder_for(max_size)
+            print(f"  - Saving mockup ({encoder.format}) to: {output_path}")
+            with self._stage('encode') as record:
+                encoder.save(final_canvas, output_path)
+                record['bytes'] = os.path.getsize(output_path)
             
             print(f"  [OK] Mockup generated successfully!")
             return True
@@ -219,86 +678,431 @@ class MockupGeneratorV2:
             traceback.print_exc()
             return False
     
-    def generate_mockup(self, fabric_ref, base_mockup_name):
+    def apply_fabric_to_mockup(self, fabric_path, mockup_path, mask_path, output_path):
+        """
+        Main function: Applies fabric to mockup using stretch-to-fit method.
+        
+        Process:
+        1. Load fabric and the compiled garment (mockup base, alpha, bbox)
+        2. Stretch fabric to exactly fit mask dimensions
+        3. Composite fabric onto mockup using mask alpha (white = visible)
+        4. Save final result
+        
+        Args:
+            fabric_path: Path to fabric design file
+            mockup_path: Path to base mockup template
+            mask_path: Path to mask file (WHITE = fabric area)
+            output_path: Path where final mockup will be saved
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            print(f"  - Loading fabric: {os.path.basename(fabric_path)}")
+            fabric_img = self.load_fabric(fabric_path)
+        except FileNotFoundError as e:
+            print(f"  [x] ERROR: File not found - {e}", file=sys.stderr)
+            return False
+        except Exception as e:
+            print(f"  [x] ERROR: Could not load fabric - {e}", file=sys.stderr)
+            return False
+        return self.render_variant(fabric_img, mockup_path, mask_path, output_path)
+    
+    def render_key(self, fabric_path, mockup_path, mask_path, max_size=None):
+        """
+        Content address of a render: a hash of the input file identities, the
+        engine, the render version and the output parameters.
+        
+        Returns:
+            16-character hex digest
+        """
+        key = {
+            "version": RENDER_VERSION,
+            "engine": self.engine,
+            "encoder": self.encoder_for(max_size).cache_params(),
+            "max_size": max_size,
+            "swatch_levels": bool(self.swatch_cache_dir),
+            "inputs": [_file_identity(p) for p in (fabric_path, mockup_path, mask_path)],
+        }
+        payload = json.dumps(key, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()[:16]
+    
+    def cached_output_path(self, fabric_path, mockup_path, mask_path, output_stem, max_size=None):
+        """Content-addressed output path: `{output_stem}.{render_key}.{ext}` in the output directory."""
+        digest = self.render_key(fabric_path, mockup_path, mask_path, max_size)
+        extension = self.encoder_for(max_size).extension
+        return os.path.join(self.output_dir, f"{output_stem}.{digest}.{extension}")
+    
+    def _render_atomic(self, fabric_img, mockup_path, mask_path, output_path, max_size=None):
+        """Renders through a temp file so concurrent requests never see a partial image."""
+        tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if not self.render_variant(fabric_img, mockup_path, mask_path, tmp_path, max_size):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        os.replace(tmp_path, output_path)
+        return output_path
+    
+    def discover_variants(self, base_mockup_name):
+        """
+        Finds every view of a garment from the asset set: each mockup named
+        `{base}_{variant}` that has a matching `{base}_mask_{variant}` mask.
+        
+        Args:
+            base_mockup_name: Base garment name (e.g., 'men polo')
+            
+        Returns:
+            List of (variant, mockup_path, mask_path), face/back first
+        """
+        prefix = f"{base_mockup_name}_".lower()
+        variants = set()
+        for filename in get_asset_index(self.mockup_dir).filenames():
+            stem, ext = os.path.splitext(filename)
+            if ext.lower() in IMAGE_EXTENSIONS and stem.lower().startswith(prefix):
+                variant = stem[len(prefix):]
+                # "{base}_mask..." never lives in the mockup dir, but be safe
+                if variant and not variant.lower().startswith('mask'):
+                    variants.add(variant)
+        
+        def order(variant):
+            lower = variant.lower()
+            return (VARIANT_ORDER.index(lower) if lower in VARIANT_ORDER else len(VARIANT_ORDER), lower)
+        
+        found = []
+        for variant in sorted(variants, key=order):
+            mockup_path = self.find_file(self.mockup_dir, f"{base_mockup_name}_{variant}")
+            mask_path = self.find_file(self.mask_dir, f"{base_mockup_name}_mask_{variant}")
+            if mockup_path and mask_path:
+                found.append((variant, mockup_path, mask_path))
+            else:
+                print(f"  [i] Skipping variant '{variant}': Missing matching mockup or mask file.")
+        return found
+    
+    def discover_garments(self):
+        """
+        Pairs every template in the mockup directory with its mask.
+        
+        Returns:
+            List of (base_name, variant, mockup_path, mask_path); variant is None
+            for single garments. Templates without a mask are skipped.
+        """
+        stems = sorted({os.path.splitext(f)[0] for f in get_asset_index(self.mockup_dir).filenames()
+                        if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS})
+        
+        garments = []
+        covered = set()
+        for stem in stems:
+            base = stem.rsplit('_', 1)[0]
+            if base.lower() in covered:
+                continue
+            if base != stem:
+                variants = self.discover_variants(base)
+                if variants:
+                    covered.add(base.lower())
+                    garments.extend((base, variant, mockup, mask) for variant, mockup, mask in variants)
+                    continue
+            mask_path = self.find_file(self.mask_dir, f"{stem}_mask")
+            if mask_path:
+                covered.add(stem.lower())
+                garments.append((stem, None, self.find_file(self.mockup_dir, stem), mask_path))
+            else:
+                print(f"  [i] Skipping template '{stem}': No matching mask.")
+        return garments
+    
+    def prewarm(self, max_sizes=(None,)):
+        """
+        Compiles every garment in the asset set into the garment cache so no
+        request pays for the template/mask decode. Garments beyond the cache
+        budget are compiled but evicted again (reported as not resident).
+        
+        Args:
+            max_sizes: Output sizes to compile (None = full resolution). Sizes the
+                       full garment already fits are served by it and skipped.
+            
+        Returns:
+            List of dicts: garment, variant, max_size, seconds, bytes, resident
+        """
+        report = []
+        for base, variant, mockup_path, mask_path in self.discover_garments():
+            try:
+                start = time.perf_counter()
+                full = self.get_compiled_garment(mockup_path, mask_path)
+                full_seconds = time.perf_counter() - start
+            except Exception as e:
+                print(f"  [x] ERROR: Could not compile '{base}' ({variant or 'single'}): {e}", file=sys.stderr)
+                continue
+            for max_size in max_sizes:
+                if max_size is None:
+                    garment, seconds = full, full_seconds
+                elif max(full.size) <= max_size:
+                    continue
+                else:
+                    start = time.perf_counter()
+                    garment = self.get_compiled_garment(mockup_path, mask_path, max_size)
+                    seconds = time.perf_counter() - start
+                report.append({
+                    "garment": base,
+                    "variant": variant,
+                    "max_size": max_size,
+                    "seconds": seconds,
+                    "bytes": garment.nbytes,
+                    "paths": (mockup_path, mask_path),
+                })
+        # Checked at the end: later garments may have evicted earlier ones
+        for entry in report:
+            entry["resident"] = self.cache.contains(*entry.pop("paths"), entry["max_size"])
+        return report
+    
+    def resolve_views(self, base_mockup_name):
+        """
+        Views to render for a garment: its discovered variants or, if it has
+        none, the single (base) mockup/mask pair.
+        
+        Returns:
+            List of (variant, mockup_path, mask_path); variant is None for single
+            garments. Empty if no usable files exist.
+        """
+        views = self.discover_variants(base_mockup_name)
+        if views:
+            return views
+        
+        print(f"--- Processing Single Garment: {base_mockup_name} ---")
+        mockup_path = self.find_file(self.mockup_dir, base_mockup_name)
+        mask_path = self.find_file(self.mask_dir, f"{base_mockup_name}_mask")
+        if not (mockup_path and mask_path):
+            print(f"[x] ERROR: No files found for base garment '{base_mockup_name}'.")
+            print(f"  Checked for mockup: {mockup_path}")
+            print(f"  Checked for mask: {mask_path}")
+            return []
+        return [(None, mockup_path, mask_path)]
+    
+    def lookup_views(self, fabric_ref, base_mockup_name, view=None):
+        """
+        Finds the fabric file and the garment views to render.
+        
+        Args:
+            fabric_ref: Fabric reference code
+            base_mockup_name: Base garment name
+            view: Only this variant (e.g. 'back'), first match; None = all views
+            
+        Returns:
+            (fabric_path, [(variant, mockup_path, mask_path), ...]);
+            (None, []) if the fabric does not exist
+        """
+        self._local.view = None
+        with self._stage('lookup'):
+            fabric_path = self.find_file(self.fabric_dir, fabric_ref)
+            if not fabric_path:
+                print(f"[x] ERROR: Fabric '{fabric_ref}' not found in {self.fabric_dir}")
+                return None, []
+            views = self.resolve_views(base_mockup_name)
+            if view not in (None, "single"):
+                views = [v for v in views if v[0] and v[0].lower() == view.lower()][:1]
+            return fabric_path, views
+    
+    def estimate_render_bytes(self, fabric_ref, base_mockup_name, view=None, tier=None, max_size=None,
+                              skip_rendered=False):
+        """
+        Estimates the peak memory of a render from image headers alone
+        (nothing is decoded), for admission control before rendering.
+        
+        Counts the decoded fabric once, every view rendered concurrently and
+        compiling any garment that is not in the garment cache yet.
+        
+        Args:
+            fabric_ref: Fabric reference code
+            base_mockup_name: Base garment name
+            view: Single variant to render (as for render_view_bytes); None = all views
+            tier: Output tier - 'preview', 'standard' or 'full' (default)
+            max_size: Explicit maximum long edge in pixels (overrides tier)
+            skip_rendered: Leave out views whose content-addressed output already
+                           exists (generate_mockup reuses those without rendering)
+            
+        Returns:
+            Estimated bytes (0 if the fabric or garment does not exist, or with
+            skip_rendered if every view is already rendered)
+        """
+        max_size = resolve_max_size(tier, max_size)
+        fabric_path, views = self.lookup_views(fabric_ref, base_mockup_name, view)
+        if skip_rendered:
+            views = [v for v in views if not os.path.exists(self.cached_output_path(
+                fabric_path, v[1], v[2], mockup_output_stem(fabric_ref, base_mockup_name, v[0]), max_size))]
+        if not views:
+            return 0
+        
+        total = 0
+        largest_output = (0, 0)
+        for _, mockup_path, mask_path in views:
+            with Image.open(mockup_path) as img:
+                width, height = img.size
+            if not self.cache.contains(mockup_path, mask_path):
+                total += width * height * COMPILE_BYTES_PER_PIXEL
+            if max_size is not None and max(width, height) > max_size:
+                scale = max_size / max(width, height)
+                width, height = round(width * scale), round(height * scale)
+            total += width * height * RENDER_BYTES_PER_PIXEL[self.engine]
+            largest_output = (max(largest_output[0], width), max(largest_output[1], height))
+        
+        with Image.open(fabric_path) as img:
+            fabric_width, fabric_height = img.size
+        if max_size is not None or self.swatch_cache_dir:
+            # Draft decoding / the pyramid never load more than the output needs (roughly)
+            fabric_width = min(fabric_width, largest_output[0] * 2)
+            fabric_height = min(fabric_height, largest_output[1] * 2)
+        return total + fabric_width * fabric_height * 4
+    
+    def render_view_bytes(self, fabric_ref, base_mockup_name, view=None, tier=None, max_size=None):
+        """
+        Renders one view entirely in memory and encodes it, for streaming
+        straight into an HTTP response (nothing is written to disk).
+        
+        Args:
+            fabric_ref: Fabric reference code
+            base_mockup_name: Base garment name
+            view: Variant name (e.g. 'back'); defaults to the first view
+            tier: Output tier - 'preview', 'standard' or 'full' (default)
+            max_size: Explicit maximum long edge in pixels (overrides tier)
+            
+        Returns:
+            (bytes, mimetype), or None if the fabric or view does not exist
+        """
+        max_size = resolve_max_size(tier, max_size)
+        fabric_path, views = self.lookup_views(fabric_ref, base_mockup_name, view)
+        if not views:
+            return None
+        _, mockup_path, mask_path = views[0]
+        self._local.view = os.path.splitext(os.path.basename(mockup_path))[0]
+        
+        garment = self.get_compiled_garment(mockup_path, mask_path, max_size)
+        target_size = garment.bbox[2:] if (max_size is not None or self.swatch_cache_dir) else None
+        fabric_img = self.load_fabric(fabric_path, target_size)
+        canvas = self.composite(fabric_img, garment)
+        encoder = self.encoder_for(max_size)
+        with self._stage('encode') as record:
+            data = encoder.encode_bytes(canvas)
+            record['bytes'] = len(data)
+        return data, encoder.mimetype
+    
+    def generate_mockup_image_object(self, fabric_ref, base_mockup_name, scaling_factor=1.0, view=None,
+                                     tier=None, max_size=None):
+        """
+        Renders one view in memory with the swatch tiled at a real repeat scale,
+        for callers that consume the image directly (e.g. techpack PDFs).
+        Nothing is written to or re-read from the output directory.
+        
+        Args:
+            fabric_ref: Fabric reference code
+            base_mockup_name: Base garment name
+            scaling_factor: Repeat width relative to the mask bbox width
+                            (1.0 = one repeat across the garment, 0.5 = half size)
+            view: Variant name (e.g. 'back'); defaults to the first view
+            tier: Output tier - 'preview', 'standard' or 'full' (default)
+            max_size: Explicit maximum long edge in pixels (overrides tier)
+            
+        Returns:
+            RGBA PIL Image, or None if the fabric or garment does not exist
+            
+        Raises:
+            ValueError: scaling_factor is not positive
+        """
+        if not scaling_factor or scaling_factor <= 0:
+            raise ValueError(f"scaling_factor must be > 0, got {scaling_factor}")
+        max_size = resolve_max_size(tier, max_size)
+        fabric_path, views = self.lookup_views(fabric_ref, base_mockup_name, view)
+        if not views:
+            return None
+        _, mockup_path, mask_path = views[0]
+        self._local.view = os.path.splitext(os.path.basename(mockup_path))[0]
+        
+        try:
+            garment = self.get_compiled_garment(mockup_path, mask_path, max_size)
+            bbox_size = garment.bbox[2:]
+            # Only the repeat width is known up front; its height follows the swatch
+            repeat_width = max(1, round(bbox_size[0] * scaling_factor))
+            fabric_img = self.load_fabric(fabric_path, (repeat_width, 1))
+            print(f"  - Tiling fabric {fabric_img.size} at scale {scaling_factor} across {bbox_size[0]}x{bbox_size[1]}")
+            return self.composite(self.tile_fabric(fabric_img, bbox_size, scaling_factor), garment)
+        except Exception as e:
+            print(f"  [x] ERROR: {e}", file=sys.stderr)
+            return None
+    
+    def generate_mockup(self, fabric_ref, base_mockup_name, tier=None, max_size=None):
         """
         High-level function to generate a mockup from reference codes.
-        Auto-detects _face and _back variants.
+        Auto-detects variants (e.g., _face, _back) from the available files.
+        The fabric is decoded once and missing variants are rendered concurrently.
         
         Args:
             fabric_ref: Fabric reference code (e.g., 'FAB-101')
             base_mockup_name: Base garment name (e.g., 'men polo' or 'Ladies Hoodie')
+            tier: Output tier - 'preview', 'standard' or 'full' (default)
+            max_size: Explicit maximum long edge in pixels (overrides tier)
             
         Returns:
-            A list of paths to generated mockups if successful, or None if all fail.
+            A list of (variant, path) pairs in view order (variant is None for a
+            single garment) for the mockups generated, or None if all fail.
         """
+        max_size = resolve_max_size(tier, max_size)
         print(f"\n{'='*60}")
-        print(f"Mockup Generator 2.1 - Stretch-to-Fit Mode")
+        print(f"Mockup Generator 2.7 - Stretch-to-Fit Mode")
         print(f"Fabric: {fabric_ref}")
         print(f"Base Garment: {base_mockup_name}")
+        print(f"Output: {'full resolution' if max_size is None else f'max {max_size}px'}")
         print(f"{'='*60}\n")
         
-        # Find fabric file
-        fabric_path = self.find_file(self.fabric_dir, fabric_ref)
+        # --- 1. Find the fabric and collect views: discovered variants, else a single (base) garment ---
+        fabric_path, found_views = self.lookup_views(fabric_ref, base_mockup_name)
         if not fabric_path:
-            print(f"[x] ERROR: Fabric '{fabric_ref}' not found in {self.fabric_dir}")
+            return None
+        views = []
+        for variant, mockup_path, mask_path in found_views:
+            views.append((variant, mockup_path, mask_path, mockup_output_stem(fabric_ref, base_mockup_name, variant)))
+        if not views:
             return None
         
-        generated_files = []
-        variants_found = False
+        # --- 2. Reuse content-addressed renders; only the rest need the fabric ---
+        output_paths = []
+        pending = []
+        for variant, mockup_path, mask_path, output_stem in views:
+            output_path = self.cached_output_path(fabric_path, mockup_path, mask_path, output_stem, max_size)
+            output_paths.append((variant, output_path))
+            if os.path.exists(output_path):
+                print(f"  [i] Reusing cached render: {os.path.basename(output_path)}")
+                # Performance: Keeps the render out of prune_outputs' least recently used end
+                touch_output(output_path)
+            else:
+                pending.append((variant, mockup_path, mask_path, output_path))
         
-        # --- 1. Check for variants (e.g., _face, _back) ---
-        variants = ["face", "back"] # Add more here like "side" if needed
-        for variant in variants:
-            mockup_name_variant = f"{base_mockup_name}_{variant}"
-            mask_ref_variant = f"{base_mockup_name}_mask_{variant}"
+        rendered = set()
+        if pending:
+            try:
+                target_size = None
+                if max_size is not None or self.swatch_cache_dir:
+                    # The fabric only needs to be as large as the biggest bbox
+                    bboxes = [self.get_compiled_garment(v[1], v[2], max_size).bbox for v in pending]
+                    target_size = (max(b[2] for b in bboxes), max(b[3] for b in bboxes))
+                print(f"  - Loading fabric: {os.path.basename(fabric_path)}")
+                fabric_img = self.load_fabric(fabric_path, target_size)
+            except Exception as e:
+                print(f"[x] ERROR: Could not load fabric '{fabric_ref}': {e}", file=sys.stderr)
+                return None
             
-            mockup_path = self.find_file(self.mockup_dir, mockup_name_variant)
-            mask_path = self.find_file(self.mask_dir, mask_ref_variant)
+            def render(view):
+                variant, mockup_path, mask_path, output_path = view
+                print(f"--- Processing Variant: {variant or 'single'} ---")
+                return self._render_atomic(fabric_img, mockup_path, mask_path, output_path, max_size)
             
-            if mockup_path and mask_path:
-                variants_found = True
-                print(f"--- Processing Variant: {variant} ---")
-                output_filename = f"Mockup_{mockup_name_variant}_{fabric_ref}.png"
-                output_path = os.path.join(self.output_dir, output_filename)
-                
-                success = self.apply_fabric_to_mockup(
-                    fabric_path, 
-                    mockup_path, 
-                    mask_path, 
-                    output_path
-                )
-                if success:
-                    generated_files.append(output_path)
-                print(f"--- Finished Variant: {variant} ---")
-            elif mockup_path or mask_path:
-                print(f"  [i] Skipping variant '{variant}': Missing matching mockup or mask file.")
-
-        # --- 2. If no variants found, check for a single (base) file ---
-        if not variants_found:
-            print(f"--- Processing Single Garment: {base_mockup_name} ---")
-            mask_ref = f"{base_mockup_name}_mask"
-            mockup_path = self.find_file(self.mockup_dir, base_mockup_name)
-            mask_path = self.find_file(self.mask_dir, mask_ref)
-            
-            if mockup_path and mask_path:
-                output_filename = f"Mockup_{base_mockup_name}_{fabric_ref}.png"
-                output_path = os.path.join(self.output_dir, output_filename)
-                
-                success = self.apply_fabric_to_mockup(
-                    fabric_path, 
-                    mockup_path, 
-                    mask_path, 
-                    output_path
-                )
-                if success:
-                    generated_files.append(output_path)
+            if len(pending) == 1:
+                results = [render(pending[0])]
             else:
-                print(f"[x] ERROR: No files found for base garment '{base_mockup_name}'.")
-                print(f"  Checked for mockup: {mockup_path}")
-                print(f"  Checked for mask: {mask_path}")
-                return None
+                # Pillow and NumPy release the GIL in resize/composite/encode
+                with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                    results = list(executor.map(render, pending))
+            rendered = {path for path in results if path}
         
-        # --- 3. Return results ---
+        # --- 3. Return results (in view order) ---
+        failed = {view[3] for view in pending} - rendered
+        generated_files = [(variant, path) for variant, path in output_paths if path not in failed]
         if generated_files:
             return generated_files
         else:
@@ -0,0 +1,100 @@
+"""
+Mockup Outputs - retention for content-addressed renders.
+
+Every render is written to `{stem}.{render_key}.{ext}` in the output
+directory. A changed swatch, template, mask or encoder setting produces a new
+key, so the old file is never served again, but nothing removed it either.
+Renders are touched whenever they are reused, which makes their mtime a
+last-used time; prune_outputs deletes renders unused for longer than a
+maximum age, then the least recently used ones beyond a byte budget.
+Superseded renders are never touched again and are the first to go.
+
+Only content-addressed files (and abandoned temp files of interrupted
+renders) are considered; anything else in the directory is left alone.
+"""
+
+import os
+import re
+import time
+
+# `{stem}.{16 hex digits}.{ext}` as written by MockupGeneratorV2.cached_output_path
+RENDERED_OUTPUT_RE = re.compile(r'\.[0-9a-f]{16}\.[A-Za-z0-9]+$')
+# Temp files of renders still in progress are younger than this
+TEMP_FILE_MAX_AGE_SECONDS = 3600
+
+
+def touch_output(path):
+    """Marks a reused render as recently used (best effort)."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune_outputs(output_dir, max_age_seconds=None, max_bytes=None, dry_run=False):
+    """
+    Deletes rendered mockups that have not been used recently.
+
+    Args:
+        output_dir: Directory the mockup URLs are served from
+        max_age_seconds: Delete renders unused for longer than this (None = no age limit)
+        max_bytes: Then delete the least recently used renders until the rest fit (None = no limit)
+        dry_run: Report what would be deleted without deleting
+
+    Returns:
+        Dict with counts: scanned, removed, removed_bytes, kept, kept_bytes, temp_removed, seconds
+    """
+    start = time.perf_counter()
+    now = time.time()
+    renders, temp_files = [], []
+    try:
+        with os.scandir(output_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.endswith('.tmp'):
+                    if now - st.st_mtime > TEMP_FILE_MAX_AGE_SECONDS:
+                        temp_files.append(entry.path)
+                elif RENDERED_OUTPUT_RE.search(entry.name):
+                    renders.append((st.st_mtime, st.st_size, entry.path))
+    except FileNotFoundError:
+        pass
+
+    # Oldest first: expired renders, then whatever exceeds the byte budget
+    renders.sort()
+    kept_bytes = sum(size for _mtime, size, _path in renders)
+    doomed = []
+    for mtime, size, path in renders:
+        expired = max_age_seconds is not None and now - mtime > max_age_seconds
+        over_budget = max_bytes is not None and kept_bytes > max_bytes
+        if not (expired or over_budget):
+            break
+        doomed.append((size, path))
+        kept_bytes -= size
+
+    report = {"scanned": len(renders), "removed": 0, "removed_bytes": 0, "temp_removed": 0}
+    for size, path in doomed:
+        if not dry_run:
+            try:
+                os.remove(path)
+            except OSError:
+                kept_bytes += size
+                continue
+        report["removed"] += 1
+        report["removed_bytes"] += size
+    for path in temp_files:
+        if not dry_run:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+        report["temp_removed"] += 1
+
+    report["kept"] = report["scanned"] - report["removed"]
+    report["kept_bytes"] = kept_bytes
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
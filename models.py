@@ -1,4 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+import fabric_search
 
 db = SQLAlchemy()
 
@@ -21,3 +23,10 @@ class Fabric(db.Model):
     manufacturer_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     meta_data = db.Column(db.JSON)
     image_path = db.Column(db.String(255)) # Optimization: Store path to avoid N+1 lookups
+    # Listings join the owner's name into their projected query (fabric_listing.listing_query);
+    # only the ORM baseline in benchmark_listings.py loads the owner through this relationship
+    manufacturer = db.relationship('User', foreign_keys=[manufacturer_id])
+
+# Performance: The full-text search index lives and dies with the fabric table (see fabric_search.py)
+event.listen(Fabric.__table__, 'after_create', lambda target, connection, **kw: fabric_search.create_search_index(connection))
+event.listen(Fabric.__table__, 'before_drop', lambda target, connection, **kw: fabric_search.drop_search_index(connection))
@@ -0,0 +1,154 @@
+"""
+Render Admission - bounds the memory of renders in flight on one host.
+
+Each render reserves its estimated peak bytes before it starts. When the
+budget is exhausted, new renders wait briefly for running ones to release
+their reservation and are otherwise rejected, so a burst is turned away with
+a 503 instead of pushing the host into swap or the OOM killer.
+
+gunicorn runs several worker processes, each with its own RenderAdmission.
+With a ledger file the reservations of every worker are kept in one JSON
+file, read and written under an exclusive flock, so the budget covers the
+whole host like the render job state files do. Reservations of processes
+that died without releasing them are dropped the next time the ledger is
+read. Without a ledger (or without fcntl, e.g. on Windows) the budget only
+covers the current process.
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, the budget stays per process
+    fcntl = None
+
+# Releases in other processes are not signalled: waiting renders re-read the ledger this often
+LEDGER_POLL_SECONDS = 0.05
+
+
+class AdmissionRejected(Exception):
+    """Raised when a render cannot be admitted within the wait limit."""
+
+    def __init__(self, requested_bytes, retry_after):
+        super().__init__(f"Render memory budget exhausted ({requested_bytes} bytes requested)")
+        self.requested_bytes = requested_bytes
+        self.retry_after = retry_after
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RenderAdmission:
+    """
+    Memory budget for renders, shared by every process using the same ledger.
+
+    A render larger than the whole budget is still admitted when nothing else
+    is in flight (in any process sharing the ledger), so oversized garments
+    degrade to serial rendering rather than being refused forever.
+    """
+
+    def __init__(self, budget_bytes, max_wait_seconds=2.0, retry_after_seconds=5, ledger_path=None):
+        self.budget_bytes = budget_bytes
+        self.max_wait_seconds = max_wait_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.ledger_path = ledger_path if fcntl is not None else None
+        self._tokens = itertools.count()
+        self._in_flight_bytes = 0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self.admitted = 0
+        self.rejected = 0
+
+    def _fits(self, in_flight, in_flight_bytes, nbytes):
+        return in_flight == 0 or in_flight_bytes + nbytes <= self.budget_bytes
+
+    @contextmanager
+    def _ledger(self):
+        """Yields the live reservations {"pid:n": bytes} under an exclusive lock; changes are written back."""
+        os.makedirs(os.path.dirname(self.ledger_path) or ".", exist_ok=True)
+        with open(self.ledger_path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    entries = json.loads(f.read() or "{}")
+                except ValueError:
+                    entries = {}
+                # Reliability: A worker killed mid-render must not hold its bytes forever
+                entries = {token: nbytes for token, nbytes in entries.items()
+                           if _process_alive(int(token.split(":")[0]))}
+                yield entries
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(entries))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _reserve(self, token, nbytes):
+        if self.ledger_path is None:
+            return self._fits(self._in_flight, self._in_flight_bytes, nbytes)
+        with self._ledger() as entries:
+            if not self._fits(len(entries), sum(entries.values()), nbytes):
+                return False
+            entries[token] = nbytes
+            return True
+
+    @contextmanager
+    def admit(self, nbytes):
+        """
+        Reserves nbytes for the duration of the block.
+
+        Raises:
+            AdmissionRejected: The budget did not free up within max_wait_seconds
+        """
+        token = f"{os.getpid()}:{next(self._tokens)}"
+        deadline = time.monotonic() + self.max_wait_seconds
+        with self._condition:
+            while not self._reserve(token, nbytes):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise AdmissionRejected(nbytes, self.retry_after_seconds)
+                self._condition.wait(min(remaining, LEDGER_POLL_SECONDS) if self.ledger_path else remaining)
+            self._in_flight_bytes += nbytes
+            self._in_flight += 1
+            self.admitted += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                if self.ledger_path is not None:
+                    with self._ledger() as entries:
+                        entries.pop(token, None)
+                self._in_flight_bytes -= nbytes
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def stats(self):
+        """Counters of this process; host_* cover every process sharing the ledger."""
+        with self._condition:
+            stats = {
+                "in_flight": self._in_flight,
+                "in_flight_bytes": self._in_flight_bytes,
+                "budget_bytes": self.budget_bytes,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+            }
+            if self.ledger_path is not None:
+                with self._ledger() as entries:
+                    stats["host_in_flight"] = len(entries)
+                    stats["host_in_flight_bytes"] = sum(entries.values())
+            return stats
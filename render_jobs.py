@@ -0,0 +1,235 @@
+"""
+Render Jobs - asynchronous job queue for long-running renders and exports.
+
+Work runs on the RenderPool's worker processes so API workers return
+immediately. Job state lives in small JSON files (one per job) so that any
+gunicorn worker can answer status polls, not only the one that queued it.
+
+The final state is written by the API process that submitted the job. If that
+process goes away first (gunicorn recycles or kills workers), nothing ever
+finishes the job, so jobs left unfinished for longer than `stale_seconds`
+are reported as failed when they are read.
+
+Every read-modify-write of a job file (the worker marking it running, the
+stale check, the final state) holds an flock on the job's lock file, so a
+job failed as stale cannot be flipped back to running by a worker that only
+now picked it up.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, job updates are unsynchronized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+TERMINAL_STATES = (JOB_DONE, JOB_FAILED)
+
+JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class JobSuperseded(Exception):
+    """Raised in the worker when a job is no longer queued (e.g. failed as stale) by the time it starts."""
+
+
+def _job_path(job_dir, job_id):
+    return os.path.join(job_dir, f"{job_id}.json")
+
+
+@contextmanager
+def _job_lock(job_dir, job_id):
+    """Exclusive lock on one job, shared by API workers and pool worker processes."""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(job_dir, f"{job_id}.lock"), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_job(job_dir, job):
+    """Atomically replaces the job file so readers never see partial JSON."""
+    path = _job_path(job_dir, job["id"])
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(job, f)
+    os.replace(tmp_path, path)
+
+
+def _read_job(job_dir, job_id):
+    try:
+        with open(_job_path(job_dir, job_id), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def run_job(job_dir, job_id, fn, args):
+    """
+    Worker-process entry point: marks the job running, then runs fn(*args).
+    The final state is written by the submitting process once the future resolves.
+
+    Raises:
+        JobSuperseded: The job is no longer queued (fn is not run)
+    """
+    with _job_lock(job_dir, job_id):
+        job = _read_job(job_dir, job_id)
+        if job is not None:
+            if job["status"] != JOB_QUEUED:
+                raise JobSuperseded(f"Job {job_id} is {job['status']}, not queued")
+            job["status"] = JOB_RUNNING
+            job["started_at"] = time.time()
+            _write_job(job_dir, job)
+    return fn(*args)
+
+
+class JobQueue:
+    """
+    File-backed job registry on top of a RenderPool.
+
+    fn passed to `submit` must be a picklable top-level function, since it is
+    executed in a worker process. `on_result` runs in the API process and turns
+    the raw return value into the JSON-serializable job result.
+    """
+
+    def __init__(self, pool, job_dir, ttl_seconds=3600, stale_seconds=600):
+        self.pool = pool
+        self.job_dir = job_dir
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        os.makedirs(self.job_dir, exist_ok=True)
+
+    def submit(self, kind, owner_id, fn, args=(), on_result=None):
+        """
+        Queues fn(*args) and returns the new job record immediately.
+
+        Args:
+            kind: Job type, e.g. 'mockup' (later 'techpack', 'pptx')
+            owner_id: Id of the user allowed to read the job
+            fn: Picklable callable run in a worker process
+            args: Arguments for fn (must be picklable)
+            on_result: Optional callable mapping fn's return value to the job result;
+                       returning None marks the job failed
+
+        Returns:
+            Job dict
+        """
+        self.prune()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "owner_id": str(owner_id),
+            "status": JOB_QUEUED,
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        _write_job(self.job_dir, job)
+
+        future = self.pool.submit_call(run_job, self.job_dir, job["id"], fn, args)
+        future.add_done_callback(lambda f: self._finish(job["id"], f, on_result))
+        return job
+
+    def _finish(self, job_id, future, on_result):
+        try:
+            value = future.result()
+            result = on_result(value) if on_result else value
+            if result is None:
+                update = {"status": JOB_FAILED, "error": "Job produced no output"}
+            else:
+                update = {"status": JOB_DONE, "result": result}
+        except JobSuperseded:
+            # Already failed as stale; that state stands
+            return
+        except MemoryError:
+            update = {"status": JOB_FAILED, "error": "Server ran out of memory processing this job"}
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            update = {"status": JOB_FAILED, "error": "Job failed"}
+        with _job_lock(self.job_dir, job_id):
+            job = _read_job(self.job_dir, job_id)
+            if job is None:
+                return
+            job.update(update, finished_at=time.time())
+            try:
+                _write_job(self.job_dir, job)
+            except OSError as e:
+                logger.error(f"Could not record result of job {job_id}: {e}")
+
+    def get(self, job_id):
+        """Returns the job dict, or None for unknown/invalid ids."""
+        if not job_id or not JOB_ID_RE.match(job_id):
+            return None
+        job = _read_job(self.job_dir, job_id)
+        if job is not None and job["status"] not in TERMINAL_STATES and self._is_stale(job):
+            job = self._fail_if_stale(job_id)
+        return job
+
+    def _is_stale(self, job):
+        since = job["started_at"] or job["created_at"]
+        return time.time() - since >= self.stale_seconds
+
+    def _fail_if_stale(self, job_id):
+        """
+        Marks a job failed once it has been queued or running past stale_seconds
+        (its submitting process is gone, or it will never finish in time).
+        A late result from a live submitter still overwrites this.
+
+        Returns:
+            The job as it is now
+        """
+        with _job_lock(self.job_dir, job_id):
+            # Re-read under the lock: the worker may have just started it, or the submitter finished it
+            job = _read_job(self.job_dir, job_id)
+            if job is None or job["status"] in TERMINAL_STATES or not self._is_stale(job):
+                return job
+            job["status"] = JOB_FAILED
+            job["error"] = "Job did not finish; please retry"
+            job["finished_at"] = time.time()
+            try:
+                _write_job(self.job_dir, job)
+            except OSError as e:
+                logger.error(f"Could not mark stale job {job_id} failed: {e}")
+        return job
+
+    def prune(self):
+        """Deletes job files (and their lock files) older than the TTL."""
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            for entry in os.scandir(self.job_dir):
+                if entry.name.endswith(('.json', '.lock')) and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+        except OSError as e:
+            logger.warning(f"Could not prune render jobs: {e}")
+
+
+def public_job(job):
+    """Job fields safe to return to clients."""
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
@@ -0,0 +1,114 @@
+"""
+Render Metrics - per-stage timings for mockup renders.
+
+A StageTimer records how long each stage of one request took (lookup,
+decode, mask bounds, resize, composite, encode) and how many bytes it
+produced. The API turns it into a Server-Timing header and feeds it into the
+process-wide RenderMetrics histograms exposed by the metrics endpoint.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in milliseconds (a final +Inf bucket is implicit)
+STAGE_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class StageTimer:
+    """
+    Records stage timings of one render. Safe to use from the threads that
+    render variants concurrently.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, view=None):
+        """
+        Times the block as stage `name`. The yielded dict may be given a
+        'bytes' entry (e.g. decoded or encoded size).
+        """
+        record = {"stage": name, "view": view, "seconds": 0.0, "bytes": None}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            with self._lock:
+                self.records.append(record)
+
+    def snapshot(self):
+        """Copy of the records so far."""
+        with self._lock:
+            return list(self.records)
+
+    def totals(self):
+        """{stage: (seconds summed over views, bytes summed or None)}, in first-seen order."""
+        totals = {}
+        for record in self.snapshot():
+            seconds, nbytes = totals.get(record["stage"], (0.0, None))
+            if record["bytes"] is not None:
+                nbytes = (nbytes or 0) + record["bytes"]
+            totals[record["stage"]] = (seconds + record["seconds"], nbytes)
+        return totals
+
+    def server_timing(self, total_seconds=None):
+        """Server-Timing header value, e.g. 'decode;dur=12.3, encode;dur=40.1'."""
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, (seconds, _) in self.totals().items()]
+        if total_seconds is not None:
+            entries.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(entries)
+
+
+class RenderMetrics:
+    """Process-wide histograms of stage durations plus byte counters."""
+
+    def __init__(self, buckets_ms=STAGE_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, timer):
+        """Adds every record of a StageTimer to the histograms."""
+        records = timer.snapshot()
+        with self._lock:
+            for record in records:
+                stage = self._stages.get(record["stage"])
+                if stage is None:
+                    stage = {"count": 0, "sum_seconds": 0.0, "bytes": 0,
+                             "buckets": [0] * (len(self.buckets_ms) + 1)}
+                    self._stages[record["stage"]] = stage
+                milliseconds = record["seconds"] * 1000
+                index = next((i for i, bound in enumerate(self.buckets_ms) if milliseconds <= bound),
+                             len(self.buckets_ms))
+                stage["buckets"][index] += 1
+                stage["count"] += 1
+                stage["sum_seconds"] += record["seconds"]
+                stage["bytes"] += record["bytes"] or 0
+
+    def snapshot(self):
+        """
+        JSON-serializable histograms with cumulative buckets keyed by their
+        upper bound in ms ('+Inf' last), Prometheus-style.
+        """
+        with self._lock:
+            stages = {name: dict(stage, buckets=list(stage["buckets"])) for name, stage in self._stages.items()}
+        for stage in stages.values():
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(list(self.buckets_ms) + ["+Inf"], stage["buckets"]):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            stage["buckets"] = buckets
+        return {"unit": "ms", "stages": stages}
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+# Process-wide metrics (each gunicorn worker reports its own)
+render_metrics = RenderMetrics()
@@ -0,0 +1,100 @@
+"""
+Render Pool - runs MockupGeneratorV2 in worker processes.
+
+Decode/resize/composite/encode is CPU-bound, so renders are fanned out to a
+bounded ProcessPoolExecutor instead of occupying API worker threads.
+Each worker process keeps its own MockupGeneratorV2 instances (and therefore
+its own warm garment cache) for the lifetime of the process.
+"""
+
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from mockup_library import MockupGeneratorV2, garment_cache
+from swatch_pyramid import configure_swatch_memory
+
+
+# ===== WORKER PROCESS SIDE =====
+# One generator per distinct configuration, created lazily in each worker
+_generators = {}
+
+
+def _init_worker(garment_cache_bytes, swatch_cache_bytes=None):
+    """Runs once in every worker process."""
+    if garment_cache_bytes is not None:
+        garment_cache.configure(max_bytes=garment_cache_bytes)
+    if swatch_cache_bytes is not None:
+        configure_swatch_memory(swatch_cache_bytes)
+
+
+def _get_generator(generator_kwargs):
+    key = tuple(sorted(generator_kwargs.items()))
+    generator = _generators.get(key)
+    if generator is None:
+        generator = MockupGeneratorV2(**generator_kwargs)
+        _generators[key] = generator
+    return generator
+
+
+def render_task(generator_kwargs, fabric_ref, mockup_name, max_size=None):
+    """
+    Generates every variant of one fabric/garment pair in a worker process.
+
+    Args:
+        generator_kwargs: Keyword arguments for MockupGeneratorV2 (dirs, engine)
+        fabric_ref: Fabric reference code
+        mockup_name: Base garment name
+        max_size: Maximum output long edge in pixels (None = full resolution)
+
+    Returns:
+        List of (variant, path) pairs, or None if nothing could be generated
+    """
+    return _get_generator(generator_kwargs).generate_mockup(fabric_ref, mockup_name, max_size=max_size)
+
+
+# ===== API PROCESS SIDE =====
+class RenderPool:
+    """
+    Lazily started, bounded process pool for mockup renders.
+
+    The pool is created on first use so that each gunicorn worker (and not the
+    master) owns its own children.
+    """
+
+    def __init__(self, max_workers=2, garment_cache_bytes=None, swatch_cache_bytes=None):
+        self.max_workers = max_workers
+        self.garment_cache_bytes = garment_cache_bytes
+        self.swatch_cache_bytes = swatch_cache_bytes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(self.garment_cache_bytes, self.swatch_cache_bytes)
+                )
+            return self._executor
+
+    def submit_call(self, fn, *args):
+        """Runs fn(*args) in a worker process; returns a concurrent.futures.Future."""
+        try:
+            return self.executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed): start a fresh pool and retry once
+            self.shutdown(wait=False)
+            return self.executor.submit(fn, *args)
+
+    def submit(self, generator_kwargs, fabric_ref, mockup_name, max_size=None):
+        """Queues one render; returns a concurrent.futures.Future of render_task."""
+        return self.submit_call(render_task, generator_kwargs, fabric_ref, mockup_name, max_size)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
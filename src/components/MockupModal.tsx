@@ -37,6 +37,13 @@ interface GarmentsByCategory {
 
 type ViewMode = 'select' | 'preview';
 
+// Extension of a mockup URL's file name, e.g. 'webp' for '/static/mockups/Mockup_tee_face_FAB-1.3fa2c9d1e0b7a645.webp'
+const fileExtension = (url: string): string => {
+  const name = url.split(/[?#]/)[0].split('/').pop() || '';
+  const dot = name.lastIndexOf('.');
+  return dot > 0 ? name.slice(dot + 1).toLowerCase() : 'png';
+};
+
 export const MockupModal: React.FC<MockupModalProps> = ({ fabric, isSelected, onClose, onToggleSelect }) => {
   const [viewMode, setViewMode] = useState<ViewMode>('select');
   const [garments, setGarments] = useState<GarmentsByCategory>({});
@@ -49,6 +56,8 @@ export const MockupModal: React.FC<MockupModalProps> = ({ fabric, isSelected, on
   const [isGenerating, setIsGenerating] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [currentView, setCurrentView] = useState<'face' | 'back' | 'single'>('face');
+  const [renderRequest, setRenderRequest] = useState<{ fabric_ref: string; mockup_name: string } | null>(null);
+  const [isDownloading, setIsDownloading] = useState(false);
 
   // Fetch available garments when modal opens
   useEffect(() => {
@@ -109,15 +118,19 @@ export const MockupModal: React.FC<MockupModalProps> = ({ fabric, isSelected, on
         display_name: garment.displayName
       });
 
+      const request = {
+        fabric_ref: fabricRef,
+        mockup_name: garment.name, // Use original casing
+      };
+      setRenderRequest(request);
+
+      // Performance: Render a reduced-size preview; full resolution is fetched on download
       const response = await fetch('/api/generate-mockup', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({
-          fabric_ref: fabricRef,
-          mockup_name: garment.name, // Use original casing
-        }),
+        body: JSON.stringify({ ...request, tier: 'preview' }),
       });
 
       if (response.ok) {
@@ -147,10 +160,43 @@ export const MockupModal: React.FC<MockupModalProps> = ({ fabric, isSelected, on
     }
   };
 
+  // Requests the full-resolution render (usually cached) and downloads it
+  const downloadFullResolution = async (view: 'face' | 'back' | 'single', baseName: string) => {
+    if (!renderRequest) return;
+
+    try {
+      setIsDownloading(true);
+      const response = await fetch('/api/generate-mockup', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ ...renderRequest, tier: 'full' }),
+      });
+      const data = response.ok ? await response.json() : null;
+      const url = data?.success ? data.mockups[view] : null;
+      if (!url) {
+        setError('Failed to prepare full-resolution download. Please try again.');
+        return;
+      }
+      const link = document.createElement('a');
+      link.href = url;
+      // The full tier may be encoded as PNG, WebP or JPEG; keep the server's extension
+      link.download = `${baseName}.${fileExtension(url)}`;
+      link.click();
+    } catch (err) {
+      console.error('Error downloading mockup:', err);
+      setError('Network error. Please check your connection.');
+    } finally {
+      setIsDownloading(false);
+    }
+  };
+
   const handleBack = () => {
     setViewMode('select');
     setMockupData(null);
     setSelectedGarment(null);
+    setRenderRequest(null);
     setError(null);
   };
 
@@ -488,12 +534,8 @@ export const MockupModal: React.FC<MockupModalProps> = ({ fabric, isSelected, on
                             <div className="mt-6 flex gap-3 justify-center">
                               {mockupData.views.includes('face') && mockupData.mockups.face && (
                                 <Button
-                                  onClick={() => {
-                                    const link = document.createElement('a');
-                                    link.href = mockupData.mockups.face!;
-                                    link.download = `${fabricName}_front.jpg`;
-                                    link.click();
-                                  }}
+                                  onClick={() => downloadFullResolution('face', `${fabricName}_front`)}
+                                  disabled={isDownloading}
                                   variant="outline"
                                   className="px-6 py-3 backdrop-blur-sm border-white/40 bg-white/30 hover:bg-white/50"
                                 >
@@ -505,12 +547,8 @@ export const MockupModal: React.FC<MockupModalProps> = ({ fabric, isSelected, on
                               )}
                               {mockupData.views.includes('back') && mockupData.mockups.back && (
                                 <Button
-                                  onClick={() => {
-                                    const link = document.createElement('a');
-                                    link.href = mockupData.mockups.back!;
-                                    link.download = `${fabricName}_back.jpg`;
-                                    link.click();
-                                  }}
+                                  onClick={() => downloadFullResolution('back', `${fabricName}_back`)}
+                                  disabled={isDownloading}
                                   variant="outline"
                                   className="px-6 py-3 backdrop-blur-sm border-white/40 bg-white/30 hover:bg-white/50"
                                 >
@@ -525,12 +563,8 @@ export const MockupModal: React.FC<MockupModalProps> = ({ fabric, isSelected, on
                           {mockupData.views.length === 1 && mockupData.mockups.single && (
                             <div className="mt-6 flex justify-center">
                               <Button
-                                onClick={() => {
-                                  const link = document.createElement('a');
-                                  link.href = mockupData.mockups.single!;
-                                  link.download = `${fabricName}_mockup.jpg`;
-                                  link.click();
-                                }}
+                                onClick={() => downloadFullResolution('single', `${fabricName}_mockup`)}
+                                disabled={isDownloading}
                                 variant="outline"
                                 className="px-6 py-3 backdrop-blur-sm border-white/40 bg-white/30 hover:bg-white/50"
                               >
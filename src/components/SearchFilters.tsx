@@ -10,36 +10,58 @@ import { Badge } from './ui/badge';
 interface SearchFiltersProps {
   filters: FabricFilter;
   setFilters: React.Dispatch<React.SetStateAction<FabricFilter>>;
+  searchTerm?: string;
 }
 
-export const SearchFilters: React.FC<SearchFiltersProps> = ({ filters, setFilters }) => {
+interface GroupFacet {
+  name: string;
+  count: number;
+}
+
+const WEIGHT_OPTIONS = [
+  { band: 'light', label: 'Lightweight (<160 GSM)' },
+  { band: 'medium', label: 'Midweight (160-240 GSM)' },
+  { band: 'heavy', label: 'Heavyweight (>240 GSM)' },
+];
+
+export const SearchFilters: React.FC<SearchFiltersProps> = ({ filters, setFilters, searchTerm = '' }) => {
   const [isMobileOpen, setIsMobileOpen] = useState(false);
-  const [fabricGroups, setFabricGroups] = useState<string[]>([]);
+  const [fabricGroups, setFabricGroups] = useState<GroupFacet[]>([]);
+  const [weightCounts, setWeightCounts] = useState<Record<string, number>>({});
   const [isLoadingGroups, setIsLoadingGroups] = useState(true);
 
-  // Fetch fabric groups from backend on mount
+  // Fetch group and weight counts for the current search (cached on the server per catalog version)
   useEffect(() => {
-    const fetchFabricGroups = async () => {
+    const fetchFacets = async () => {
       try {
-        setIsLoadingGroups(true);
-        const response = await fetch('/api/fabric-groups');
+        const params = new URLSearchParams();
+        if (searchTerm) params.append('search', searchTerm);
+        if (filters.fabrication) params.append('group', filters.fabrication);
+        if (filters.gsmRange) params.append('weight', filters.gsmRange);
+        const response = await fetch(`/api/fabric-facets?${params.toString()}`);
         if (response.ok) {
-          const groups = await response.json();
-          setFabricGroups(groups);
+          const facets = await response.json();
+          setFabricGroups(facets.groups || []);
+          setWeightCounts(Object.fromEntries(
+            (facets.weights || []).map((w: { band: string; count: number }) => [w.band, w.count])
+          ));
         } else {
-          console.error('Failed to fetch fabric groups');
+          console.error('Failed to fetch fabric facets');
           setFabricGroups([]);
         }
       } catch (error) {
-        console.error('Error fetching fabric groups:', error);
+        console.error('Error fetching fabric facets:', error);
         setFabricGroups([]);
       } finally {
         setIsLoadingGroups(false);
       }
     };
 
-    fetchFabricGroups();
-  }, []);
+    fetchFacets();
+  }, [searchTerm, filters.fabrication, filters.gsmRange]);
+
+  const weightLabel = (band: string, label: string) =>
+    band in weightCounts ? `${label} (${weightCounts[band]})` : label;
 
   const handleChange = (key: keyof FabricFilter, value: string) => {
     // Convert "all" back to empty string for filter logic
@@ -76,7 +98,7 @@ export const SearchFilters: React.FC<SearchFiltersProps> = ({ filters, setFilter
                   <SelectItem value="loading" disabled>Loading...</SelectItem>
                 ) : (
                   fabricGroups.map(group => (
-                    <SelectItem key={group} value={group}>{group}</SelectItem>
+                    <SelectItem key={group.name} value={group.name}>{group.name} ({group.count})</SelectItem>
                   ))
                 )}
               </SelectContent>
@@ -100,9 +122,9 @@ export const SearchFilters: React.FC<SearchFiltersProps> = ({ filters, setFilter
               </SelectTrigger>
               <SelectContent>
                 <SelectItem value="all">Any Weight</SelectItem>
-                <SelectItem value="light">Lightweight (&lt;160 GSM)</SelectItem>
-                <SelectItem value="medium">Midweight (160-240 GSM)</SelectItem>
-                <SelectItem value="heavy">Heavyweight (&gt;240 GSM)</SelectItem>
+                {WEIGHT_OPTIONS.map(({ band, label }) => (
+                  <SelectItem key={band} value={band}>{weightLabel(band, label)}</SelectItem>
+                ))}
               </SelectContent>
             </Select>
 
@@ -171,7 +193,7 @@ export const SearchFilters: React.FC<SearchFiltersProps> = ({ filters, setFilter
                       <SelectItem value="loading" disabled>Loading...</SelectItem>
                     ) : (
                       fabricGroups.map(group => (
-                        <SelectItem key={group} value={group}>{group}</SelectItem>
+                        <SelectItem key={group.name} value={group.name}>{group.name} ({group.count})</SelectItem>
                       ))
                     )}
                   </SelectContent>
@@ -203,9 +225,9 @@ export const SearchFilters: React.FC<SearchFiltersProps> = ({ filters, setFilter
                   </SelectTrigger>
                   <SelectContent>
                     <SelectItem value="all">Any Weight</SelectItem>
-                    <SelectItem value="light">Lightweight (&lt;160 GSM)</SelectItem>
-                    <SelectItem value="medium">Midweight (160-240 GSM)</SelectItem>
-                    <SelectItem value="heavy">Heavyweight (&gt;240 GSM)</SelectItem>
+                    {WEIGHT_OPTIONS.map(({ band, label }) => (
+                      <SelectItem key={band} value={band}>{weightLabel(band, label)}</SelectItem>
+                    ))}
                   </SelectContent>
                 </Select>
              </div>
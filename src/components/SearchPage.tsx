@@ -23,13 +23,16 @@ export const SearchPage: React.FC = () => {
   // API State
   const [fabrics, setFabrics] = useState<Fabric[]>([]);
   const [isLoading, setIsLoading] = useState(false);
-  const [page, setPage] = useState(1);
+  // Cursor of the page being loaded (null = first page) and of the page after it
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [hasMore, setHasMore] = useState(false);
   const [totalResults, setTotalResults] = useState(0);
+  const [totalExact, setTotalExact] = useState(true);
 
   // Reset pagination when search criteria change
   useEffect(() => {
-    setPage(1);
+    setCursor(null);
     setFabrics([]);
   }, [searchTerm, filters]);
 
@@ -56,8 +59,9 @@ export const SearchPage: React.FC = () => {
 
         // Build query parameters
         const params = new URLSearchParams();
-        params.append('page', page.toString());
+        if (cursor) params.append('cursor', cursor);
         params.append('limit', '20'); // Load 20 at a time
+        params.append('fields', 'card'); // Only the fields result cards and modals use
 
         if (searchTerm) params.append('search', searchTerm);
         if (filters.fabrication) params.append('group', filters.fabrication);
@@ -68,21 +72,26 @@ export const SearchPage: React.FC = () => {
         if (response.ok) {
           const result = await response.json();
 
-          if (page === 1) {
+          if (cursor === null) {
             setFabrics(result.results || []);
           } else {
             setFabrics(prev => [...prev, ...(result.results || [])]);
           }
 
-          setHasMore(page < result.pages);
-          setTotalResults(result.total);
+          setHasMore(result.has_more);
+          setNextCursor(result.next_cursor);
+          // The total is only counted for the first page
+          if (cursor === null) {
+            setTotalResults(result.total);
+            setTotalExact(result.total_exact);
+          }
         } else {
           console.error('Failed to fetch fabrics');
-          if (page === 1) setFabrics([]);
+          if (cursor === null) setFabrics([]);
         }
       } catch (error) {
         console.error('Error fetching fabrics:', error);
-        if (page === 1) setFabrics([]);
+        if (cursor === null) setFabrics([]);
       } finally {
         setIsLoading(false);
       }
@@ -94,10 +103,10 @@ export const SearchPage: React.FC = () => {
     }, 300);
 
     return () => clearTimeout(timeoutId);
-  }, [searchTerm, filters, page]);
+  }, [searchTerm, filters, cursor]);
 
   const handleLoadMore = () => {
-    setPage(prev => prev + 1);
+    setCursor(nextCursor);
   };
 
   // Handlers
@@ -155,21 +164,21 @@ export const SearchPage: React.FC = () => {
       </nav>
 
       <SearchHeader searchTerm={searchTerm} setSearchTerm={setSearchTerm} />
-      <SearchFilters filters={filters} setFilters={setFilters} />
+      <SearchFilters filters={filters} setFilters={setFilters} searchTerm={searchTerm} />
 
       <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-8 pb-32">
         {/* Results Count - Only show if we have search criteria */}
         {!isLoading && fabrics.length > 0 && (
           <div className="mb-6 flex items-center justify-between animate-fade-in">
             <div className="text-sm text-neutral-500 font-medium">
-              Showing <span className="text-neutral-900 font-bold">{fabrics.length}</span> of <span className="text-neutral-900 font-bold">{totalResults}</span> results
+              Showing <span className="text-neutral-900 font-bold">{fabrics.length}</span> of <span className="text-neutral-900 font-bold">{totalResults}{totalExact ? '' : '+'}</span> results
             </div>
             {/* Sort option could go here */}
           </div>
         )}
 
         {/* Loading State (Initial) */}
-        {isLoading && page === 1 ? (
+        {isLoading && cursor === null ? (
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-2 xl:grid-cols-3 gap-6 animate-fade-in">
             {Array.from({ length: 6 }).map((_, i) => (
               <div key={i} className="h-[420px] rounded-xl overflow-hidden border border-neutral-200 bg-white shadow-sm">
@@ -13,14 +13,19 @@ interface LiveDbViewProps {
 export const LiveDbView: React.FC<LiveDbViewProps> = ({ onEdit }) => {
     const [fabrics, setFabrics] = useState<AdminFabric[]>([]);
     const [loading, setLoading] = useState(true);
+    // Cursor for the next page (sent by the server in X-Next-Cursor), null on the last page
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
 
-    const fetchFabrics = async () => {
+    const fetchFabrics = async (cursor: string | null = null) => {
         setLoading(true);
         try {
-            const response = await fetch('http://localhost:5000/api/admin/fabrics?status=LIVE');
+            const params = new URLSearchParams({ status: 'LIVE' });
+            if (cursor) params.append('cursor', cursor);
+            const response = await fetch(`http://localhost:5000/api/admin/fabrics?${params.toString()}`);
             if (response.ok) {
                 const data = await response.json();
-                setFabrics(data);
+                setFabrics(prev => (cursor ? [...prev, ...data] : data));
+                setNextCursor(response.headers.get('X-Next-Cursor'));
             } else {
                 toast.error('Failed to fetch live fabrics');
             }
@@ -79,7 +84,7 @@ export const LiveDbView: React.FC<LiveDbViewProps> = ({ onEdit }) => {
                 <CardTitle>Live Database ({fabrics.length})</CardTitle>
             </CardHeader>
             <CardContent>
-                {loading ? (
+                {loading && fabrics.length === 0 ? (
                     <div className="text-center p-8">Loading...</div>
                 ) : fabrics.length === 0 ? (
                     <div className="text-center p-8 text-gray-500">
@@ -123,6 +128,13 @@ export const LiveDbView: React.FC<LiveDbViewProps> = ({ onEdit }) => {
                                 ))}
                             </tbody>
                         </table>
+                        {nextCursor && (
+                            <div className="text-center py-4">
+                                <Button variant="outline" onClick={() => fetchFabrics(nextCursor)} disabled={loading}>
+                                    {loading ? 'Loading...' : 'Load More'}
+                                </Button>
+                            </div>
+                        )}
                     </div>
                 )}
             </CardContent>
@@ -215,9 +215,12 @@ export const BuyerDashboard: React.FC = () => {
   const [techpackModalFabric, setTechpackModalFabric] = useState<Fabric | null>(null);
   const [fabrics, setFabrics] = useState<Fabric[]>([]);
   const [isLoading, setIsLoading] = useState(false);
-  const [page, setPage] = useState(1);
+  // Cursor of the page being loaded (null = first page) and of the page after it
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [hasMore, setHasMore] = useState(false);
   const [totalResults, setTotalResults] = useState(0);
+  const [totalExact, setTotalExact] = useState(true);
 
   const formatDate = (dateString: string | undefined) => {
     if (!dateString) return 'N/A';
@@ -279,8 +282,9 @@ export const BuyerDashboard: React.FC = () => {
       try {
         setIsLoading(true);
         const params = new URLSearchParams();
-        params.append('page', page.toString());
+        if (cursor) params.append('cursor', cursor);
         params.append('limit', '20');
+        params.append('fields', 'card');
         if (searchTerm) params.append('search', searchTerm);
         if (filters.fabrication) params.append('group', filters.fabrication);
         if (filters.gsmRange) params.append('weight', filters.gsmRange);
@@ -288,13 +292,18 @@ export const BuyerDashboard: React.FC = () => {
         const response = await fetch(`/api/find-fabrics?${params.toString()}`);
         if (response.ok) {
           const result = await response.json();
-          if (page === 1) {
+          if (cursor === null) {
             setFabrics(result.results || []);
           } else {
             setFabrics(prev => [...prev, ...(result.results || [])]);
           }
-          setHasMore(page < result.pages);
-          setTotalResults(result.total);
+          setHasMore(result.has_more);
+          setNextCursor(result.next_cursor);
+          // The total is only counted for the first page
+          if (cursor === null) {
+            setTotalResults(result.total);
+            setTotalExact(result.total_exact);
+          }
         }
       } catch (error) {
         console.error('Error fetching fabrics:', error);
@@ -308,15 +317,15 @@ export const BuyerDashboard: React.FC = () => {
     }, 300);
 
     return () => clearTimeout(timeoutId);
-  }, [searchTerm, filters, page]);
+  }, [searchTerm, filters, cursor]);
 
   React.useEffect(() => {
-    setPage(1);
+    setCursor(null);
     setFabrics([]);
   }, [searchTerm, filters]);
 
   const handleLoadMore = () => {
-    setPage(prev => prev + 1);
+    setCursor(nextCursor);
   };
 
   // Auto-collapse sidebar when user interacts with content area
@@ -368,13 +377,14 @@ export const BuyerDashboard: React.FC = () => {
               <SearchFilters
                 filters={filters}
                 setFilters={setFilters}
+                searchTerm={searchTerm}
               />
             </div>
 
             {fabrics.length > 0 && (
               <div className="flex justify-between items-center">
                 <p className="text-sm text-neutral-500">
-                  {totalResults} {totalResults === 1 ? 'fabric' : 'fabrics'} found
+                  {totalResults}{totalExact ? '' : '+'} {totalResults === 1 ? 'fabric' : 'fabrics'} found
                 </p>
               </div>
             )}
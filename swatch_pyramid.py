@@ -0,0 +1,293 @@
+"""
+Swatch Pyramid - pre-decoded mip levels of fabric swatches.
+
+Swatches are stored at high resolution but are almost always stretched down
+to a mask bbox. Each swatch gets a pyramid of levels (original size / 2^k):
+levels are kept as raw .npy arrays on disk next to the fabric directory and
+in a process-wide LRU in memory, so a render starts resampling from the
+smallest level that still covers the target instead of the original file.
+
+Cold JPEG loads use Pillow's draft mode, which decodes directly at 1/2, 1/4
+or 1/8 scale in the DCT domain.
+
+Raw levels are large (level 0 of a 2000 x 2000 RGB swatch is 12 MB), so the
+directory has a byte budget: disk hits touch their file and every few builds
+the least recently used levels beyond the budget are deleted. A pruned level
+is rebuilt from the original swatch on its next use.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+# Levels smaller than this on the long edge are not worth keeping
+MIN_LEVEL_SIZE = 256
+# JPEG draft mode can only scale down to 1/8
+MAX_DRAFT_LEVEL = 3
+DEFAULT_SWATCH_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_SWATCH_DISK_BYTES = 1024 * 1024 * 1024
+# Builds between two disk budget checks
+DEFAULT_PRUNE_INTERVAL = 16
+
+
+def level_size(size, level):
+    """(width, height) of pyramid level `level` for an original of `size`."""
+    factor = 2 ** level
+    return (-(-size[0] // factor), -(-size[1] // factor))
+
+
+def choose_level(size, target_size):
+    """Deepest level whose dimensions still cover target_size (0 = original)."""
+    level = 0
+    while True:
+        next_size = level_size(size, level + 1)
+        if (next_size[0] < target_size[0] or next_size[1] < target_size[1]
+                or max(next_size) < MIN_LEVEL_SIZE):
+            return level
+        level += 1
+
+
+class SwatchPyramid:
+    """
+    Disk + memory cache of swatch mip levels for one pyramid directory.
+
+    Levels are keyed by the swatch's identity (name, size, mtime), so
+    replacing a swatch file transparently invalidates its pyramid.
+    """
+
+    def __init__(self, cache_dir, max_memory_bytes=DEFAULT_SWATCH_CACHE_BYTES,
+                 max_disk_bytes=DEFAULT_SWATCH_DISK_BYTES, prune_interval=DEFAULT_PRUNE_INTERVAL):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.prune_interval = prune_interval
+        self._builds = 0
+        self._levels = OrderedDict()  # (identity, level) -> read-only ndarray
+        self._sizes = {}  # identity -> original (width, height)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def identity(fabric_path):
+        stat = os.stat(fabric_path)
+        raw = f"{os.path.basename(fabric_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+    def _swatch_dir(self, fabric_path, identity):
+        return os.path.join(self.cache_dir, os.path.basename(fabric_path), identity)
+
+    def get(self, fabric_path, target_size):
+        """
+        Returns the smallest pyramid level of the swatch that is at least
+        target_size (width, height), as a PIL Image (RGB or RGBA).
+        """
+        identity = self.identity(fabric_path)
+        original_size = self._sizes.get(identity)
+        if original_size is None:
+            with Image.open(fabric_path) as img:
+                original_size = img.size
+            self._sizes[identity] = original_size
+        level = choose_level(original_size, target_size)
+        key = (identity, level)
+
+        with self._lock:
+            pixels = self._levels.get(key)
+            if pixels is not None:
+                self._levels.move_to_end(key)
+                self.hits += 1
+                return Image.fromarray(pixels)
+
+        level_path = os.path.join(self._swatch_dir(fabric_path, identity), f"{level}.npy")
+        try:
+            pixels = np.load(level_path)
+            # The disk budget evicts by mtime, so a hit marks the level as recently used
+            os.utime(level_path)
+            with self._lock:
+                self.disk_hits += 1
+        except (OSError, ValueError):
+            pixels = self._build(fabric_path, identity, original_size, level)
+            with self._lock:
+                self.misses += 1
+
+        self._remember(key, pixels)
+        return Image.fromarray(pixels)
+
+    def _build(self, fabric_path, identity, original_size, level):
+        """
+        Decodes the swatch (draft-scaled for JPEG), writes every level from the
+        requested one downwards to disk and returns the requested level.
+        """
+        with Image.open(fabric_path) as img:
+            mode = 'RGBA' if ('A' in img.getbands() or 'transparency' in img.info) else 'RGB'
+            if img.format == 'JPEG':
+                img.draft(mode, level_size(original_size, min(level, MAX_DRAFT_LEVEL)))
+            decoded = img.convert(mode)
+
+        # Draft decodes to a DCT scale; finish with a box reduce / resample to the exact level size
+        current = decoded
+        levels = {}
+        for k in range(level, level + 16):
+            size = level_size(original_size, k)
+            if k > level and max(size) < MIN_LEVEL_SIZE:
+                break
+            if current.size != size:
+                factor = current.size[0] // size[0]
+                if factor >= 2 and current.size == (size[0] * factor, size[1] * factor):
+                    current = current.reduce(factor)
+                else:
+                    current = current.resize(size, Image.Resampling.BOX)
+            levels[k] = np.asarray(current)
+
+        if self.max_disk_bytes <= 0:
+            return levels[level]
+        swatch_dir = self._swatch_dir(fabric_path, identity)
+        try:
+            self._discard_stale(fabric_path, identity)
+            os.makedirs(swatch_dir, exist_ok=True)
+            for k, pixels in levels.items():
+                path = os.path.join(swatch_dir, f"{k}.npy")
+                if pixels.nbytes <= self.max_disk_bytes and not os.path.exists(path):
+                    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    with open(tmp_path, 'wb') as f:
+                        np.save(f, pixels)
+                    os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"  Warning: Could not write swatch pyramid for {os.path.basename(fabric_path)}: {e}")
+        with self._lock:
+            self._builds += 1
+            due = self._builds % self.prune_interval == 0
+        if due:
+            self.prune_disk()
+        return levels[level]
+
+    def prune_disk(self):
+        """
+        Deletes the least recently used levels (by mtime) until the directory
+        fits max_disk_bytes. Other processes may prune concurrently; files
+        that are already gone are skipped.
+
+        Returns:
+            Number of level files deleted
+        """
+        files = []
+        total = 0
+        for root, _dirs, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith('.npy'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime_ns, st.st_size, path))
+                total += st.st_size
+        if total <= self.max_disk_bytes:
+            return 0
+
+        removed = 0
+        for _mtime, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            # Drop the identity and swatch directories once they are empty
+            for directory in (os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+        return removed
+
+    def _discard_stale(self, fabric_path, identity):
+        """Removes pyramids built from earlier versions of the same swatch file."""
+        parent = os.path.join(self.cache_dir, os.path.basename(fabric_path))
+        if not os.path.isdir(parent):
+            return
+        for entry in os.scandir(parent):
+            if entry.is_dir() and entry.name != identity:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _remember(self, key, pixels):
+        pixels.flags.writeable = False
+        with self._lock:
+            if key in self._levels or pixels.nbytes > self.max_memory_bytes:
+                return
+            self._levels[key] = pixels
+            self._bytes += pixels.nbytes
+            while self._levels and self._bytes > self.max_memory_bytes:
+                _, evicted = self._levels.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def configure(self, max_memory_bytes=None, max_disk_bytes=None):
+        with self._lock:
+            if max_disk_bytes is not None:
+                self.max_disk_bytes = max_disk_bytes
+            if max_memory_bytes is not None:
+                self.max_memory_bytes = max_memory_bytes
+            while self._levels and self._bytes > self.max_memory_bytes:
+                _, evicted = self._levels.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def stats(self):
+        with self._lock:
+            return {
+                "levels": len(self._levels),
+                "bytes": self._bytes,
+                "max_bytes": self.max_memory_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+
+# ===== PROCESS-WIDE REGISTRY =====
+# Generators only carry the (picklable) directory; pyramids are shared per process
+_pyramids = {}
+_pyramids_lock = threading.Lock()
+_memory_budget = DEFAULT_SWATCH_CACHE_BYTES
+_disk_budget = DEFAULT_SWATCH_DISK_BYTES
+
+
+def get_swatch_pyramid(cache_dir):
+    """Returns the process-wide SwatchPyramid for a cache directory."""
+    cache_dir = os.path.abspath(cache_dir)
+    with _pyramids_lock:
+        pyramid = _pyramids.get(cache_dir)
+        if pyramid is None:
+            pyramid = SwatchPyramid(cache_dir, _memory_budget, _disk_budget)
+            _pyramids[cache_dir] = pyramid
+        return pyramid
+
+
+def configure_swatch_memory(max_bytes):
+    """Sets the in-memory budget for every pyramid in this process."""
+    global _memory_budget
+    with _pyramids_lock:
+        _memory_budget = max_bytes
+        pyramids = list(_pyramids.values())
+    for pyramid in pyramids:
+        pyramid.configure(max_memory_bytes=max_bytes)
+
+
+def configure_swatch_disk(max_bytes):
+    """Sets the on-disk budget of every pyramid directory used by this process (0 = memory only)."""
+    global _disk_budget
+    with _pyramids_lock:
+        _disk_budget = max_bytes
+        pyramids = list(_pyramids.values())
+    for pyramid in pyramids:
+        pyramid.configure(max_disk_bytes=max_bytes)
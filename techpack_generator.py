@@ -1,7 +1,7 @@
 import os
 import sys
 import json
-from mockup_library import MockupGenerator
+from mockup_library import MockupGeneratorV2
 from PIL import Image as PILImage # For checking template dimensions
 # ReportLab imports
 from reportlab.pdfgen import canvas
@@ -15,6 +15,10 @@ from config import settings
 
 # Use settings from environment variables
 PATHS = {
+    'fabric_dir': str(settings.fabric_dir_path),
+    'mockup_dir': str(settings.mockup_dir_path),
+    'mask_dir': str(settings.mask_dir_path),
+    'mockup_output_dir': str(settings.mockup_output_dir_path),
     'pdf_output_dir': str(settings.pdf_output_dir_path),
     'techpack_template_dir': str(settings.techpack_template_dir_path),
 }
@@ -134,9 +138,17 @@ def run_generator():
 
         # --- 2. Step 1: Generate the mockup image IN MEMORY ---
         print("\n--- Step 1: Generating Mockup Image ---")
-        generator = MockupGenerator()
+        generator = MockupGeneratorV2(
+            fabric_dir=PATHS['fabric_dir'],
+            mockup_dir=PATHS['mockup_dir'],
+            mask_dir=PATHS['mask_dir'],
+            output_dir=PATHS['mockup_output_dir'],
+            engine=settings.MOCKUP_ENGINE,
+            swatch_cache_dir=str(settings.swatch_pyramid_dir_path) if settings.swatch_pyramid_dir_path else None,
+            bundle_dir=str(settings.garment_bundle_dir_path) if settings.garment_bundle_dir_path else None
+        )
         
-        # Pass the new scaling_factor
+        # The fabric repeat is tiled at scaling_factor (rendered in memory, no PNG round trip)
         mockup_image_object = generator.generate_mockup_image_object(fabric_ref, mockup_name, scaling_factor)
 
         if not mockup_image_object:
@@ -2,9 +2,11 @@ import unittest
 import json
 from api_server import app, db
 from models import User, Fabric
+from testing_support import isolate_catalog_state
 
 class AdminApiTestCase(unittest.TestCase):
     def setUp(self):
+        isolate_catalog_state(self)
         app.config['TESTING'] = True
         app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
         app.config['JWT_SECRET_KEY'] = 'super-secret-key' # Ensure key matches
@@ -3,9 +3,11 @@ import json
 import os
 from api_server import app, db, User
 from flask_jwt_extended import create_access_token
+from testing_support import isolate_catalog_state
 
 class AuthV2TestCase(unittest.TestCase):
     def setUp(self):
+        isolate_catalog_state(self)
         app.config['TESTING'] = True
         app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
         app.config['JWT_SECRET_KEY'] = 'test_secret'
@@ -0,0 +1,395 @@
+import unittest
+import unittest.mock
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from sqlalchemy import event, text
+import keyset_pagination
+import loadtest_catalog
+from flask_jwt_extended import create_access_token
+import api_server
+from api_server import app, db, limiter
+from catalog_cache import CatalogVersion, FileCache
+from fabric_search import apply_search
+from fabric_listing import FIELD_SETS
+from models import User, Fabric
+from testing_support import isolate_catalog_state
+
+
+@contextmanager
+def count_queries():
+    """Collects the SQL statements the app's engine executes inside the block."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+class CatalogApiTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        app.config['JWT_SECRET_KEY'] = 'test_secret'
+        limiter.enabled = False
+        self.client = app.test_client()
+        self.swatch_dir = tempfile.mkdtemp()
+        self._saved_swatch_dir = api_server.FABRIC_SWATCH_DIR
+        api_server.FABRIC_SWATCH_DIR = self.swatch_dir
+        self.state_dir = isolate_catalog_state(self)
+
+        with app.app_context():
+            self.seeding = loadtest_catalog.seed_catalog(db, fabrics=300, manufacturers=5, buyers=2, chunk_size=120)
+            admin = User.query.filter_by(email=loadtest_catalog.ADMIN_EMAIL).first()
+            self.token = create_access_token(identity=str(admin.id), additional_claims={'role': 'admin'})
+        self.headers = {'Authorization': f'Bearer {self.token}'}
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        limiter.enabled = True
+        api_server.FABRIC_SWATCH_DIR = self._saved_swatch_dir
+        shutil.rmtree(self.swatch_dir)
+
+    def test_seeded_catalog_is_realistic(self):
+        with app.app_context():
+            self.assertEqual(Fabric.query.count(), 300)
+            self.assertEqual(len({f.ref for f in Fabric.query.all()}), 300)
+            live = Fabric.query.filter_by(status='LIVE').count()
+            self.assertGreater(live, 200)
+            self.assertLess(live, 300)
+            fleece = [f.gsm for f in Fabric.query.filter_by(fabric_group='Fleece')]
+            self.assertTrue(fleece and all(260 <= gsm <= 380 for gsm in fleece))
+            self.assertTrue(all('Color' in f.meta_data for f in Fabric.query.limit(20)))
+        self.assertEqual(self.seeding['users'], 8)
+
+    def test_load_mix_reports_every_endpoint(self):
+        with app.app_context():
+            catalog = loadtest_catalog.describe_catalog(db, garments=[], render_refs=[])
+        plan = loadtest_catalog.build_plan(60, catalog, seed=1)
+        self.assertNotIn('render', {entry[0] for entry in plan})
+
+        client = loadtest_catalog.InProcessClient(app, self.token)
+        samples, wall_seconds = loadtest_catalog.run_load(client, plan, concurrency=1)
+        report = loadtest_catalog.summarize(samples, wall_seconds)
+
+        self.assertEqual(report['overall']['requests'], 60)
+        self.assertEqual(report['overall']['errors'], 0)
+        self.assertEqual(set(report['endpoints']),
+                         {'search', 'filter', 'paginate', 'fabric_groups', 'admin_fabrics'})
+        for stats in report['endpoints'].values():
+            self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+
+    def test_in_process_renders_write_only_to_temp_dirs(self):
+        saved = (api_server.FABRIC_SWATCH_DIR, api_server.SWATCH_PYRAMID_DIR, api_server.MOCKUP_DIR_OUTPUT)
+        with unittest.mock.patch.object(api_server, 'SWATCH_PYRAMID_DIR', '/unused/pyramid'):
+            with loadtest_catalog.isolated_render_dirs(api_server) as swatch_dir:
+                dirs = (api_server.FABRIC_SWATCH_DIR, api_server.SWATCH_PYRAMID_DIR, api_server.MOCKUP_DIR_OUTPUT)
+                root = os.path.dirname(swatch_dir)
+                self.assertTrue(all(os.path.dirname(d) == root for d in dirs))
+                self.assertEqual(api_server.mockup_generator_kwargs()['output_dir'], api_server.MOCKUP_DIR_OUTPUT)
+            self.assertEqual(api_server.SWATCH_PYRAMID_DIR, '/unused/pyramid')
+        self.assertEqual((api_server.FABRIC_SWATCH_DIR, api_server.SWATCH_PYRAMID_DIR, api_server.MOCKUP_DIR_OUTPUT),
+                         saved)
+        self.assertFalse(os.path.exists(root))
+
+    def test_sync_fabric_images(self):
+        with app.app_context():
+            fabrics = Fabric.query.order_by(Fabric.id).limit(3).all()
+            refs = [f.ref for f in fabrics]
+            fabrics[2].image_path = 'deleted.jpg'
+            db.session.commit()
+        open(os.path.join(self.swatch_dir, f'{refs[0]}.jpg'), 'wb').close()
+        open(os.path.join(self.swatch_dir, f'{refs[1].lower()}.PNG'), 'wb').close()
+
+        response = self.client.post('/api/admin/fabrics/sync-images', json={'dry_run': True}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        report = json.loads(response.data)
+        self.assertEqual((report['set'], report['cleared'], report['scanned']), (2, 1, 300))
+        with app.app_context():
+            self.assertIsNone(Fabric.query.filter_by(ref=refs[0]).first().image_path)
+
+        result = app.test_cli_runner().invoke(args=['sync-fabric-images', '--chunk-size', '50'])
+        self.assertIn('2 set, 0 repaired, 1 cleared', result.output)
+        with app.app_context():
+            paths = [Fabric.query.filter_by(ref=ref).first().image_path for ref in refs]
+        self.assertEqual(paths, [f'{refs[0]}.jpg', f'{refs[1].lower()}.PNG', None])
+
+        # A second pass finds nothing to do
+        report = json.loads(self.client.post('/api/admin/fabrics/sync-images', headers=self.headers).data)
+        self.assertEqual((report['set'], report['repaired'], report['cleared'], report['unchanged']), (0, 0, 0, 2))
+
+    def test_listings_cost_a_fixed_number_of_queries(self):
+        counts = {}
+        for limit in (5, 100):
+            with count_queries() as statements:
+                response = self.client.get(f'/api/find-fabrics?limit={limit}')
+            self.assertEqual(response.status_code, 200)
+            results = json.loads(response.data)['results']
+            self.assertEqual(len(results), limit)
+            self.assertTrue(all(r['owner_name'].startswith('Mill ') for r in results))
+            counts[limit] = len(statements)
+        # Page size does not change the query count: one count + one page (owners joined)
+        self.assertEqual(counts[5], counts[100])
+        self.assertLessEqual(counts[100], 2)
+
+        with count_queries() as statements:
+            response = self.client.get('/api/admin/fabrics?status=LIVE|PENDING_REVIEW', headers=self.headers)
+        self.assertEqual(len(json.loads(response.data)), 100)
+        self.assertEqual(len(statements), 1)
+
+    def test_full_text_search_is_ranked_and_kept_in_sync(self):
+        with app.app_context():
+            mill_id = Fabric.query.first().manufacturer_id
+            db.session.add_all([
+                Fabric(ref='SLUB-9001', fabric_group='Single Jersey', fabrication='Slub Jersey', gsm=150,
+                       status='LIVE', manufacturer_id=mill_id),
+                Fabric(ref='XX-9002', fabric_group='Poplin', fabrication='Oxford Poplin with slub effect', gsm=120,
+                       status='LIVE', manufacturer_id=mill_id),
+            ])
+            db.session.commit()
+
+        def search(term):
+            data = json.loads(self.client.get(f'/api/find-fabrics?search={term}&limit=100').data)
+            return [r['ref'] for r in data['results']], data['total']
+
+        # Prefix match on every word; a hit in the ref outranks one in the description
+        refs, total = search('slub%20jers')
+        self.assertIn('SLUB-9001', refs)
+        self.assertNotIn('XX-9002', refs)
+        refs, _ = search('slub')
+        self.assertLess(refs.index('SLUB-9001'), refs.index('XX-9002'))
+        self.assertEqual(search('xx-900')[0], ['XX-9002'])
+
+        # Updates and deletes reach the index
+        with app.app_context():
+            fabric = Fabric.query.filter_by(ref='XX-9002').first()
+            fabric.ref = 'YY-9002'
+            db.session.commit()
+        self.assertEqual(search('xx-900')[0], [])
+        self.assertEqual(search('yy')[0], ['YY-9002'])
+        with app.app_context():
+            db.session.delete(Fabric.query.filter_by(ref='YY-9002').first())
+            db.session.commit()
+        self.assertEqual(search('yy'), ([], 0))
+
+    def test_search_still_matches_substrings(self):
+        with app.app_context():
+            mill_id = Fabric.query.first().manufacturer_id
+            db.session.add_all([
+                Fabric(ref='SJ000123', fabric_group='Single Jersey', fabrication='Slub Jersey', gsm=150,
+                       status='LIVE', manufacturer_id=mill_id),
+                Fabric(ref='PQ-7001', fabric_group='Pique', fabrication='Lacoste Pique', gsm=210,
+                       status='LIVE', manufacturer_id=mill_id),
+            ])
+            db.session.commit()
+
+        def search(term):
+            data = json.loads(self.client.get(f'/api/find-fabrics?search={term}&limit=100').data)
+            return [r['ref'] for r in data['results']]
+
+        # Partial refs and words matched from the middle, as the plain ilike search did
+        self.assertIn('SJ000123', search('000123'))
+        self.assertEqual(search('coste'), ['PQ-7001'])
+        self.assertIn('SJ000123', search('ersey'))
+        # Rows matched both by word and by substring are listed once
+        refs = search('jersey')
+        self.assertIn('SJ000123', refs)
+        self.assertEqual(len(refs), len(set(refs)))
+
+    def test_search_never_scans_the_fabric_table(self):
+        with app.app_context():
+            for term in ('jersey', 'ersey', 'SJ-0001', 'sj'):
+                for ranked in (True, False):
+                    query, _rank = apply_search(Fabric.query.filter_by(status='LIVE'), Fabric, term,
+                                                db.session, ranked=ranked)
+                    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+                    plan = [row[3] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+                    # Rows are looked up by the id lists of the FTS5 tables, never by a table scan
+                    scans = [step for step in plan if step.startswith('SCAN fabric') and 'VIRTUAL TABLE' not in step]
+                    self.assertEqual(scans, [], (term, ranked, plan))
+                    self.assertIn('SEARCH fabric USING INTEGER PRIMARY KEY (rowid=?)', plan)
+
+    def test_cursor_pagination_walks_every_row_once(self):
+        for params in ('limit=40', 'limit=7&search=jersey', 'limit=25&group=fleece&weight=heavy'):
+            response = json.loads(self.client.get(f'/api/find-fabrics?{params}').data)
+            self.assertTrue(response['total_exact'])
+            seen = [r['id'] for r in response['results']]
+            while response['has_more']:
+                response = json.loads(self.client.get(
+                    f"/api/find-fabrics?{params}&cursor={response['next_cursor']}").data)
+                self.assertIsNone(response['total'])
+                seen.extend(r['id'] for r in response['results'])
+            first = json.loads(self.client.get(f'/api/find-fabrics?{params}').data)
+            self.assertEqual(len(seen), first['total'])
+            self.assertEqual(len(set(seen)), len(seen))
+
+        # Old clients still page by number, on the same order
+        by_cursor = json.loads(self.client.get('/api/find-fabrics?limit=40').data)
+        page_2 = json.loads(self.client.get('/api/find-fabrics?limit=40&page=2').data)
+        after = json.loads(self.client.get(f"/api/find-fabrics?limit=40&cursor={by_cursor['next_cursor']}").data)
+        self.assertEqual([r['id'] for r in page_2['results']], [r['id'] for r in after['results']])
+
+        self.assertEqual(self.client.get('/api/find-fabrics?cursor=not-a-cursor').status_code, 400)
+
+    def test_admin_listing_pages_newest_first(self):
+        ids = []
+        cursor = ''
+        while True:
+            response = self.client.get(f'/api/admin/fabrics?limit=120&cursor={cursor}', headers=self.headers)
+            ids.extend(f['id'] for f in json.loads(response.data))
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+        self.assertEqual(len(ids), 300)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_total_is_capped(self):
+        with unittest.mock.patch('api_server.capped_count',
+                                 lambda query: keyset_pagination.capped_count(query, cap=50)):
+            data = json.loads(self.client.get('/api/find-fabrics?limit=10').data)
+        self.assertEqual((data['total'], data['total_exact'], data['pages']), (50, False, None))
+        self.assertTrue(data['has_more'])
+
+    def test_facets_match_search_and_are_cached(self):
+        def total(params):
+            return json.loads(self.client.get(f'/api/find-fabrics?{params}').data)['total']
+
+        for search in ('', 'jersey'):
+            facets = json.loads(self.client.get(f'/api/fabric-facets?search={search}&weight=heavy').data)
+            self.assertEqual(facets['total'], total(f'search={search}&weight=heavy'))
+            # Group counts keep the weight filter; band counts ignore it
+            for group in facets['groups']:
+                self.assertEqual(group['count'], total(f"search={search}&weight=heavy&group={group['name']}"))
+            for band in facets['weights']:
+                self.assertEqual(band['count'], total(f"search={search}&weight={band['band']}"))
+
+        self.assertEqual(json.loads(self.client.get('/api/fabric-groups').data),
+                         [g['name'] for g in json.loads(self.client.get('/api/fabric-facets').data)['groups']])
+
+        # Repeat views are served from the cache until an admin write bumps the catalog version
+        with count_queries() as statements:
+            self.client.get('/api/fabric-facets?group=fleece')
+            self.client.get('/api/fabric-groups')
+        self.assertEqual(statements, [])
+
+        before = json.loads(self.client.get('/api/fabric-facets').data)['total']
+        with app.app_context():
+            fabric_id = Fabric.query.filter_by(status='LIVE').first().id
+        self.client.put(f'/api/admin/fabric/{fabric_id}', json={'status': 'DRAFT'}, headers=self.headers)
+        self.assertEqual(json.loads(self.client.get('/api/fabric-facets').data)['total'], before - 1)
+        # Other workers see the bump through the version file
+        other_worker = CatalogVersion(api_server.catalog_version.path)
+        self.assertEqual(other_worker.current(), api_server.catalog_version.current())
+        self.assertNotEqual(other_worker.current(), '0')
+
+    def test_search_responses_are_cached_with_etags(self):
+        url = '/api/find-fabrics?search=jersey&limit=10'
+        first = self.client.get(url)
+        etag = first.headers['ETag']
+        with count_queries() as statements:
+            cached = self.client.get('/api/find-fabrics?search=%20jersey%20&limit=10')
+            not_modified = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(statements, [])
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual((not_modified.status_code, not_modified.data), (304, b''))
+        self.assertEqual(not_modified.headers['ETag'], etag)
+
+        # Any committed Fabric write moves the version: ORM updates, bulk statements, not rollbacks
+        fabric_id = json.loads(first.data)['results'][0]['id']
+        version = api_server.catalog_version.current()
+        with app.app_context():
+            Fabric.query.get(fabric_id).fabrication = 'Rolled back'
+            db.session.flush()
+            db.session.rollback()
+        self.assertEqual(api_server.catalog_version.current(), version)
+        with app.app_context():
+            db.session.execute(db.update(Fabric), [{'id': fabric_id, 'fabrication': 'Jersey Renamed'}])
+            db.session.commit()
+        self.assertNotEqual(api_server.catalog_version.current(), version)
+
+        fresh = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh.headers['ETag'], etag)
+        self.assertEqual(json.loads(fresh.data)['results'][0]['fabrication'], 'Jersey Renamed')
+
+    def test_file_cache_is_shared_and_pruned(self):
+        worker_a = FileCache(self.state_dir, max_entries=2, prune_interval=1)
+        worker_b = FileCache(self.state_dir, max_entries=2, prune_interval=1)
+        worker_a.put(('q', 1), 'v1', b'one')
+        self.assertEqual(worker_b.get(('q', 1), 'v1'), b'one')
+        self.assertIsNone(worker_b.get(('q', 1), 'v2'))
+        for n in range(2, 5):
+            worker_b.put(('q', n), 'v2', b'x')
+        entries = [name for name in os.listdir(self.state_dir) if name.endswith('.bin')]
+        self.assertEqual(len(entries), 2)
+        self.assertTrue(all(name.startswith('v2-') for name in entries))
+
+    def test_listing_field_sets(self):
+        detail = json.loads(self.client.get('/api/find-fabrics?limit=50').data)['results']
+        with app.app_context():
+            for item in detail:
+                fabric = db.session.get(Fabric, item['id'])
+                self.assertEqual(item, {
+                    "id": fabric.id, "ref": fabric.ref, "fabric_group": fabric.fabric_group,
+                    "fabrication": fabric.fabrication, "gsm": fabric.gsm, "width": fabric.width,
+                    "composition": fabric.composition, "status": fabric.status,
+                    "owner_name": fabric.manufacturer.company_name, "manufacturer_id": fabric.manufacturer_id,
+                    "meta_data": fabric.meta_data or {}, "swatchUrl": None,
+                })
+
+        cards = json.loads(self.client.get('/api/find-fabrics?limit=50&fields=card').data)['results']
+        self.assertEqual([c['id'] for c in cards], [d['id'] for d in detail])
+        self.assertTrue(all(set(c) == set(FIELD_SETS['card']) for c in cards))
+
+        admin = self.client.get('/api/admin/fabrics?limit=5&fields=card', headers=self.headers)
+        self.assertEqual(set(json.loads(admin.data)[0]), set(FIELD_SETS['card']))
+        # Unknown field sets fall back to the full listing
+        admin = self.client.get('/api/admin/fabrics?limit=5&fields=everything', headers=self.headers)
+        self.assertEqual(set(json.loads(admin.data)[0]), set(FIELD_SETS['detail']))
+
+    def test_fabrics_by_id(self):
+        listed = json.loads(self.client.get('/api/find-fabrics?limit=5').data)['results']
+        with app.app_context():
+            hidden = Fabric.query.filter(Fabric.status != 'LIVE').first().id
+        ids = [listed[3]['id'], hidden, listed[0]['id'], 999999, listed[3]['id']]
+
+        with count_queries() as statements:
+            response = self.client.get(f"/api/fabrics?ids={','.join(map(str, ids))}")
+        self.assertEqual(len(statements), 1)
+        data = json.loads(response.data)
+        # Same schema as find-fabrics, request order, duplicates once
+        self.assertEqual(data['results'], [listed[3], listed[0]])
+        self.assertEqual(data['missing'], [hidden, 999999])
+
+        posted = json.loads(self.client.post('/api/fabrics', json={'ids': ids, 'fields': 'card'}).data)
+        self.assertEqual([r['id'] for r in posted['results']], [listed[3]['id'], listed[0]['id']])
+        self.assertEqual(set(posted['results'][0]), set(FIELD_SETS['card']))
+
+        revalidated = self.client.get(f"/api/fabrics?ids={','.join(map(str, ids))}",
+                                      headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+
+        for bad in ('/api/fabrics', '/api/fabrics?ids=1,x', '/api/fabrics?ids=' + ','.join(map(str, range(1, 202)))):
+            self.assertEqual(self.client.get(bad).status_code, 400)
+        self.assertEqual(self.client.post('/api/fabrics', json={'ids': [1.5]}).status_code, 400)
+        # Outside the 64-bit range the driver cannot bind the id
+        self.assertEqual(self.client.get(f'/api/fabrics?ids=1,{2**63}').status_code, 400)
+        too_small = json.dumps({'ids': [-2**63 - 1]})
+        self.assertEqual(self.client.post('/api/fabrics', data=too_small, content_type='application/json').status_code,
+                         400)
+        self.assertEqual(self.client.get(f'/api/fabrics?ids={2**63 - 1}').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,447 @@
+import unittest
+import io
+import json
+import os
+import shutil
+import tempfile
+import multiprocessing
+import runpy
+import threading
+import time
+import unittest.mock
+from concurrent.futures import Future
+from PIL import Image
+from flask_jwt_extended import create_access_token
+import api_server
+from api_server import app, db, limiter
+from models import User
+import render_jobs
+from render_admission import RenderAdmission, fcntl
+from testing_support import isolate_catalog_state
+
+
+def hold_render_budget(ledger_path, nbytes, admitted, release):
+    """Another API worker: keeps nbytes of the shared render budget until `release` is set."""
+    admission = RenderAdmission(nbytes, max_wait_seconds=0, ledger_path=ledger_path)
+    with admission.admit(nbytes):
+        admitted.set()
+        release.wait(10)
+
+
+class MockupApiTestCase(unittest.TestCase):
+    def setUp(self):
+        isolate_catalog_state(self)
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        app.config['JWT_SECRET_KEY'] = 'test_secret'
+        limiter.enabled = False
+        self.client = app.test_client()
+
+        # Point the API at a throwaway asset tree
+        self.tmp = tempfile.mkdtemp()
+        self._saved_dirs = {}
+        for attr in ['FABRIC_SWATCH_DIR', 'MOCKUP_DIR_TEMPLATES', 'MASK_DIR', 'MOCKUP_DIR_OUTPUT', 'SWATCH_PYRAMID_DIR',
+                     'GARMENT_BUNDLE_DIR']:
+            self._saved_dirs[attr] = getattr(api_server, attr)
+            path = os.path.join(self.tmp, attr.lower())
+            os.makedirs(path)
+            setattr(api_server, attr, path)
+        self._saved_job_dir = api_server.job_queue.job_dir
+        api_server.job_queue.job_dir = os.path.join(self.tmp, 'jobs')
+        os.makedirs(api_server.job_queue.job_dir)
+        self._saved_ledger = api_server.render_admission.ledger_path
+        if self._saved_ledger is not None:
+            api_server.render_admission.ledger_path = os.path.join(self.tmp, 'render_admission')
+
+        for view in ['face', 'back']:
+            Image.new('RGB', (60, 80), (240, 240, 240)).save(
+                os.path.join(api_server.MOCKUP_DIR_TEMPLATES, f'test tee_{view}.jpg'))
+            mask = Image.new('RGB', (60, 80), (0, 0, 0))
+            mask.paste((255, 255, 255), (10, 10, 50, 70))
+            mask.save(os.path.join(api_server.MASK_DIR, f'test tee_mask_{view}.png'))
+        Image.new('RGB', (32, 32), (200, 0, 0)).save(
+            os.path.join(api_server.FABRIC_SWATCH_DIR, 'FAB-1.jpg'))
+
+        with app.app_context():
+            db.create_all()
+            buyer = User(email='buyer@test.com', role='buyer', company_name='Buyer Corp')
+            db.session.add(buyer)
+            db.session.commit()
+            token = create_access_token(identity=str(buyer.id), additional_claims={'role': 'buyer'})
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        for attr, value in self._saved_dirs.items():
+            setattr(api_server, attr, value)
+        api_server.job_queue.job_dir = self._saved_job_dir
+        api_server.render_admission.ledger_path = self._saved_ledger
+        shutil.rmtree(self.tmp)
+        limiter.enabled = True
+
+    @classmethod
+    def tearDownClass(cls):
+        api_server.render_pool.shutdown()
+
+    def test_generate_mockup_returns_hashed_urls(self):
+        payload = {'fabric_ref': 'FAB-1', 'mockup_name': 'test tee'}
+        response = self.client.post('/api/generate-mockup', json=payload, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['views'], ['face', 'back'])
+        self.assertRegex(data['mockups']['face'], r'^/static/mockups/Mockup_test tee_face_FAB-1\.[0-9a-f]{16}\.png$')
+
+        # Identical request resolves to the same content-addressed URL
+        again = json.loads(self.client.post('/api/generate-mockup', json=payload, headers=self.headers).data)
+        self.assertEqual(again['mockups'], data['mockups'])
+
+        image = self.client.get(data['mockups']['face'])
+        self.assertEqual(image.status_code, 200)
+        self.assertIn('immutable', image.headers['Cache-Control'])
+        image.close()
+
+    def test_generate_mockup_keys_every_view_by_variant(self):
+        for view in ['side', 'sleeve']:
+            Image.new('RGB', (60, 80), (240, 240, 240)).save(
+                os.path.join(api_server.MOCKUP_DIR_TEMPLATES, f'test tee_{view}.jpg'))
+            Image.new('RGB', (60, 80), (255, 255, 255)).save(
+                os.path.join(api_server.MASK_DIR, f'test tee_mask_{view}.png'))
+        api_server.get_asset_index(api_server.MOCKUP_DIR_TEMPLATES).refresh(force=True)
+        api_server.get_asset_index(api_server.MASK_DIR).refresh(force=True)
+
+        for payload in ({'fabric_ref': 'FAB-1', 'mockup_name': 'test tee'},
+                        {'fabric_refs': ['FAB-1'], 'mockup_names': ['test tee']}):
+            url = '/api/generate-mockup' if 'fabric_ref' in payload else '/api/generate-mockups/batch'
+            data = json.loads(self.client.post(url, json=payload, headers=self.headers).data)
+            result = data['results'][0] if 'results' in data else data
+            self.assertEqual(result['views'], ['face', 'back', 'side', 'sleeve'])
+            self.assertEqual(set(result['mockups']), {'face', 'back', 'side', 'sleeve'})
+            for view, mockup_url in result['mockups'].items():
+                self.assertIn(f'Mockup_test tee_{view}_FAB-1.', mockup_url)
+
+        # A garment without variants is the one "single" view
+        Image.new('RGB', (60, 80), (240, 240, 240)).save(os.path.join(api_server.MOCKUP_DIR_TEMPLATES, 'scarf.jpg'))
+        Image.new('RGB', (60, 80), (255, 255, 255)).save(os.path.join(api_server.MASK_DIR, 'scarf_mask.png'))
+        api_server.get_asset_index(api_server.MOCKUP_DIR_TEMPLATES).refresh(force=True)
+        api_server.get_asset_index(api_server.MASK_DIR).refresh(force=True)
+        data = json.loads(self.client.post('/api/generate-mockup', json={
+            'fabric_ref': 'FAB-1', 'mockup_name': 'scarf'}, headers=self.headers).data)
+        self.assertEqual(data['views'], ['single'])
+
+    def test_batch_generate(self):
+        Image.new('RGB', (32, 32), (0, 0, 200)).save(
+            os.path.join(api_server.FABRIC_SWATCH_DIR, 'FAB-2.jpg'))
+        response = self.client.post('/api/generate-mockups/batch', json={
+            'fabric_refs': ['FAB-1', 'FAB-2', 'MISSING', '../etc'],
+            'mockup_names': ['test tee']
+        }, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertFalse(data['success'])
+        self.assertEqual([r['fabric_ref'] for r in data['results']], ['FAB-1', 'FAB-2'])
+        self.assertEqual(data['results'][1]['views'], ['face', 'back'])
+        self.assertEqual(sorted(f['fabric_ref'] for f in data['failures']), ['MISSING', 'etc'])
+
+    def test_batch_waits_once_for_all_items(self):
+        finished = Future()
+        finished.set_result([('face', os.path.join(api_server.MOCKUP_DIR_OUTPUT, 'done.png'))])
+        stuck = [Future(), Future()]
+        futures = iter([finished] + stuck)
+        with unittest.mock.patch.object(api_server, 'BATCH_TIMEOUT_SECONDS', 0.2), \
+                unittest.mock.patch.object(api_server.render_pool, 'submit', lambda *args: next(futures)):
+            start = time.monotonic()
+            response = self.client.post('/api/generate-mockups/batch', json={
+                'fabric_refs': ['FAB-1', 'FAB-2', 'FAB-3'], 'mockup_names': ['test tee']
+            }, headers=self.headers)
+            elapsed = time.monotonic() - start
+        # Two unfinished items cost one deadline, not one each
+        self.assertLess(elapsed, 0.4)
+        data = json.loads(response.data)
+        self.assertEqual([r['fabric_ref'] for r in data['results']], ['FAB-1'])
+        self.assertEqual([(f['fabric_ref'], f['error']) for f in data['failures']],
+                         [('FAB-2', 'Timed out'), ('FAB-3', 'Timed out')])
+        self.assertTrue(all(future.cancelled() for future in stuck))
+
+    def test_batch_rejects_oversized_request(self):
+        response = self.client.post('/api/generate-mockups/batch', json={
+            'fabric_refs': [f'FAB-{i}' for i in range(50)],
+            'mockup_names': ['test tee']
+        }, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_async_generate_mockup_job(self):
+        response = self.client.post('/api/generate-mockup', json={
+            'fabric_ref': 'FAB-1', 'mockup_name': 'test tee', 'async': True
+        }, headers=self.headers)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.headers['Retry-After'], str(api_server.settings.RENDER_JOB_POLL_SECONDS))
+        job_id = json.loads(response.data)['job_id']
+
+        deadline = time.time() + 30
+        while True:
+            status = self.client.get(f'/api/jobs/{job_id}', headers=self.headers)
+            job = json.loads(status.data)
+            if job['status'] in ('done', 'failed') or time.time() > deadline:
+                break
+            self.assertIn('Retry-After', status.headers)
+            time.sleep(0.05)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result']['views'], ['face', 'back'])
+        self.assertNotIn('Retry-After', status.headers)
+
+    def test_stale_job_reported_failed(self):
+        # A job whose submitting worker was recycled before it finished
+        job = {'id': 'a' * 32, 'kind': 'mockup', 'owner_id': '1', 'status': 'running', 'result': None,
+               'error': None, 'created_at': time.time() - 700, 'started_at': time.time() - 650,
+               'finished_at': None}
+        with open(os.path.join(api_server.job_queue.job_dir, f"{job['id']}.json"), 'w') as f:
+            json.dump(job, f)
+
+        response = self.client.get(f"/api/jobs/{job['id']}", headers=self.headers)
+        data = json.loads(response.data)
+        self.assertEqual(data['status'], 'failed')
+        self.assertNotIn('Retry-After', response.headers)
+        # The failure is persisted for every other worker
+        self.assertEqual(api_server.job_queue.get(job['id'])['status'], 'failed')
+
+    def test_stale_job_is_not_restarted_by_a_late_worker(self):
+        job_dir = api_server.job_queue.job_dir
+        job = {'id': 'b' * 32, 'kind': 'mockup', 'owner_id': '1', 'status': 'queued', 'result': None,
+               'error': None, 'created_at': time.time() - 700, 'started_at': None, 'finished_at': None}
+        with open(os.path.join(job_dir, f"{job['id']}.json"), 'w') as f:
+            json.dump(job, f)
+        self.assertEqual(api_server.job_queue.get(job['id'])['status'], 'failed')
+
+        # The pool only now picks it up: it must neither run nor flip the job back to running
+        render = unittest.mock.Mock()
+        with self.assertRaises(render_jobs.JobSuperseded) as raised:
+            render_jobs.run_job(job_dir, job['id'], render, ())
+        render.assert_not_called()
+        future = Future()
+        future.set_exception(raised.exception)
+        api_server.job_queue._finish(job['id'], future, None)
+        stored = api_server.job_queue.get(job['id'])
+        self.assertEqual((stored['status'], stored['error']), ('failed', 'Job did not finish; please retry'))
+
+    def test_job_not_visible_to_other_users(self):
+        response = self.client.post('/api/generate-mockup', json={
+            'fabric_ref': 'FAB-1', 'mockup_name': 'test tee', 'async': True
+        }, headers=self.headers)
+        job_id = json.loads(response.data)['job_id']
+        with app.app_context():
+            token = create_access_token(identity='999', additional_claims={'role': 'buyer'})
+        other = self.client.get(f'/api/jobs/{job_id}', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(other.status_code, 404)
+        self.assertEqual(self.client.get('/api/jobs/../../etc', headers=self.headers).status_code, 404)
+
+    def test_generate_mockup_preview_tier(self):
+        response = self.client.post('/api/generate-mockup', json={
+            'fabric_ref': 'FAB-1', 'mockup_name': 'test tee', 'max_size': 64
+        }, headers=self.headers)
+        data = json.loads(response.data)
+        image = self.client.get(data['mockups']['face'])
+        with Image.open(io.BytesIO(image.data)) as img:
+            self.assertEqual(img.size, (48, 64))
+        image.close()
+
+        bad = self.client.post('/api/generate-mockup', json={
+            'fabric_ref': 'FAB-1', 'mockup_name': 'test tee', 'tier': 'poster'
+        }, headers=self.headers)
+        self.assertEqual(bad.status_code, 400)
+
+    def test_generate_mockup_stream(self):
+        response = self.client.post('/api/generate-mockup', json={
+            'fabric_ref': 'FAB-1', 'mockup_name': 'test tee', 'stream': True, 'view': 'back', 'tier': 'preview'
+        }, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'image/png')
+        with Image.open(io.BytesIO(response.data)) as img:
+            self.assertEqual(img.size, (60, 80))
+        self.assertEqual(os.listdir(api_server.MOCKUP_DIR_OUTPUT), [])
+
+    def test_generate_mockup_missing_fabric(self):
+        response = self.client.post('/api/generate-mockup', json={
+            'fabric_ref': 'NOPE', 'mockup_name': 'test tee'
+        }, headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_compile_garments_cli(self):
+        result = app.test_cli_runner().invoke(args=['compile-garments'])
+        self.assertIn('built', result.output)
+        self.assertTrue(os.path.exists(os.path.join(api_server.GARMENT_BUNDLE_DIR, 'test tee.garment')))
+        result = app.test_cli_runner().invoke(args=['compile-garments'])
+        self.assertIn('0 of 1 garment bundles rebuilt', result.output)
+
+    def test_prune_mockups_removes_superseded_renders(self):
+        payload = {'fabric_ref': 'FAB-1', 'mockup_name': 'test tee'}
+        first = json.loads(self.client.post('/api/generate-mockup', json=payload, headers=self.headers).data)
+        # A new swatch gives new content addresses; the old renders are never used again
+        swatch = os.path.join(api_server.FABRIC_SWATCH_DIR, 'FAB-1.jpg')
+        Image.new('RGB', (32, 32), (0, 200, 0)).save(swatch)
+        os.utime(swatch, (time.time() + 5, time.time() + 5))
+        second = json.loads(self.client.post('/api/generate-mockup', json=payload, headers=self.headers).data)
+        self.assertNotEqual(first['mockups'], second['mockups'])
+
+        def output_file(url):
+            return os.path.join(api_server.MOCKUP_DIR_OUTPUT, os.path.basename(url))
+
+        old = time.time() - 40 * 86400
+        for url in first['mockups'].values():
+            os.utime(output_file(url), (old, old))
+        unrelated = os.path.join(api_server.MOCKUP_DIR_OUTPUT, 'legacy.png')
+        open(unrelated, 'wb').close()
+        os.utime(unrelated, (old, old))
+
+        result = app.test_cli_runner().invoke(args=['prune-mockups', '--max-age-days', '30', '--dry-run'])
+        self.assertIn('Would remove 2 of 4 renders', result.output)
+        self.assertTrue(all(os.path.exists(output_file(url)) for url in first['mockups'].values()))
+
+        result = app.test_cli_runner().invoke(args=['prune-mockups', '--max-age-days', '30'])
+        self.assertIn('Removed 2 of 4 renders', result.output)
+        self.assertFalse(any(os.path.exists(output_file(url)) for url in first['mockups'].values()))
+        self.assertTrue(all(os.path.exists(output_file(url)) for url in second['mockups'].values()))
+        self.assertTrue(os.path.exists(unrelated))
+
+        # A byte budget keeps only the most recently used renders
+        keep = output_file(second['mockups']['face'])
+        os.utime(keep, (time.time() + 10, time.time() + 10))
+        result = app.test_cli_runner().invoke(args=['prune-mockups', '--max-age-days', '0', '--max-mb', '1'])
+        self.assertIn('Removed 0 of 2 renders', result.output)
+        report = api_server.prune_outputs(api_server.MOCKUP_DIR_OUTPUT, max_bytes=os.path.getsize(keep))
+        self.assertEqual(report['removed'], 1)
+        self.assertEqual(sorted(os.listdir(api_server.MOCKUP_DIR_OUTPUT)),
+                         sorted(['legacy.png', os.path.basename(keep)]))
+
+    def test_prewarm_runs_from_cli_and_gunicorn_hook_only(self):
+        result = app.test_cli_runner().invoke(args=['prewarm'])
+        self.assertIn('2 garment views compiled', result.output)
+
+        server_config = runpy.run_path(os.path.join(api_server.PROJECT_ROOT, 'gunicorn.conf.py'))
+        self.assertTrue(server_config['preload_app'])
+        with unittest.mock.patch.object(api_server, 'prewarm_garments') as prewarm:
+            server_config['when_ready'](None)
+        prewarm.assert_called_once_with()
+
+    def test_render_rejected_when_memory_budget_exhausted(self):
+        admission = api_server.render_admission
+        saved = (admission.budget_bytes, admission.max_wait_seconds)
+        admission.budget_bytes, admission.max_wait_seconds = 1024, 0.05
+        try:
+            # Another render holds the budget for the whole request
+            with admission.admit(1024):
+                response = self.client.post('/api/generate-mockup', json={
+                    'fabric_ref': 'FAB-1', 'mockup_name': 'test tee'
+                }, headers=self.headers)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], str(admission.retry_after_seconds))
+
+            # A render that frees its reservation within the wait lets the next one in
+            admission.max_wait_seconds = 5
+            release = threading.Event()
+
+            def hold():
+                with admission.admit(1024):
+                    release.wait()
+            holder = threading.Thread(target=hold)
+            holder.start()
+            threading.Timer(0.1, release.set).start()
+            response = self.client.post('/api/generate-mockup', json={
+                'fabric_ref': 'FAB-1', 'mockup_name': 'test tee'
+            }, headers=self.headers)
+            holder.join()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(admission.stats()['in_flight_bytes'], 0)
+        finally:
+            admission.budget_bytes, admission.max_wait_seconds = saved
+
+    @unittest.skipIf(fcntl is None, 'the render budget is per process without flock')
+    def test_memory_budget_is_shared_across_worker_processes(self):
+        admission = api_server.render_admission
+        self.assertIsNotNone(admission.ledger_path)
+        saved = (admission.budget_bytes, admission.max_wait_seconds)
+        admission.budget_bytes, admission.max_wait_seconds = 1024, 0.05
+        context = multiprocessing.get_context('fork')
+        payload = {'fabric_ref': 'FAB-1', 'mockup_name': 'test tee'}
+        try:
+            # A render in another worker process holds the whole budget
+            admitted, release = context.Event(), context.Event()
+            worker = context.Process(target=hold_render_budget,
+                                     args=(admission.ledger_path, 1024, admitted, release))
+            worker.start()
+            self.assertTrue(admitted.wait(10))
+            self.assertEqual(admission.stats()['host_in_flight_bytes'], 1024)
+            response = self.client.post('/api/generate-mockup', json=payload, headers=self.headers)
+            self.assertEqual(response.status_code, 503)
+
+            # Its release is seen by a render waiting in this process
+            admission.max_wait_seconds = 5
+            threading.Timer(0.2, release.set).start()
+            response = self.client.post('/api/generate-mockup', json=payload, headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            worker.join(10)
+
+            # A worker killed mid-render does not keep its reservation
+            admitted.clear()
+            release.clear()
+            worker = context.Process(target=hold_render_budget,
+                                     args=(admission.ledger_path, 1024, admitted, release))
+            worker.start()
+            self.assertTrue(admitted.wait(10))
+            worker.kill()
+            worker.join(10)
+            admission.max_wait_seconds = 0
+            with admission.admit(1024):
+                self.assertEqual(admission.stats()['host_in_flight'], 1)
+            self.assertEqual(admission.stats()['host_in_flight_bytes'], 0)
+        finally:
+            admission.budget_bytes, admission.max_wait_seconds = saved
+
+    def test_cached_render_skips_memory_admission(self):
+        payload = {'fabric_ref': 'FAB-1', 'mockup_name': 'test tee'}
+        first = json.loads(self.client.post('/api/generate-mockup', json=payload, headers=self.headers).data)
+        admission = api_server.render_admission
+        saved = (admission.budget_bytes, admission.max_wait_seconds)
+        admission.budget_bytes, admission.max_wait_seconds = 1024, 0.05
+        try:
+            with admission.admit(1024):
+                # Both views are on disk already: served without reserving memory
+                cached = self.client.post('/api/generate-mockup', json=payload, headers=self.headers)
+                self.assertEqual(cached.status_code, 200)
+                self.assertEqual(json.loads(cached.data)['mockups'], first['mockups'])
+                # One view missing: only it is estimated, and it still has to wait for the budget
+                os.remove(os.path.join(api_server.MOCKUP_DIR_OUTPUT, os.path.basename(first['mockups']['back'])))
+                generator = api_server.MockupGeneratorV2(**api_server.mockup_generator_kwargs())
+                self.assertLess(generator.estimate_render_bytes('FAB-1', 'test tee', skip_rendered=True),
+                                generator.estimate_render_bytes('FAB-1', 'test tee'))
+                partial = self.client.post('/api/generate-mockup', json=payload, headers=self.headers)
+                self.assertEqual(partial.status_code, 503)
+            self.assertEqual(admission.stats()['in_flight_bytes'], 0)
+        finally:
+            admission.budget_bytes, admission.max_wait_seconds = saved
+
+
+    def test_server_timing_and_metrics(self):
+        api_server.render_metrics.reset()
+        response = self.client.post('/api/generate-mockup', json={
+            'fabric_ref': 'FAB-1', 'mockup_name': 'test tee', 'stream': True, 'view': 'back'
+        }, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        timing = response.headers['Server-Timing']
+        for stage in ['lookup', 'fabric_decode', 'resize', 'composite', 'encode', 'total']:
+            self.assertIn(f'{stage};dur=', timing)
+
+        with app.app_context():
+            admin_token = create_access_token(identity='999', additional_claims={'role': 'admin'})
+        response = self.client.get('/api/admin/metrics', headers={'Authorization': f'Bearer {admin_token}'})
+        self.assertEqual(response.status_code, 200)
+        stages = response.get_json()['render_stages']['stages']
+        self.assertEqual(stages['encode']['count'], 1)
+        self.assertEqual(stages['encode']['buckets']['+Inf'], 1)
+        self.assertGreater(stages['encode']['bytes'], 0)
+        self.assertEqual(self.client.get('/api/admin/metrics', headers=self.headers).status_code, 403)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,420 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from PIL import Image
+from mockup_library import MockupGeneratorV2, GarmentCache, CompiledGarment
+from mockup_encoders import get_encoder, JPEGEncoder
+from swatch_pyramid import SwatchPyramid, choose_level, level_size
+from garment_bundles import GarmentBundleStore
+from asset_index import AssetIndex
+from render_metrics import StageTimer
+from benchmark_mockups import run_benchmark, compare_to_baseline
+
+
+class MockupLibraryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.dirs = {}
+        for name in ['fabrics', 'mockups', 'masks', 'output']:
+            self.dirs[name] = os.path.join(self.tmp, name)
+            os.makedirs(self.dirs[name])
+
+        # Two-view garment: white shirt with a white rectangle in the mask
+        for view in ['face', 'back']:
+            Image.new('RGB', (120, 160), (240, 240, 240)).save(
+                os.path.join(self.dirs['mockups'], f'test tee_{view}.jpg'))
+            mask = Image.new('RGB', (120, 160), (0, 0, 0))
+            mask.paste((255, 255, 255), (20, 30, 100, 140))
+            mask.save(os.path.join(self.dirs['masks'], f'test tee_mask_{view}.png'))
+
+        # Simple two-colour fabric
+        fabric = Image.new('RGB', (64, 64), (200, 0, 0))
+        fabric.paste((0, 0, 200), (0, 32, 64, 64))
+        fabric.save(os.path.join(self.dirs['fabrics'], 'FAB-1.png'))
+
+        self.cache = GarmentCache()
+        self.generator = MockupGeneratorV2(
+            fabric_dir=self.dirs['fabrics'],
+            mockup_dir=self.dirs['mockups'],
+            mask_dir=self.dirs['masks'],
+            output_dir=self.dirs['output'],
+            cache=self.cache
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_generate_mockup_variants(self):
+        results = self.generator.generate_mockup('FAB-1', 'test tee')
+        self.assertEqual([variant for variant, _path in results], ['face', 'back'])
+        with Image.open(results[0][1]) as img:
+            self.assertEqual(img.size, (120, 160))
+            # Inside the mask we see fabric, outside we see the base garment
+            self.assertEqual(img.getpixel((30, 40))[:3], (200, 0, 0))
+            self.assertEqual(img.getpixel((5, 5))[:3], (240, 240, 240))
+
+    def test_garment_cache_reuses_compiled_garment(self):
+        Image.new('RGB', (32, 32), (0, 200, 0)).save(os.path.join(self.dirs['fabrics'], 'FAB-2.png'))
+        self.generator.generate_mockup('FAB-1', 'test tee')
+        self.generator.generate_mockup('FAB-2', 'test tee')
+        stats = self.cache.stats()
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['entries'], 2)
+
+    def test_garment_cache_respects_budget(self):
+        mockup = os.path.join(self.dirs['mockups'], 'test tee_face.jpg')
+        mask = os.path.join(self.dirs['masks'], 'test tee_mask_face.png')
+        garment = self.generator.compile_garment(mockup, mask)
+        self.assertEqual(garment.bbox, (20, 30, 80, 110))
+
+        self.cache.configure(max_bytes=garment.nbytes)
+        self.generator.generate_mockup('FAB-1', 'test tee')
+        stats = self.cache.stats()
+        self.assertEqual(stats['entries'], 1)
+        self.assertLessEqual(stats['bytes'], garment.nbytes)
+
+    def test_garment_cache_invalidated_on_mtime_change(self):
+        mockup = os.path.join(self.dirs['mockups'], 'test tee_face.jpg')
+        mask = os.path.join(self.dirs['masks'], 'test tee_mask_face.png')
+        first = self.generator.get_compiled_garment(mockup, mask)
+        stat = os.stat(mask)
+        os.utime(mask, (stat.st_atime, stat.st_mtime + 10))
+        second = self.generator.get_compiled_garment(mockup, mask)
+        self.assertIsNot(first, second)
+        self.assertEqual(self.cache.stats()['entries'], 1)
+
+    def test_numpy_engine_matches_pil_inside_bbox(self):
+        mockup = os.path.join(self.dirs['mockups'], 'test tee_face.jpg')
+        mask = os.path.join(self.dirs['masks'], 'test tee_mask_face.png')
+        garment = self.generator.get_compiled_garment(mockup, mask)
+        fabric = Image.open(os.path.join(self.dirs['fabrics'], 'FAB-1.png'))
+
+        numpy_generator = MockupGeneratorV2(
+            self.dirs['fabrics'], self.dirs['mockups'], self.dirs['masks'], self.dirs['output'],
+            cache=self.cache, engine='numpy'
+        )
+        expected = np.asarray(self.generator.composite_pil(fabric, garment)).astype(int)
+        actual = np.asarray(numpy_generator.composite_numpy(fabric, garment)).astype(int)
+        x, y, w, h = garment.bbox
+        self.assertLessEqual(np.abs(expected - actual)[y:y + h, x:x + w].max(), 1)
+        # The cached base must never be modified in place
+        self.assertEqual(tuple(garment.base[y + 5, x + 5]), (240, 240, 240, 255))
+
+    def test_numpy_engine_transparent_base(self):
+        base = np.zeros((40, 40, 4), dtype=np.uint8)
+        base[:, :20] = (10, 20, 30, 128)
+        alpha = np.zeros((40, 40), dtype=np.uint8)
+        alpha[10:30, 10:30] = 255
+        alpha[10:30, 10:12] = 100
+        garment = CompiledGarment(base, alpha, (10, 10, 20, 20))
+        fabric = Image.new('RGB', (8, 8), (250, 100, 0))
+
+        expected = np.asarray(self.generator.composite_pil(fabric, garment)).astype(int)
+        self.generator.engine = 'numpy'
+        actual = np.asarray(self.generator.composite(fabric, garment)).astype(int)
+        self.assertLessEqual(np.abs(expected - actual).max(), 1)
+
+    def test_render_cache_reuses_identical_render(self):
+        first = self.generator.generate_mockup('FAB-1', 'test tee')
+        rendered = []
+        original = self.generator.render_variant
+        self.generator.render_variant = lambda *args: rendered.append(args) or original(*args)
+
+        second = self.generator.generate_mockup('FAB-1', 'test tee')
+        self.assertEqual(first, second)
+        self.assertEqual(rendered, [])
+        self.assertRegex(os.path.basename(first[0][1]), r'^Mockup_test tee_face_FAB-1\.[0-9a-f]{16}\.png$')
+
+        # Changing an input changes the content address and forces a re-render
+        fabric_path = os.path.join(self.dirs['fabrics'], 'FAB-1.png')
+        Image.new('RGB', (64, 64), (0, 200, 0)).save(fabric_path)
+        stat = os.stat(fabric_path)
+        os.utime(fabric_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        third = self.generator.generate_mockup('FAB-1', 'test tee')
+        self.assertNotEqual(first[0], third[0])
+        self.assertEqual(len(rendered), 2)
+
+    def test_variants_discovered_and_fabric_decoded_once(self):
+        Image.new('RGB', (120, 160), (240, 240, 240)).save(
+            os.path.join(self.dirs['mockups'], 'test tee_side.jpg'))
+        Image.new('RGB', (120, 160), (255, 255, 255)).save(
+            os.path.join(self.dirs['masks'], 'Test Tee_mask_side.jpg'))
+        # A mockup without a matching mask is skipped
+        Image.new('RGB', (120, 160), (240, 240, 240)).save(
+            os.path.join(self.dirs['mockups'], 'test tee_detail.jpg'))
+
+        variants = [v[0] for v in self.generator.discover_variants('test tee')]
+        self.assertEqual(variants, ['face', 'back', 'side'])
+
+        loads = []
+        original = self.generator.load_fabric
+        self.generator.load_fabric = lambda *args: loads.append(args) or original(*args)
+        results = self.generator.generate_mockup('FAB-1', 'test tee')
+        self.assertEqual([variant for variant, _path in results], ['face', 'back', 'side'])
+        self.assertIn('_side_', os.path.basename(results[2][1]))
+        self.assertEqual(len(loads), 1)
+
+    def test_single_garment_without_variants(self):
+        Image.new('RGB', (50, 50), (240, 240, 240)).save(os.path.join(self.dirs['mockups'], 'scarf.png'))
+        Image.new('RGB', (50, 50), (255, 255, 255)).save(os.path.join(self.dirs['masks'], 'scarf_mask.png'))
+        results = self.generator.generate_mockup('FAB-1', 'scarf')
+        self.assertEqual(len(results), 1)
+        self.assertIsNone(results[0][0])
+        self.assertTrue(os.path.basename(results[0][1]).startswith('Mockup_scarf_FAB-1.'))
+
+    def test_preview_tier_renders_downscaled(self):
+        full = self.generator.generate_mockup('FAB-1', 'test tee')
+        preview = self.generator.generate_mockup('FAB-1', 'test tee', tier='preview', max_size=80)
+        self.assertNotEqual(full, preview)
+        with Image.open(preview[0][1]) as img:
+            self.assertEqual(img.size, (60, 80))
+            self.assertEqual(img.getpixel((20, 25))[:3], (200, 0, 0))
+        # Preview garments are derived from the cached full-resolution garment
+        self.assertEqual(self.cache.stats()['misses'], 4)
+
+        with self.assertRaises(ValueError):
+            self.generator.generate_mockup('FAB-1', 'test tee', tier='huge')
+
+    def test_output_format_webp_and_jpeg(self):
+        webp = MockupGeneratorV2(
+            self.dirs['fabrics'], self.dirs['mockups'], self.dirs['masks'], self.dirs['output'],
+            cache=self.cache, output_format='WEBP'
+        )
+        results = webp.generate_mockup('FAB-1', 'test tee')
+        self.assertTrue(results[0][1].endswith('.webp'))
+        with Image.open(results[0][1]) as img:
+            self.assertEqual(img.format, 'WEBP')
+
+        data, mimetype = MockupGeneratorV2(
+            self.dirs['fabrics'], self.dirs['mockups'], self.dirs['masks'], self.dirs['output'],
+            cache=self.cache, output_format='JPG'
+        ).render_view_bytes('FAB-1', 'test tee', view='back')
+        self.assertEqual(mimetype, 'image/jpeg')
+        self.assertTrue(data.startswith(b'\xff\xd8'))
+
+    def test_encoder_tier_defaults_and_flattening(self):
+        self.assertEqual(get_encoder('PNG', 'preview').params['compress_level'], 1)
+        self.assertEqual(get_encoder('PNG', 'full', png_compress_level=9).params['compress_level'], 9)
+        self.assertEqual(get_encoder('JPEG', 'full', quality=70).params['quality'], 70)
+        self.assertTrue(get_encoder('WEBP', 'standard', webp_lossless=True).params['lossless'])
+        with self.assertRaises(ValueError):
+            get_encoder('TIFF')
+
+        transparent = Image.new('RGBA', (4, 4), (0, 0, 0, 0))
+        flattened = JPEGEncoder().prepare(transparent)
+        self.assertEqual(flattened.mode, 'RGB')
+        self.assertEqual(flattened.getpixel((0, 0)), (255, 255, 255))
+
+    def test_swatch_pyramid_levels(self):
+        self.assertEqual(level_size((1001, 600), 1), (501, 300))
+        self.assertEqual(choose_level((4000, 3000), (900, 700)), 2)
+        self.assertEqual(choose_level((4000, 3000), (3000, 100)), 0)
+        # Never descend below MIN_LEVEL_SIZE, however small the target
+        self.assertEqual(choose_level((1024, 1024), (10, 10)), 2)
+
+    def test_swatch_pyramid_reused_from_disk_and_memory(self):
+        fabric_path = os.path.join(self.dirs['fabrics'], 'FAB-BIG.jpg')
+        Image.new('RGB', (1200, 800), (30, 120, 60)).save(fabric_path)
+        pyramid_dir = os.path.join(self.tmp, 'pyramid')
+
+        pyramid = SwatchPyramid(pyramid_dir)
+        img = pyramid.get(fabric_path, (250, 150))
+        self.assertEqual(img.size, (300, 200))
+        self.assertEqual(pyramid.get(fabric_path, (250, 150)).size, (300, 200))
+        self.assertEqual(pyramid.stats()['misses'], 1)
+        self.assertEqual(pyramid.stats()['hits'], 1)
+
+        # A fresh process (new pyramid instance) loads the level from disk
+        fresh = SwatchPyramid(pyramid_dir)
+        self.assertEqual(fresh.get(fabric_path, (250, 150)).size, (300, 200))
+        self.assertEqual(fresh.stats()['disk_hits'], 1)
+        self.assertEqual(fresh.stats()['misses'], 0)
+        # Finer levels than any built so far are decoded on demand
+        self.assertEqual(fresh.get(fabric_path, (500, 300)).size, (600, 400))
+        self.assertEqual(fresh.stats()['misses'], 1)
+
+    def test_swatch_pyramid_disk_budget_evicts_least_recently_used(self):
+        paths = []
+        for i in range(3):
+            path = os.path.join(self.dirs['fabrics'], f'FAB-{i}.png')
+            Image.new('RGB', (600, 400), (i * 80, 0, 0)).save(path)
+            paths.append(path)
+        pyramid_dir = os.path.join(self.tmp, 'pyramid')
+        level_bytes = 300 * 200 * 3
+        # Room for two swatches' level 1 (plus .npy headers), not three
+        pyramid = SwatchPyramid(pyramid_dir, max_disk_bytes=2 * level_bytes + 1024, prune_interval=1)
+
+        pyramid.get(paths[0], (250, 150))
+        pyramid.get(paths[1], (250, 150))
+        # FAB-0 is read from disk again by another process, so FAB-1 is now the oldest
+        time.sleep(0.01)
+        SwatchPyramid(pyramid_dir).get(paths[0], (250, 150))
+        pyramid.get(paths[2], (250, 150))
+
+        self.assertEqual(sorted(os.listdir(pyramid_dir)), ['FAB-0.png', 'FAB-2.png'])
+        # An evicted level is rebuilt from the original on its next use
+        self.assertEqual(SwatchPyramid(pyramid_dir).get(paths[1], (250, 150)).size, (300, 200))
+
+        # A zero budget keeps levels in memory only
+        memory_only = SwatchPyramid(os.path.join(self.tmp, 'memory_only'), max_disk_bytes=0)
+        self.assertEqual(memory_only.get(paths[0], (250, 150)).size, (300, 200))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, 'memory_only')))
+
+    def test_generator_uses_swatch_pyramid(self):
+        generator = MockupGeneratorV2(
+            self.dirs['fabrics'], self.dirs['mockups'], self.dirs['masks'], self.dirs['output'],
+            cache=self.cache, swatch_cache_dir=os.path.join(self.tmp, 'pyramid')
+        )
+        results = generator.generate_mockup('FAB-1', 'test tee')
+        self.assertNotEqual(results, self.generator.generate_mockup('FAB-1', 'test tee'))
+        with Image.open(results[0][1]) as img:
+            self.assertEqual(img.getpixel((30, 40))[:3], (200, 0, 0))
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp, 'pyramid', 'FAB-1.png')))
+
+    def test_generate_mockup_image_object_tiles_in_memory(self):
+        for engine in ['pil', 'numpy']:
+            self.generator.engine = engine
+            img = self.generator.generate_mockup_image_object('FAB-1', 'test tee', 0.5)
+            self.assertEqual(img.size, (120, 160))
+            # Bbox at (20, 30); repeats are 40x40 (red top half, blue bottom half)
+            self.assertEqual(img.getpixel((25, 35))[:3], (200, 0, 0))
+            self.assertEqual(img.getpixel((25, 55))[:3], (0, 0, 200))
+            self.assertEqual(img.getpixel((25, 75))[:3], (200, 0, 0))
+            self.assertEqual(img.getpixel((65, 35))[:3], (200, 0, 0))
+        self.assertEqual(os.listdir(self.dirs['output']), [])
+
+        self.assertIsNone(self.generator.generate_mockup_image_object('FAB-404', 'test tee'))
+        with self.assertRaises(ValueError):
+            self.generator.generate_mockup_image_object('FAB-1', 'test tee', 0)
+
+    def test_prewarm_compiles_every_garment(self):
+        Image.new('RGB', (50, 50), (240, 240, 240)).save(os.path.join(self.dirs['mockups'], 'scarf.png'))
+        Image.new('RGB', (50, 50), (255, 255, 255)).save(os.path.join(self.dirs['masks'], 'Scarf_mask.png'))
+        # Templates without a mask are skipped
+        Image.new('RGB', (50, 50), (240, 240, 240)).save(os.path.join(self.dirs['mockups'], 'cap.png'))
+
+        report = self.generator.prewarm(max_sizes=(None, 80))
+        # The 50px scarf already fits the 80px tier, so it is only compiled once
+        self.assertEqual([(e['garment'], e['variant'], e['max_size']) for e in report], [
+            ('scarf', None, None),
+            ('test tee', 'face', None), ('test tee', 'face', 80),
+            ('test tee', 'back', None), ('test tee', 'back', 80),
+        ])
+        self.assertTrue(all(e['resident'] and e['bytes'] > 0 for e in report))
+        self.assertEqual(self.cache.stats()['entries'], 5)
+
+        self.generator.generate_mockup('FAB-1', 'test tee', max_size=80)
+        self.assertEqual(self.cache.stats()['misses'], 5)
+
+    def test_garment_bundles_are_mapped_and_rebuilt_when_stale(self):
+        bundle_dir = os.path.join(self.tmp, 'bundles')
+        store = GarmentBundleStore(bundle_dir)
+        report = store.compile_all(self.generator)
+        self.assertEqual([(e['garment'], e['views'], e['status']) for e in report], [('test tee', 2, 'built')])
+        self.assertEqual(store.compile_all(self.generator)[0]['status'], 'current')
+
+        mockup = os.path.join(self.dirs['mockups'], 'test tee_face.jpg')
+        mask = os.path.join(self.dirs['masks'], 'test tee_mask_face.png')
+        expected = self.generator.compile_garment(mockup, mask)
+
+        base, alpha, bbox = store.load(self.generator, mockup, mask)
+        self.assertEqual(bbox, expected.bbox)
+        self.assertTrue(np.array_equal(base, expected.base))
+        self.assertTrue(np.array_equal(alpha, expected.alpha))
+        self.assertFalse(base.flags.writeable)
+        self.assertFalse(base.flags.owndata)
+
+        # A changed source rebuilds the bundle on first use
+        stat = os.stat(mask)
+        os.utime(mask, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNotNone(store.load(self.generator, mockup, mask))
+        self.assertEqual(store.rebuilt, 1)
+        self.assertEqual(store.compile_all(self.generator)[0]['status'], 'current')
+
+    def test_generator_renders_from_bundles_without_decoding(self):
+        bundle_dir = os.path.join(self.tmp, 'bundles')
+        expected = self.generator.generate_mockup('FAB-1', 'test tee')
+        GarmentBundleStore(bundle_dir).compile_all(self.generator)
+
+        generator = MockupGeneratorV2(
+            self.dirs['fabrics'], self.dirs['mockups'], self.dirs['masks'], self.dirs['output'],
+            cache=GarmentCache(), bundle_dir=bundle_dir
+        )
+        generator.compile_garment = lambda *args: self.fail('template was decoded')
+        for _variant, path in expected:
+            os.remove(path)
+        results = generator.generate_mockup('FAB-1', 'test tee')
+        self.assertEqual(results, expected)
+
+    def test_estimate_render_bytes(self):
+        cold = self.generator.estimate_render_bytes('FAB-1', 'test tee')
+        render = 2 * 120 * 160 * 16
+        self.assertEqual(cold, render + 2 * 120 * 160 * 12 + 64 * 64 * 4)
+        # Compiled garments no longer count; previews and single views are cheaper
+        self.generator.prewarm()
+        self.assertEqual(self.generator.estimate_render_bytes('FAB-1', 'test tee'), render + 64 * 64 * 4)
+        self.assertEqual(self.generator.estimate_render_bytes('FAB-1', 'test tee', view='back'),
+                         120 * 160 * 16 + 64 * 64 * 4)
+        self.assertLess(self.generator.estimate_render_bytes('FAB-1', 'test tee', max_size=80), render)
+        self.assertEqual(self.generator.estimate_render_bytes('FAB-404', 'test tee'), 0)
+
+    def test_stage_timer_records_each_variant(self):
+        self.generator.timer = StageTimer()
+        self.generator.generate_mockup('FAB-1', 'test tee')
+        records = self.generator.timer.snapshot()
+        encodes = sorted(r['view'] for r in records if r['stage'] == 'encode')
+        self.assertEqual(encodes, ['test tee_back', 'test tee_face'])
+        self.assertTrue(all(r['bytes'] > 0 for r in records if r['stage'] == 'encode'))
+        self.assertEqual(
+            set(self.generator.timer.totals()),
+            {'lookup', 'template_decode', 'mask_bounds', 'fabric_decode', 'resize', 'composite', 'encode'}
+        )
+        self.assertIn('encode;dur=', self.generator.timer.server_timing())
+
+    def test_benchmark_report_and_regression_check(self):
+        report = run_benchmark(self.dirs['mockups'], self.dirs['masks'], engines=['pil'], formats=['PNG'],
+                               resolutions=[48], repeat=1, isolate=False)
+        self.assertEqual([(r['garment'], r['variant']) for r in report['results']],
+                         [('test tee', 'face'), ('test tee', 'back')])
+        self.assertTrue(all(r['output_bytes'] > 0 and 'encode' in r['stages_p50_ms'] for r in report['results']))
+        self.assertIn('pil/PNG', report['peak_rss_bytes'])
+
+        baseline = {'results': [dict(r, p50_ms=10.0) for r in report['results']]}
+        current = {'results': [dict(r, p50_ms=12.0) for r in report['results']]}
+        self.assertEqual(compare_to_baseline(current, baseline, tolerance=0.25), [])
+        current['results'][0]['p50_ms'] = 20.0
+        regressions = compare_to_baseline(current, baseline, tolerance=0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('test tee (face)', regressions[0])
+
+    def test_asset_index_lookups(self):
+        directory = self.dirs['fabrics']
+        for name in ['Fab-2.PNG', 'fab-2.jpg', 'FAB-3.webp', 'notes.txt']:
+            open(os.path.join(directory, name), 'wb').close()
+        index = AssetIndex(directory, refresh_interval=60)
+
+        self.assertEqual(index.find('FAB-1', ['.jpg', '.png']), 'FAB-1.png')
+        # Exact case beats extension preference; otherwise the first preferred extension wins
+        self.assertEqual(index.find('fab-2', ['.png', '.jpg']), 'fab-2.jpg')
+        self.assertEqual(index.find('FAB-2', ['.png', '.jpg']), 'Fab-2.PNG')
+        self.assertIsNone(index.find('FAB-3', ['.png', '.jpg']))
+        self.assertEqual(index.find('fab-3', ['.png', '.jpg'], any_extension=True), 'FAB-3.webp')
+
+        # Within the refresh interval lookups touch no filesystem state
+        open(os.path.join(directory, 'FAB-4.jpg'), 'wb').close()
+        self.assertIsNone(index.find('FAB-4', ['.jpg']))
+        index.refresh_interval = 0
+        self.assertEqual(index.find('FAB-4', ['.jpg']), 'FAB-4.jpg')
+        self.assertEqual(self.generator.find_file(directory, 'fab-4'), os.path.join(directory, 'FAB-4.jpg'))
+
+    def test_unknown_engine_rejected(self):
+        with self.assertRaises(ValueError):
+            MockupGeneratorV2('a', 'b', 'c', self.dirs['output'], engine='opencv')
+
+
+if __name__ == '__main__':
+    unittest.main()
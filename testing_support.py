@@ -0,0 +1,41 @@
+"""
+Testing Support - shared isolation for test suites that import api_server.
+
+api_server registers a track_changes hook at import time, so any test that
+commits Fabric rows bumps the catalog version file. isolate_catalog_state
+points the version file and the catalog caches at a temporary directory for
+one test, so running the suites never touches instance/.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest.mock
+
+from catalog_cache import CatalogVersion, VersionedCache
+
+
+def isolate_catalog_state(test_case):
+    """
+    Patches api_server's catalog version and caches for the duration of a test.
+
+    Call it first thing in setUp (before any rows are committed); the patches
+    and the temporary directory are undone through addCleanup.
+
+    Returns:
+        The temporary state directory
+    """
+    import api_server
+
+    state_dir = tempfile.mkdtemp()
+    test_case.addCleanup(shutil.rmtree, state_dir, True)
+    replacements = {
+        "catalog_version": CatalogVersion(os.path.join(state_dir, "catalog_version")),
+        "facet_cache": VersionedCache(),
+        "response_cache": VersionedCache(),
+    }
+    for name, value in replacements.items():
+        patcher = unittest.mock.patch.object(api_server, name, value)
+        patcher.start()
+        test_case.addCleanup(patcher.stop)
+    return state_dir